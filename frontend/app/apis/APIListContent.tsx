@@ -333,6 +333,7 @@ export default function APIListContent() {
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
                     api_id: parseInt(stressTestApiId),
+                    mode: 'debounce',
                     test_count: stressTestConfig.test_count,
                     expected_debounce_time: stressTestConfig.expected_debounce_time,
                     request_interval: stressTestConfig.request_interval
@@ -2,14 +2,18 @@
 API Healer - 自愈专家
 当测试失败时自动分析根因并修复脚本
 """
-from typing import Dict, List, Optional
+from typing import Dict, List
 import json
 from datetime import datetime
 
+from services.api_retrieval import rank_apis, relevant_apis
+from services.prompt_schema import DEFAULT_TOKEN_BUDGET, compact_json, encode_apis
+
 class HealerAgent:
-    def __init__(self, ai_client, db_path: str):
+    def __init__(self, ai_client, db_path: str, api_token_budget: int = DEFAULT_TOKEN_BUDGET):
         self.ai_client = ai_client
         self.db_path = db_path
+        self.api_token_budget = api_token_budget
     
     async def analyze_failure(self, execution_result: Dict) -> Dict:
         """
@@ -170,14 +174,21 @@ API: {step.get('api_method')} {step.get('api_path')}
         返回修复后的完整步骤列表(JSON格式)。
         """
         
+        # 项目接口可能成千上万：按与原始步骤、失败分析的相关度排序，在 token 预算内紧凑编码
+        query = " ".join(
+            [f"{s.get('api_method', '')} {s.get('api_path', '')}" for s in original_steps if isinstance(s, dict)]
+            + [compact_json(analysis)]
+        )
+        api_catalog, _ = encode_apis(relevant_apis(rank_apis(current_apis, query)), self.api_token_budget)
+
         user_prompt = f"""原始步骤:
-{json.dumps(original_steps, ensure_ascii=False, indent=2)}
+{compact_json(original_steps)}
 
 最新API定义:
-{json.dumps(current_apis, ensure_ascii=False, indent=2)}
+{api_catalog}
 
 失败分析:
-{json.dumps(analysis, ensure_ascii=False, indent=2)}
+{compact_json(analysis)}
 
 请修复步骤并返回完整的JSON。
 """
@@ -1,17 +1,38 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+import asyncio
 import json
 import uvicorn
-import sqlite3
 import os
 import httpx
-import urllib.parse
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple, AsyncIterator
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import uuid
+import time
 from dotenv import load_dotenv
 
+from services.execution_engine import ExecutionEngine, EXECUTION_MODES, RESPONSE_MODES, DEFAULT_MAX_BODY_SIZE, normalize_steps, run_suite
+from services.http_client_pool import HttpClientPool
+from services.load_generator import build_request_spec, run_load_test
+from services.debounce_probe import run_debounce_probe
+from services.blob_store import BlobStore
+from services.execution_store import save_execution
+from services.report_service import ReportService
+from services.database import Database, connect as connect_db
+from services.migrator import run_migrations
+from services.pagination import keyset_clause, order_clause, clamp_limit, page
+from services.api_search import search_apis
+from services.llm_cache import LLMCache, cache_key
+from services.llm_client import LLMClientManager
+from services.llm_router import LLMRouter
+from services.json_stream import StepStreamParser
+from services.api_retrieval import intent_text, rank_apis, relevant_apis, case_neighbours, graph_neighbours, merge_neighbours
+from services.prompt_schema import encode_apis
+from services.tokens import count_tokens
+from services.case_template import DEFAULT_MIN_CONFIDENCE, build_template_case
+
 # 加载环境变量
 load_dotenv()
 
@@ -24,12 +45,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 列表接口的下一页游标放在响应头中，需显式暴露给浏览器端
+    expose_headers=["X-Next-Cursor"],
 )
 
 # 路径配置
 BASE_DIR = "D:/testc/aitesting-api"
 DB_PATH = os.path.join(BASE_DIR, "data/apis.db")
 
+# 单次压测最长持续时间(秒)
+MAX_STRESS_DURATION = 600
+# 防抖探测单次突发的最大请求数
+MAX_BURST_REQUESTS = 200
+
 # ============= 模型适配层 =============
 
 from openai import AsyncOpenAI
@@ -42,149 +70,335 @@ class AIProvider:
         self.deepseek_model = os.getenv("DEEPSEEK_MODEL", "deepseek-chat")
         self.deepseek_base_url = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
         self.default_provider = os.getenv("AI_PROVIDER", "openai").lower()
+        self.temperature = 0.3
+        # 响应缓存（数据库就绪后设置，为 None 时不缓存）
+        self.cache: Optional[LLMCache] = None
+        # 每个供应商复用一个客户端；限流、限并发、失败重试
+        self.clients = LLMClientManager(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+            rpm=float(os.getenv("LLM_RPM", "60")),
+            tpm=float(os.getenv("LLM_TPM", "90000")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "4")),
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+        )
+        # 多供应商路由：首选供应商超过 p95 耗时未返回时对冲到另一个供应商；连续失败熔断
+        self.hedge_enabled = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+        self.router = LLMRouter(
+            hedge_delay=float(os.getenv("LLM_HEDGE_DELAY")) if os.getenv("LLM_HEDGE_DELAY") else None,
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET", "30"))
+        )
 
     def get_client(self, provider: str) -> AsyncOpenAI:
-        """根据供应商获取对应的 SDK 客户端 (强制禁用代理以解决 SSL 错误)"""
-        # 创建一个干净的 http_client
-        http_client = httpx.AsyncClient(
-            timeout=60.0,
-            trust_env=False,  # 禁用系统代理
-            verify=True       # 保持 SSL 验证
-        )
-        
-        if provider == "deepseek":
-            return AsyncOpenAI(
-                api_key=self.deepseek_key,
-                base_url=self.deepseek_base_url,
-                http_client=http_client
-            )
-        else:
+        """根据供应商获取对应的 SDK 客户端 (强制禁用代理以解决 SSL 错误)，同一供应商复用同一个客户端"""
+        def _create(http_client: httpx.AsyncClient) -> AsyncOpenAI:
+            # 重试由 LLMClientManager 统一处理，关闭 SDK 自带重试避免叠加
+            if provider == "deepseek":
+                return AsyncOpenAI(
+                    api_key=self.deepseek_key,
+                    base_url=self.deepseek_base_url,
+                    http_client=http_client,
+                    max_retries=0
+                )
             return AsyncOpenAI(
                 api_key=self.openai_key,
-                http_client=http_client
+                http_client=http_client,
+                max_retries=0
             )
-
-    async def chat(self, system_prompt: str, user_prompt: str, provider: str = None) -> Dict:
-        """使用 OpenAI SDK 调用接口（兼容 DeepSeek）"""
-        active_provider = provider or self.default_provider
-        client = self.get_client(active_provider)
-        model = self.deepseek_model if active_provider == "deepseek" else self.openai_model
-
-        print(f"📡 SDK 调用开始 | Provider: {active_provider} | Model: {model}")
-        try:
-            response = await client.chat.completions.create(
+        return self.clients.client(provider, _create)
+
+    def model_for(self, provider: str) -> str:
+        return self.deepseek_model if provider == "deepseek" else self.openai_model
+
+    def providers_for(self, provider: str = None) -> List[str]:
+        """本次调用可用的供应商（按优先级）；指定了供应商时只用该供应商"""
+        if provider:
+            return [provider]
+        keys = {"openai": self.openai_key, "deepseek": self.deepseek_key}
+        order = [self.default_provider] + [p for p in keys if p != self.default_provider and keys[p]]
+        return order if self.hedge_enabled else order[:1]
+
+    def _cache_key(self, provider: Optional[str], response_format: Dict, system_prompt: str, user_prompt: str) -> str:
+        """
+        缓存键：指定了供应商时按该供应商和模型区分；未指定时由路由决定实际应答的供应商，
+        任一供应商的结果都可以复用，键与供应商无关（chat 和 chat_stream 共用）
+        """
+        if provider:
+            return cache_key(provider, self.model_for(provider), self.temperature, response_format, system_prompt, user_prompt)
+        return cache_key("auto", "auto", self.temperature, response_format, system_prompt, user_prompt)
+
+    async def _complete(self, provider: str, system_prompt: str, user_prompt: str, response_format: Dict) -> Dict:
+        """调用单个供应商；返回内容不是合法 JSON 时视为该供应商失败"""
+        client = self.get_client(provider)
+        model = self.model_for(provider)
+        print(f"📡 SDK 调用开始 | Provider: {provider} | Model: {model}")
+        started = time.perf_counter()
+        response = await self.clients.call(
+            provider,
+            lambda: client.chat.completions.create(
                 model=model,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
-                response_format={"type": "json_object"},
-                temperature=0.3
+                response_format=response_format,
+                temperature=self.temperature
+            ),
+            estimated_tokens=count_tokens(system_prompt) + count_tokens(user_prompt) + 1000
+        )
+        usage = getattr(response, "usage", None)
+        return {
+            "result": json.loads(response.choices[0].message.content),
+            "model": model,
+            "latency_ms": (time.perf_counter() - started) * 1000,
+            "total_tokens": getattr(usage, "total_tokens", None)
+        }
+
+    async def chat(self, system_prompt: str, user_prompt: str, provider: str = None, use_cache: bool = True) -> Dict:
+        """
+        使用 OpenAI SDK 调用接口（兼容 DeepSeek）
+
+        Args:
+            provider: 指定供应商；为空时使用默认供应商，并可对冲到其他已配置的供应商
+            use_cache: 为 False 时跳过缓存读取，强制重新调用（结果仍会写入缓存）
+        """
+        response_format = {"type": "json_object"}
+
+        key = None
+        if self.cache is not None:
+            key = self._cache_key(provider, response_format, system_prompt, user_prompt)
+            if use_cache:
+                cached = await self.cache.get(key)
+                if cached is not None:
+                    print(f"⚡ AI 缓存命中 | Provider: {provider or 'auto'}")
+                    return cached
+            else:
+                self.cache.record_bypass()
+
+        try:
+            answered_by, outcome = await self.router.route(
+                self.providers_for(provider),
+                lambda p: self._complete(p, system_prompt, user_prompt, response_format)
             )
-            print(f"✅ AI 响应成功")
-            return json.loads(response.choices[0].message.content)
+            print(f"✅ AI 响应成功 | Provider: {answered_by}")
         except Exception as e:
             print(f"❌ AI 调用异常: {str(e)}")
             raise Exception(f"AI 服务不可用: {str(e)}")
 
+        result = outcome["result"]
+        if key is not None:
+            try:
+                await self.cache.put(key, answered_by, outcome["model"], result, outcome["latency_ms"], outcome["total_tokens"])
+            except Exception as e:
+                print(f"⚠️ 写入 AI 缓存失败: {e}")
+        return result
+
+    async def chat_stream(self, system_prompt: str, user_prompt: str, provider: str = None, use_cache: bool = True) -> AsyncIterator[str]:
+        """
+        流式调用：逐段返回模型输出的文本，与 chat 共用缓存（缓存命中时一次性返回缓存结果的 JSON 文本）
+
+        流式输出无法对冲：使用第一个未熔断的供应商（默认供应商熔断时切换到其他已配置的供应商），
+        结果计入该供应商的熔断统计；可用的供应商全部熔断时直接失败
+        """
+        response_format = {"type": "json_object"}
+
+        key = None
+        if self.cache is not None:
+            key = self._cache_key(provider, response_format, system_prompt, user_prompt)
+            if use_cache:
+                cached = await self.cache.get(key)
+                if cached is not None:
+                    print(f"⚡ AI 缓存命中 | Provider: {provider or 'auto'}")
+                    yield json.dumps(cached, ensure_ascii=False)
+                    return
+            else:
+                self.cache.record_bypass()
+
+        candidates = self.providers_for(provider)
+        active_provider = self.router.select(candidates)
+        if active_provider is None:
+            print(f"❌ AI 流式调用跳过: 供应商 {', '.join(candidates)} 已熔断")
+            raise Exception(f"AI 服务不可用: 供应商 {', '.join(candidates)} 已熔断")
+        model = self.model_for(active_provider)
+        client = self.get_client(active_provider)
+        breaker = self.router.breaker(active_provider)
+        breaker.on_request()
+        print(f"📡 SDK 流式调用开始 | Provider: {active_provider} | Model: {model}")
+        started = time.perf_counter()
+        parts = []
+        try:
+            async for chunk in self.clients.stream(
+                active_provider,
+                lambda: client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    response_format=response_format,
+                    temperature=self.temperature,
+                    stream=True
+                ),
+                estimated_tokens=count_tokens(system_prompt) + count_tokens(user_prompt) + 1000
+            ):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except (asyncio.CancelledError, GeneratorExit):
+            # 调用方中途放弃：不计成功或失败
+            breaker.on_cancel()
+            raise
+        except Exception as e:
+            breaker.record_failure()
+            print(f"❌ AI 流式调用异常: {str(e)}")
+            raise Exception(f"AI 服务不可用: {str(e)}")
+        breaker.record_success()
+        print(f"✅ AI 流式响应完成 | Provider: {active_provider}")
+
+        if key is not None:
+            try:
+                await self.cache.put(key, active_provider, model, json.loads("".join(parts)), (time.perf_counter() - started) * 1000, None)
+            except Exception as e:
+                print(f"⚠️ 写入 AI 缓存失败: {e}")
+
 ai_client = AIProvider()
 
+# ============= 用例编排的接口召回 =============
+
+# 发给 LLM 的接口列表的 token 预算
+API_PROMPT_TOKEN_BUDGET = int(os.getenv("API_PROMPT_TOKEN_BUDGET", "6000"))
+# 模板快速路径：按知识图谱直接编排简单链路，置信度不足时才调用 LLM
+CASE_TEMPLATE_ENABLED = os.getenv("CASE_TEMPLATE_ENABLED", "true").lower() == "true"
+CASE_TEMPLATE_MIN_CONFIDENCE = float(os.getenv("CASE_TEMPLATE_MIN_CONFIDENCE", str(DEFAULT_MIN_CONFIDENCE)))
+
+# 可选：知识图谱（依赖边作为召回的邻居）和本地向量索引（语义相似度），依赖 networkx / faiss
+try:
+    from lightweight_services import LightweightKnowledgeGraph, LightweightVectorSearch
+    LIGHTWEIGHT_AVAILABLE = True
+except ImportError:
+    LIGHTWEIGHT_AVAILABLE = False
+
+knowledge_graph = None
+vector_search = None
+if LIGHTWEIGHT_AVAILABLE:
+    kg_path = os.getenv("KNOWLEDGE_GRAPH_PATH", os.path.join(BASE_DIR, "data/knowledge_graph.pkl"))
+    if os.path.exists(kg_path):
+        knowledge_graph = LightweightKnowledgeGraph(kg_path)
+    if os.getenv("VECTOR_INDEX_PATH"):
+        vector_search = LightweightVectorSearch(os.getenv("VECTOR_INDEX_PATH"))
+
+async def _api_vector_scores(query: str, limit: int = 50) -> Dict:
+    """向量索引中与意图最相似的接口 {(method, path): 相似度}；未配置向量索引时为空"""
+    if vector_search is None or not query:
+        return {}
+    try:
+        import numpy as np
+        client = ai_client.get_client("openai")
+        response = await client.embeddings.create(model=os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"), input=query)
+        vector = np.array(response.data[0].embedding, dtype="float32")
+        hits = await asyncio.to_thread(vector_search.search, vector, limit, 0.0)
+        return {(str(h.get("method") or "").upper(), str(h.get("path") or "")): h["score"] for h in hits}
+    except Exception as e:
+        print(f"⚠️ 向量召回失败，仅使用词法召回: {e}")
+        return {}
+
+@app.on_event("shutdown")
+async def close_llm_clients():
+    await ai_client.clients.aclose()
+
+# ============= 执行引擎连接池 =============
+
+# 进程级共享：同一目标主机的请求复用 TCP/TLS 连接
+http_pool = HttpClientPool(
+    max_connections_per_host=int(os.getenv("HTTP_POOL_MAX_CONNECTIONS_PER_HOST", "50")),
+    max_keepalive_connections=int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20")),
+    keepalive_expiry=float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "30")),
+    http2=os.getenv("HTTP_POOL_HTTP2", "false").lower() == "true"
+)
+
+@app.on_event("shutdown")
+async def close_http_pool():
+    await http_pool.aclose()
+
+# 执行记录中的请求 / 响应体按内容哈希去重压缩存储
+blob_store = BlobStore(codec=os.getenv("BLOB_CODEC") or None)
+
 # ============= 数据库初始化 =============
 
 def init_database():
+    """按版本执行 migrations/ 下的迁移（建表、补列、索引等）"""
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # API 表 (增强版)
-    cursor.execute('''CREATE TABLE IF NOT EXISTS apis (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        path TEXT NOT NULL,
-        method TEXT NOT NULL,
-        summary TEXT,
-        description TEXT,
-        base_url TEXT,
-        parameters TEXT, -- JSON 存储
-        request_body TEXT, -- JSON 存储
-        headers TEXT, -- JSON 存储
-        project_id TEXT DEFAULT 'default-project',
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP
-    )''')
-    
-    # 自动迁移旧库：增加缺失的列
-    try:
-        cursor.execute("ALTER TABLE apis ADD COLUMN base_url TEXT")
-    except: pass
-    try:
-        cursor.execute("ALTER TABLE apis ADD COLUMN parameters TEXT")
-    except: pass
-    try:
-        cursor.execute("ALTER TABLE apis ADD COLUMN request_body TEXT")
-    except: pass
+    conn = connect_db(DB_PATH)
     try:
-        cursor.execute("ALTER TABLE apis ADD COLUMN headers TEXT")
-    except: pass
-    
-    # 场景表
-    cursor.execute('''CREATE TABLE IF NOT EXISTS scenarios (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT,
-        description TEXT,
-        natural_language_input TEXT,
-        project_id TEXT DEFAULT 'default-project',
-        nlu_result TEXT,
-        test_case_id INTEGER,
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP
-    )''')
-    
-    # 测试用例表 (步骤序列)
-    cursor.execute('''CREATE TABLE IF NOT EXISTS test_cases (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT,
-        steps TEXT, -- JSON 存储步骤
-        project_id TEXT DEFAULT 'default-project',
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP
-    )''')
-    
-    # 执行记录表
-    cursor.execute('''CREATE TABLE IF NOT EXISTS executions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        test_case_id INTEGER,
-        status TEXT, -- success, fail, running
-        results TEXT, -- JSON 存储各步详情
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP
-    )''')
-    
-    # 项目环境配置表
-    cursor.execute('''CREATE TABLE IF NOT EXISTS project_environments (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        project_id TEXT NOT NULL,
-        env_name TEXT NOT NULL, -- 如 test, dev, prod
-        base_url TEXT NOT NULL,
-        is_default INTEGER DEFAULT 0,
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-        UNIQUE(project_id, env_name)
-    )''')
-    
-    # 项目表
-    cursor.execute('''CREATE TABLE IF NOT EXISTS projects (
-        id TEXT PRIMARY KEY,
-        name TEXT NOT NULL,
-        description TEXT,
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP
-    )''')
-    
-    # 兼容性处理：如果 api 表中存在 default-project 但 projects 表中没有，则插入
-    cursor.execute("SELECT COUNT(*) FROM projects WHERE id = 'default-project'")
-    if cursor.fetchone()[0] == 0:
-        cursor.execute("INSERT INTO projects (id, name, description) VALUES ('default-project', '默认项目', '系统自动创建的默认项目')")
-
-    conn.commit()
-    conn.close()
+        run_migrations(conn)
+    finally:
+        conn.close()
     print(f"✅ 数据库架构已就绪: {DB_PATH}")
 
 init_database()
 
+# 路由中的数据库操作都经由 db 在后台线程执行，不阻塞事件循环
+db = Database(DB_PATH, max_readers=int(os.getenv("DB_READ_POOL_SIZE", "4")))
+
+@app.on_event("shutdown")
+async def close_database():
+    if ai_client.cache is not None:
+        try:
+            await ai_client.cache.flush()
+        except Exception as e:
+            print(f"⚠️ LLM 缓存命中记录写入失败: {e}")
+    db.close()
+
+report_service = ReportService(DB_PATH, db=db)
+
+# LLM 响应缓存：相同 prompt 在有效期内直接返回上次结果
+if os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true":
+    ai_client.cache = LLMCache(
+        db,
+        ttl=float(os.getenv("LLM_CACHE_TTL", "86400")),
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+    )
+
+# ============= 定期维护 =============
+
+_maintenance_tasks: List[asyncio.Task] = []
+
+async def _run_periodically(label: str, interval: float, job):
+    """每隔 interval 秒执行一次 job()，单次失败不影响后续执行"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await job()
+        except Exception as e:
+            print(f"❌ {label}失败: {e}")
+
+async def _collect_blob_garbage():
+    summary = await db.write(lambda conn: blob_store.collect_garbage(conn.cursor()))
+    if summary["deleted"]:
+        print(f"🧹 清理 {summary['deleted']} 个未引用的 blob ({summary['freed_bytes']} 字节)")
+
+async def _sweep_llm_cache():
+    result = await ai_client.cache.sweep()
+    if result["expired"] or result["evicted"]:
+        print(f"🧹 LLM 缓存清理: 过期 {result['expired']} 条，淘汰 {result['evicted']} 条")
+
+@app.on_event("startup")
+async def start_maintenance():
+    # 间隔为 0 表示不执行
+    jobs = [("blob 清理", float(os.getenv("BLOB_GC_INTERVAL", "3600")), _collect_blob_garbage)]
+    if ai_client.cache is not None:
+        jobs.append(("LLM 缓存清理", float(os.getenv("LLM_CACHE_SWEEP_INTERVAL", "600")), _sweep_llm_cache))
+    for label, interval, job in jobs:
+        if interval > 0:
+            _maintenance_tasks.append(asyncio.create_task(_run_periodically(label, interval, job)))
+
+@app.on_event("shutdown")
+async def stop_maintenance():
+    for task in _maintenance_tasks:
+        task.cancel()
+    _maintenance_tasks.clear()
+
 # ============= 核心业务路由 =============
 
 # --- 场景与用例生成 ---
@@ -204,15 +418,11 @@ async def create_scenario(req: ScenarioCreateRequest):
         print(f"✅ AI 理解完成: {nlu_result.get('intent')}")
         
         # 2. 保存场景
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
+        saved = await db.execute(
             "INSERT INTO scenarios (name, natural_language_input, nlu_result, project_id) VALUES (?, ?, ?, ?)",
             (nlu_result.get("intent", "未命名场景"), req.natural_language_input, json.dumps(nlu_result), req.project_id)
         )
-        scenario_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        scenario_id = saved["lastrowid"]
         
         return {"id": scenario_id, "name": nlu_result.get("intent"), "description": req.natural_language_input}
     except Exception as e:
@@ -224,8 +434,7 @@ async def create_scenario(req: ScenarioCreateRequest):
 @app.delete("/api/v1/scenarios/{scenario_id}")
 async def delete_scenario(scenario_id: int):
     """删除场景及其关联的测试用例"""
-    try:
-        conn = sqlite3.connect(DB_PATH)
+    def _delete(conn):
         cursor = conn.cursor()
         
         # 获取关联的 test_case_id
@@ -238,9 +447,9 @@ async def delete_scenario(scenario_id: int):
         # 如果有测试用例，也一并删除
         if row and row[0]:
             cursor.execute("DELETE FROM test_cases WHERE id = ?", (row[0],))
-            
-        conn.commit()
-        conn.close()
+
+    try:
+        await db.write(_delete)
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -254,19 +463,12 @@ class EnvironmentBase(BaseModel):
 
 @app.get("/api/v1/projects/{project_id}/environments")
 async def list_environments(project_id: str):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM project_environments WHERE project_id = ?", (project_id,))
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    return await db.fetchall("SELECT * FROM project_environments WHERE project_id = ?", (project_id,))
 
 @app.post("/api/v1/projects/{project_id}/environments")
 async def save_environment(project_id: str, env: EnvironmentBase):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    try:
+    def _save(conn):
+        cursor = conn.cursor()
         # 如果标记为默认，先取消该项目其他默认
         if env.is_default:
             cursor.execute("UPDATE project_environments SET is_default = 0 WHERE project_id = ?", (project_id,))
@@ -278,239 +480,252 @@ async def save_environment(project_id: str, env: EnvironmentBase):
                 base_url = excluded.base_url,
                 is_default = excluded.is_default
         """, (project_id, env.env_name, env.base_url, 1 if env.is_default else 0))
-        conn.commit()
+
+    try:
+        await db.write(_save)
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
     return {"success": True}
 
 @app.delete("/api/v1/projects/{project_id}/environments/{env_name}")
 async def delete_environment(project_id: str, env_name: str):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM project_environments WHERE project_id = ? AND env_name = ?", (project_id, env_name))
-    conn.commit()
-    conn.close()
+    await db.execute("DELETE FROM project_environments WHERE project_id = ? AND env_name = ?", (project_id, env_name))
     return {"success": True}
 
 @app.get("/api/v1/scenarios")
-async def list_scenarios():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("""
+async def list_scenarios(
+    response: Response,
+    project_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    view: str = "full"
+):
+    """
+    场景列表
+
+    - project_id: 只返回该项目的场景
+    - limit / cursor: 游标分页；不传 limit 时返回全部。返回体保持为场景数组，下一页游标在响应头 X-Next-Cursor 中
+    - view: full 返回完整字段（含用例步骤）；summary 只返回摘要列，不关联用例步骤
+    """
+    if view not in ("full", "summary"):
+        raise HTTPException(status_code=400, detail=f"不支持的 view: {view}")
+    conditions, params = [], []
+    if project_id:
+        conditions.append("s.project_id = ?")
+        params.append(project_id)
+    try:
+        after, after_params = keyset_clause(cursor, alias="s")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if after:
+        conditions.append(after)
+        params.extend(after_params)
+    limit = clamp_limit(limit)
+
+    if view == "summary":
+        sql = "SELECT s.id, s.name, s.description, s.project_id, s.test_case_id, s.created_at FROM scenarios s"
+    else:
+        sql = """
         SELECT s.*, t.steps as test_case_steps 
         FROM scenarios s 
-        LEFT JOIN test_cases t ON s.test_case_id = t.id 
-        ORDER BY s.created_at DESC
-    """)
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
-
-@app.post("/api/v1/scenarios/{scenario_id}/generate-case")
-async def generate_case(scenario_id: int):
-    """从海量 API 中检索并智能编排用例链"""
-    try:
-        def _safe_json_loads(val, default):
-            if val is None:
-                return default
-            if isinstance(val, (dict, list)):
-                return val
-            if isinstance(val, str):
-                s = val.strip()
-                if not s:
-                    return default
-                try:
-                    return json.loads(s)
-                except Exception:
-                    return default
+        LEFT JOIN test_cases t ON s.test_case_id = t.id"""
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY " + order_clause("s")
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+
+    rows, next_cursor = page(await db.fetchall(sql, params), limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+def _safe_json_loads(val, default):
+    if val is None:
+        return default
+    if isinstance(val, (dict, list)):
+        return val
+    if isinstance(val, str):
+        s = val.strip()
+        if not s:
+            return default
+        try:
+            return json.loads(s)
+        except Exception:
             return default
+    return default
+
+def _normalize_headers_dict(h):
+    if not isinstance(h, dict):
+        return {}
+    out = {}
+    for k, v in h.items():
+        if k is None:
+            continue
+        key = str(k).strip()
+        if not key:
+            continue
+        # 统一为字符串，避免 httpx header 类型问题
+        out[key] = "" if v is None else str(v)
+    return out
+
+def _has_mapping(mappings, to_field, to_type="headers"):
+    for m in mappings or []:
+        if not isinstance(m, dict):
+            continue
+        if (m.get("to_field") == to_field) and (m.get("to_type", "params") == to_type):
+            return True
+    return False
+
+def _ensure_header_mapping(mappings, from_step, from_fields, to_field):
+    """允许多个候选 from_field：前面的失败了，后面的仍可能成功"""
+    if mappings is None:
+        mappings = []
+    if not isinstance(mappings, list):
+        mappings = []
+    if _has_mapping(mappings, to_field, "headers"):
+        return mappings
+    for f in from_fields:
+        mappings.append({
+            "from_step": from_step,
+            "from_field": f,
+            "to_field": to_field,
+            "to_type": "headers"
+        })
+    return mappings
+
+def _api_headers_index(api_rows: List[Dict[str, Any]]) -> Dict[Tuple[str, str], Dict[str, str]]:
+    """项目下所有 API 的 headers 定义，按 (method,path) 建索引"""
+    api_headers_by_key = {}
+    for r in api_rows:
+        try:
+            p = r["path"]
+            m = r["method"]
+            h = r["headers"]
+        except Exception:
+            continue
+        api_headers_by_key[(str(m or "").upper(), str(p or ""))] = _normalize_headers_dict(_safe_json_loads(h, {}))
+    return api_headers_by_key
+
+def _enhance_step(step: Dict[str, Any], i: int, api_headers_by_key: Dict[Tuple[str, str], Dict[str, str]]) -> Dict[str, Any]:
+    """补齐单个步骤（i 为步骤下标）的 headers 和 param_mappings；只依赖步骤自身，流式生成时每收到一个步骤即可处理"""
+    if not isinstance(step, dict):
+        return step
+
+    # 约定：第 1 步通常是登录/获取 token（从该步提取动态头）
+    from_step_for_auth = 1
+
+    method = str(step.get("api_method") or step.get("method") or "GET").upper()
+    path = step.get("api_path") or step.get("path") or ""
+    key = (method, str(path))
+
+    headers = _normalize_headers_dict(step.get("headers") or {})
+    params_body = step.get("params") if isinstance(step.get("params"), dict) else {}
+    param_mappings = step.get("param_mappings")
+    if not isinstance(param_mappings, list):
+        param_mappings = []
+
+    # 1) 合并 API 定义中的 headers（不覆盖用户已有；跳过 Authorization 静态值）
+    api_headers = api_headers_by_key.get(key) or {}
+    for hk, hv in api_headers.items():
+        if hk.lower() == "authorization":
+            continue
+        if hk not in headers and hv:
+            headers[hk] = hv
+
+    # 2) 如果 headers 里出现 ${...} 占位符，清理掉，避免“看起来有值但执行时无效”
+    for hk in list(headers.keys()):
+        hv = headers.get(hk, "")
+        if isinstance(hv, str) and ("${" in hv or "{{" in hv):
+            # Authorization 必须靠 param_mappings 注入
+            if hk.lower() == "authorization":
+                headers.pop(hk, None)
+
+    # 3) 动态头自动补齐（优先用 step.params 的静态值；否则用 param_mappings 从第1步提取）
+    if "X-Venue-Id" not in headers:
+        if isinstance(params_body, dict) and params_body.get("venueId"):
+            headers["X-Venue-Id"] = str(params_body.get("venueId"))
+        else:
+            param_mappings = _ensure_header_mapping(
+                param_mappings,
+                from_step_for_auth,
+                ["data.venueId", "data.user.venueId", "data.profile.venueId"],
+                "X-Venue-Id"
+            )
 
-        def _normalize_headers_dict(h):
-            if not isinstance(h, dict):
-                return {}
-            out = {}
-            for k, v in h.items():
-                if k is None:
-                    continue
-                key = str(k).strip()
-                if not key:
-                    continue
-                # 统一为字符串，避免 httpx header 类型问题
-                out[key] = "" if v is None else str(v)
-            return out
-
-        def _has_mapping(mappings, to_field, to_type="headers"):
-            for m in mappings or []:
-                if not isinstance(m, dict):
-                    continue
-                if (m.get("to_field") == to_field) and (m.get("to_type", "params") == to_type):
-                    return True
-            return False
-
-        def _ensure_header_mapping(mappings, from_step, from_fields, to_field):
-            """允许多个候选 from_field：前面的失败了，后面的仍可能成功"""
-            if mappings is None:
-                mappings = []
-            if not isinstance(mappings, list):
-                mappings = []
-            if _has_mapping(mappings, to_field, "headers"):
-                return mappings
-            for f in from_fields:
-                mappings.append({
-                    "from_step": from_step,
-                    "from_field": f,
-                    "to_field": to_field,
-                    "to_type": "headers"
-                })
-            return mappings
-
-        def _enhance_steps_with_headers(project_id: str, steps: List[Dict[str, Any]], cursor):
-            """生成用例后，自动补齐 headers + 动态依赖（如 token、员工/门店ID、sessionId 等）的 param_mappings。"""
-            if not isinstance(steps, list) or not steps:
-                return steps
-
-            # 取出项目下所有 API 的 headers 定义，按 (method,path) 建索引
-            cursor.execute(
-                "SELECT path, method, headers FROM apis WHERE project_id = ?",
-                (project_id,)
+    if "X-Employee-Id" not in headers:
+        if isinstance(params_body, dict) and params_body.get("employeeId"):
+            headers["X-Employee-Id"] = str(params_body.get("employeeId"))
+        else:
+            param_mappings = _ensure_header_mapping(
+                param_mappings,
+                from_step_for_auth,
+                ["data.employeeId", "data.user.employeeId", "data.profile.employeeId", "data.empId"],
+                "X-Employee-Id"
             )
-            api_rows = cursor.fetchall()
-            api_headers_by_key = {}
-            for r in api_rows:
-                try:
-                    p = r["path"] if isinstance(r, sqlite3.Row) else r[0]
-                    m = r["method"] if isinstance(r, sqlite3.Row) else r[1]
-                    h = r["headers"] if isinstance(r, sqlite3.Row) else r[2]
-                except Exception:
-                    continue
-                api_headers_by_key[(str(m or "").upper(), str(p or ""))] = _normalize_headers_dict(_safe_json_loads(h, {}))
-
-            # 约定：第 1 步通常是登录/获取 token（从该步提取动态头）
-            from_step_for_auth = 1
-
-            for i, step in enumerate(steps):
-                if not isinstance(step, dict):
-                    continue
-
-                method = str(step.get("api_method") or step.get("method") or "GET").upper()
-                path = step.get("api_path") or step.get("path") or ""
-                key = (method, str(path))
-
-                headers = _normalize_headers_dict(step.get("headers") or {})
-                params_body = step.get("params") if isinstance(step.get("params"), dict) else {}
-                param_mappings = step.get("param_mappings")
-                if not isinstance(param_mappings, list):
-                    param_mappings = []
-
-                # 1) 合并 API 定义中的 headers（不覆盖用户已有；跳过 Authorization 静态值）
-                api_headers = api_headers_by_key.get(key) or {}
-                for hk, hv in api_headers.items():
-                    if hk.lower() == "authorization":
-                        continue
-                    if hk not in headers and hv:
-                        headers[hk] = hv
-
-                # 2) 如果 headers 里出现 ${...} 占位符，清理掉，避免“看起来有值但执行时无效”
-                for hk in list(headers.keys()):
-                    hv = headers.get(hk, "")
-                    if isinstance(hv, str) and ("${" in hv or "{{" in hv):
-                        # Authorization 必须靠 param_mappings 注入
-                        if hk.lower() == "authorization":
-                            headers.pop(hk, None)
-
-                # 3) 动态头自动补齐（优先用 step.params 的静态值；否则用 param_mappings 从第1步提取）
-                if "X-Venue-Id" not in headers:
-                    if isinstance(params_body, dict) and params_body.get("venueId"):
-                        headers["X-Venue-Id"] = str(params_body.get("venueId"))
-                    else:
-                        param_mappings = _ensure_header_mapping(
-                            param_mappings,
-                            from_step_for_auth,
-                            ["data.venueId", "data.user.venueId", "data.profile.venueId"],
-                            "X-Venue-Id"
-                        )
-
-                if "X-Employee-Id" not in headers:
-                    if isinstance(params_body, dict) and params_body.get("employeeId"):
-                        headers["X-Employee-Id"] = str(params_body.get("employeeId"))
-                    else:
-                        param_mappings = _ensure_header_mapping(
-                            param_mappings,
-                            from_step_for_auth,
-                            ["data.employeeId", "data.user.employeeId", "data.profile.employeeId", "data.empId"],
-                            "X-Employee-Id"
-                        )
-
-                # Authorization：无论 API 定义里有没有，都确保通过映射注入
-                param_mappings = _ensure_header_mapping(
-                    param_mappings,
-                    from_step_for_auth,
-                    ["data.token", "token", "data.access_token", "data.accessToken"],
-                    "Authorization"
-                )
 
-                # 4) 常见 body 依赖自动补齐：sessionId
-                # 典型链路：步骤2 open-pay 返回 data.sessionId，步骤3 close-room 需要该 sessionId
-                current_step_order = step.get("step_order") or (i + 1)
-                if isinstance(params_body, dict) and "sessionId" in params_body and int(current_step_order) > 1:
-                    # 只有在尚未配置映射时才自动添加，避免覆盖人工配置
-                    if not _has_mapping(param_mappings, "sessionId", to_type="params"):
-                        from_step_for_session = int(current_step_order) - 1
-                        # 优先尝试 data.sessionId；若不存在，执行时会回退为原始静态值
-                        param_mappings.append({
-                            "from_step": from_step_for_session,
-                            "from_field": "data.sessionId",
-                            "to_field": "sessionId",
-                            "to_type": "params"
-                        })
-
-                # 5) 通用 body 依赖自动补齐：同名字段 data.xxx -> params.xxx
-                # 只对第2步及之后生效，且不会覆盖已有人工映射
-                if isinstance(params_body, dict) and int(current_step_order) > 1:
-                    from_step_for_generic = int(current_step_order) - 1
-                    for field_name in list(params_body.keys()):
-                        # 已有专门逻辑或已配置映射的字段跳过
-                        if field_name in ("sessionId",):
-                            continue
-                        if _has_mapping(param_mappings, field_name, to_type="params"):
-                            continue
-                        # 自动假定上一步响应中存在 data.<field_name>
-                        param_mappings.append({
-                            "from_step": from_step_for_generic,
-                            "from_field": f"data.{field_name}",
-                            "to_field": field_name,
-                            "to_type": "params"
-                        })
-
-                step["headers"] = headers
-                step["param_mappings"] = param_mappings
-
-            return steps
-
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # 1. 获取场景信息
-        cursor.execute("SELECT * FROM scenarios WHERE id = ?", (scenario_id,))
-        scenario = cursor.fetchone()
-        if not scenario: raise HTTPException(status_code=404, detail="场景不存在")
-        
-        # 2. RAG: 简易语义检索 (包含完整参数和请求体以供 AI 精准识别)
-        cursor.execute("""
-            SELECT path, method, summary, description, base_url, parameters, request_body, headers
-            FROM apis 
-            WHERE project_id = ?
-        """, (scenario["project_id"],))
-        rows_apis = cursor.fetchall()
-        all_apis = [dict(row) for row in rows_apis]
-        
-        # 3. AI 编排 (增强版 - 智能识别参数依赖)
-        system_prompt = """你是个资深自动化专家。任务：根据【业务意图】和【API列表】，生成 JSON 测试步骤。
+    # Authorization：无论 API 定义里有没有，都确保通过映射注入
+    param_mappings = _ensure_header_mapping(
+        param_mappings,
+        from_step_for_auth,
+        ["data.token", "token", "data.access_token", "data.accessToken"],
+        "Authorization"
+    )
+
+    # 4) 常见 body 依赖自动补齐：sessionId
+    # 典型链路：步骤2 open-pay 返回 data.sessionId，步骤3 close-room 需要该 sessionId
+    current_step_order = step.get("step_order") or (i + 1)
+    if isinstance(params_body, dict) and "sessionId" in params_body and int(current_step_order) > 1:
+        # 只有在尚未配置映射时才自动添加，避免覆盖人工配置
+        if not _has_mapping(param_mappings, "sessionId", to_type="params"):
+            from_step_for_session = int(current_step_order) - 1
+            # 优先尝试 data.sessionId；若不存在，执行时会回退为原始静态值
+            param_mappings.append({
+                "from_step": from_step_for_session,
+                "from_field": "data.sessionId",
+                "to_field": "sessionId",
+                "to_type": "params"
+            })
+
+    # 5) 通用 body 依赖自动补齐：同名字段 data.xxx -> params.xxx
+    # 只对第2步及之后生效，且不会覆盖已有人工映射
+    if isinstance(params_body, dict) and int(current_step_order) > 1:
+        from_step_for_generic = int(current_step_order) - 1
+        for field_name in list(params_body.keys()):
+            # 已有专门逻辑或已配置映射的字段跳过
+            if field_name in ("sessionId",):
+                continue
+            if _has_mapping(param_mappings, field_name, to_type="params"):
+                continue
+            # 自动假定上一步响应中存在 data.<field_name>
+            param_mappings.append({
+                "from_step": from_step_for_generic,
+                "from_field": f"data.{field_name}",
+                "to_field": field_name,
+                "to_type": "params"
+            })
+
+    step["headers"] = headers
+    step["param_mappings"] = param_mappings
+    return step
+
+def _enhance_steps_with_headers(project_id: str, steps: List[Dict[str, Any]], api_rows: List[Dict[str, Any]]):
+    """生成用例后，自动补齐 headers + 动态依赖（如 token、员工/门店ID、sessionId 等）的 param_mappings。"""
+    if not isinstance(steps, list) or not steps:
+        return steps
+
+    api_headers_by_key = _api_headers_index(api_rows)
+    for i, step in enumerate(steps):
+        _enhance_step(step, i, api_headers_by_key)
+    return steps
+
+_background_tasks = set()
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+CASE_SYSTEM_PROMPT = """你是个资深自动化专家。任务：根据【业务意图】和【API列表】，生成 JSON 测试步骤。
 关键规则：
 1. 必须识别依赖：若 A 返回 data.token，B 需使用，则配置 param_mappings。
 2. 特别是鉴权：登录返回的 Token 必须映射到后续接口的 Headers，to_field 通常为 "Authorization"，to_type 为 "headers"。
@@ -519,34 +734,179 @@ async def generate_case(scenario_id: int):
 5. 字段区分：params 放 Body (POST/PUT)，url_params 放 Query String。
 6. 真实数据：生成符合逻辑的姓名、手机号等，不要用 {}。
 格式：{ "scenario_name": "...", "steps": [{ "step_order": 1, "api_path": "...", "api_method": "...", "params": {}, "url_params": {}, "headers": {}, "param_mappings": [{ "from_step": 1, "from_field": "data.token", "to_field": "Authorization", "to_type": "headers" }] }] }"""
-        
-        user_prompt = f"意图: {scenario['nlu_result']}\n可用 API: {json.dumps(all_apis[:50])}" 
-        case_result = await ai_client.chat(system_prompt, user_prompt)
+
+async def _prepare_case_generation(scenario_id: int, use_template: bool = True) -> Tuple[Dict, List[Dict], Optional[str], Optional[Dict]]:
+    """
+    编排前的准备：读取场景，先尝试按知识图谱模板编排，否则按意图召回接口并组装 user prompt
+
+    Returns:
+        (scenario, all_apis, user_prompt, template_case)，模板编排成功时 user_prompt 为 None
+    """
+    # 1. 获取场景信息
+    scenario = await db.fetchone("SELECT * FROM scenarios WHERE id = ?", (scenario_id,))
+    if not scenario: raise HTTPException(status_code=404, detail="场景不存在")
+
+    # 2. 接口召回：按意图给项目下的接口打分（词法 + 向量 + 图谱邻居），在 token 预算内取排名靠前的接口
+    all_apis = await db.fetchall("""
+        SELECT path, method, summary, description, base_url, parameters, request_body, headers
+        FROM apis 
+        WHERE project_id = ?
+    """, (scenario["project_id"],))
+    case_rows = await db.fetchall("SELECT steps FROM test_cases WHERE project_id = ?", (scenario["project_id"],))
+    query = f"{intent_text(scenario['nlu_result'])} {scenario.get('natural_language_input') or ''}"
+    vector_scores = await _api_vector_scores(query)
+
+    # 2.5 模板快速路径：目标接口按意图打分（不带图谱邻居加分，避免邻居被误当成目标）
+    if use_template and CASE_TEMPLATE_ENABLED and knowledge_graph is not None:
+        started = time.perf_counter()
+        template = build_template_case(
+            knowledge_graph, all_apis, rank_apis(all_apis, query, vector_scores),
+            (r["steps"] for r in case_rows), scenario.get("name")
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if template["case"] is not None and template["confidence"] >= CASE_TEMPLATE_MIN_CONFIDENCE:
+            print(f"⚡ 模板编排: {len(template['case']['steps'])} 步，置信度 {template['confidence']}，耗时 {elapsed_ms:.1f}ms")
+            generator = {"type": "template", "confidence": template["confidence"], "reason": template["reason"]}
+            return scenario, all_apis, None, {**template["case"], "generator": generator}
+        print(f"↪️ 模板置信度不足 ({template['confidence']})，使用 LLM 编排: {template['reason']}")
+
+    neighbours = merge_neighbours(
+        case_neighbours(r["steps"] for r in case_rows),
+        graph_neighbours(knowledge_graph.graph) if knowledge_graph is not None else None
+    )
+    ranked = rank_apis(all_apis, query, vector_scores, neighbours)
+    api_catalog, included = encode_apis(relevant_apis(ranked), API_PROMPT_TOKEN_BUDGET)
+    print(f"🔎 接口召回: {included}/{len(all_apis)} 个接口进入编排")
+
+    user_prompt = f"意图: {scenario['nlu_result']}\n可用 API:\n{api_catalog}"
+    return scenario, all_apis, user_prompt, None
+
+async def _save_generated_case(scenario_id: int, scenario: Dict, case_result: Dict) -> int:
+    """保存测试用例并关联到场景"""
+    def _save_case(conn):
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO test_cases (name, steps, project_id) VALUES (?, ?, ?)",
+            (case_result.get("scenario_name"), json.dumps(case_result.get("steps")), scenario["project_id"])
+        )
+        case_id = cursor.lastrowid
+        cursor.execute("UPDATE scenarios SET test_case_id = ? WHERE id = ?", (case_id, scenario_id))
+        return case_id
+
+    return await db.write(_save_case)
+
+@app.post("/api/v1/scenarios/{scenario_id}/generate-case")
+async def generate_case(scenario_id: int, refresh: bool = False, template: bool = True):
+    """
+    从海量 API 中检索并智能编排用例链
+
+    - refresh=true 时不使用 AI 响应缓存
+    - template=false 时跳过知识图谱模板，总是调用 LLM
+    返回中的 generator 说明由模板还是 LLM 编排
+    """
+    try:
+        scenario, all_apis, user_prompt, case_result = await _prepare_case_generation(scenario_id, template)
+
+        # 3. AI 编排 (增强版 - 智能识别参数依赖)
+        if case_result is None:
+            case_result = await ai_client.chat(CASE_SYSTEM_PROMPT, user_prompt, use_cache=not refresh)
+            if isinstance(case_result, dict):
+                case_result["generator"] = {"type": "llm"}
 
         # 3.5 生成后增强：自动合并 API headers，并补齐动态头映射（避免漏 X-Employee-Id / X-Venue-Id 等）
         try:
             steps = case_result.get("steps") if isinstance(case_result, dict) else None
             if isinstance(steps, list):
-                case_result["steps"] = _enhance_steps_with_headers(scenario["project_id"], steps, cursor)
+                case_result["steps"] = _enhance_steps_with_headers(scenario["project_id"], steps, all_apis)
         except Exception as _e:
             # 不阻断主流程：增强失败时仍保存 AI 产物
             print(f"DEBUG: enhance steps headers failed: {str(_e)}")
         
         # 4. 保存测试用例
-        cursor.execute(
-            "INSERT INTO test_cases (name, steps, project_id) VALUES (?, ?, ?)",
-            (case_result.get("scenario_name"), json.dumps(case_result.get("steps")), scenario["project_id"])
-        )
-        case_id = cursor.lastrowid
-        cursor.execute("UPDATE scenarios SET test_case_id = ? WHERE id = ?", (case_id, scenario_id))
-        conn.commit()
-        conn.close()
+        case_id = await _save_generated_case(scenario_id, scenario, case_result)
         return {**case_result, "name": case_result.get("scenario_name"), "id": case_id}
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/v1/scenarios/{scenario_id}/generate-case/stream")
+async def generate_case_stream(scenario_id: int, refresh: bool = False, template: bool = True):
+    """
+    流式编排：通过 Server-Sent Events 边生成边推送步骤
+
+    事件顺序: start -> (step | warning)* -> summary
+    step 为补齐 headers / param_mappings 后的步骤，模型输出中每个步骤一闭合就推送；
+    步骤引用了项目中不存在的接口时额外推送 warning。生成结束后整段输出落库，结果与非流式接口一致。
+    知识图谱模板编排成功时不调用 LLM，步骤一次性推送。
+    客户端中途断开不会中断生成，用例仍会保存。
+    """
+    scenario, all_apis, user_prompt, template_case = await _prepare_case_generation(scenario_id, template)
+    api_headers_by_key = _api_headers_index(all_apis)
+    known_apis = set(api_headers_by_key)
+
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def _run():
+        parser = StepStreamParser("steps")
+        steps = []
+
+        async def _emit(step):
+            step = _enhance_step(step, len(steps), api_headers_by_key)
+            steps.append(step)
+            await queue.put(_sse("step", step))
+            if isinstance(step, dict):
+                key = (str(step.get("api_method") or step.get("method") or "GET").upper(), str(step.get("api_path") or step.get("path") or ""))
+                if key not in known_apis:
+                    await queue.put(_sse("warning", {"step_order": step.get("step_order") or len(steps), "detail": f"接口不存在: {key[0]} {key[1]}"}))
+
+        try:
+            if template_case is not None:
+                case_result = template_case
+            else:
+                async for chunk in ai_client.chat_stream(CASE_SYSTEM_PROMPT, user_prompt, use_cache=not refresh):
+                    for step in parser.feed(chunk):
+                        await _emit(step)
+                case_result = {**parser.result(), "generator": {"type": "llm"}}
+            # 兜底：整段输出中的步骤多于增量解析出的（如步骤数组不在顶层），补齐后推送
+            final_steps = case_result.get("steps") if isinstance(case_result.get("steps"), list) else []
+            for step in final_steps[len(steps):]:
+                await _emit(step)
+            case_result["steps"] = steps
+            case_id = await _save_generated_case(scenario_id, scenario, case_result)
+            await queue.put(_sse("summary", {
+                "id": case_id,
+                "name": case_result.get("scenario_name"),
+                "total": len(steps),
+                "generator": case_result.get("generator")
+            }))
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            await queue.put(_sse("error", {"detail": str(e)}))
+        finally:
+            await queue.put(None)
+
+    task = asyncio.create_task(_run())
+    # 持有强引用，客户端断开后任务仍能跑完并落库
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+    async def _events():
+        yield _sse("start", {"scenario_id": scenario_id, "project_id": scenario["project_id"]})
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            yield item
+        await task
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # --- 执行引擎 ---
 
 class ExecutionRequest(BaseModel):
@@ -554,190 +914,58 @@ class ExecutionRequest(BaseModel):
     steps: Optional[List[Any]] = None  # 支持直接传入步骤执行
     environment: str = "test"
     base_url: str = "http://localhost:8000"
+    execution_mode: str = "sequential"  # sequential: 顺序执行; parallel: 按 param_mappings 依赖并发执行
+    response_mode: str = "full"  # full: 完整读取响应; stream: 流式读取，超限响应只保留被引用的字段
+    max_body_size: int = DEFAULT_MAX_BODY_SIZE  # stream 模式下完整保存响应体的上限（字节）
+    keep_full_body: bool = False  # 超限响应体是否落盘到 data/bodies
+    project_id: Optional[str] = None  # 直接传入 steps 时用于报表归属；执行已保存用例时取用例所属项目
+
+def _engine_options(req) -> Dict:
+    """执行请求中的响应读取参数"""
+    if req.response_mode not in RESPONSE_MODES:
+        raise HTTPException(status_code=400, detail=f"不支持的响应读取方式: {req.response_mode}")
+    return {
+        "response_mode": req.response_mode,
+        "max_body_size": req.max_body_size,
+        "body_dir": os.path.join(BASE_DIR, "data/bodies") if req.keep_full_body else None
+    }
+
+async def _load_execution_steps(req: ExecutionRequest) -> Tuple[List[Any], str]:
+    """解析执行请求中的步骤：直接传入的步骤或已保存的用例，同时返回所属项目"""
+    if req.steps:
+        return req.steps, req.project_id or "default-project"
+    if req.test_case_id:
+        case = await db.fetchone("SELECT * FROM test_cases WHERE id = ?", (req.test_case_id,))
+        if not case: raise HTTPException(status_code=404, detail="用例不存在")
+        steps = normalize_steps(json.loads(case["steps"]))
+        print(f"DEBUG: Loaded {len(steps)} steps from test_case {req.test_case_id}")
+        return steps, case["project_id"] or "default-project"
+    raise HTTPException(status_code=400, detail="必须提供 test_case_id 或 steps")
+
+def _final_status(step_results: List[Dict]) -> str:
+    return "success" if all(s.get("success", False) for s in step_results) else "failed"
 
 @app.post("/api/v1/executions")
 async def execute_case(req: ExecutionRequest):
     """万能执行引擎：支持场景用例和实时单接口执行"""
     try:
-        steps = []
-        if req.steps:
-            steps = req.steps
-        elif req.test_case_id:
-            conn = sqlite3.connect(DB_PATH)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM test_cases WHERE id = ?", (req.test_case_id,))
-            case = cursor.fetchone()
-            conn.close()
-            if not case: raise HTTPException(status_code=404, detail="用例不存在")
-            steps = json.loads(case["steps"])
-            print(f"DEBUG: Loaded {len(steps)} steps from test_case {req.test_case_id}")
-            # 自动补齐 step_order (防止 context 冲突)
-            for i, s in enumerate(steps):
-                if not s.get("step_order"): s["step_order"] = i + 1
-        else:
-            raise HTTPException(status_code=400, detail="必须提供 test_case_id 或 steps")
+        steps, project_id = await _load_execution_steps(req)
 
-        context = {} 
-        step_results = []
-        
-        def get_value_by_path(data, path):
-            """支持 a.b.c 路径提取"""
-            if data is None or not path: return None
-            parts = path.split('.')
-            curr = data
-            for p in parts:
-                if isinstance(curr, dict) and p in curr: curr = curr[p]
-                elif isinstance(curr, list) and p.isdigit(): # 支持数组索引
-                    idx = int(p)
-                    if idx < len(curr): curr = curr[idx]
-                    else: return None
-                else: return None
-            return curr
-
-        async with httpx.AsyncClient(verify=False) as client:
-            for i, step in enumerate(steps):
-                step_order = step.get("step_order", i + 1)
-                print(f"DEBUG: Starting step {step_order} [{step.get('api_method', 'GET')} {step.get('api_path')}]")
-                start_time = datetime.now()
-                
-                # 确定 Base URL
-                current_base_url = req.base_url.strip() if req.base_url else ""
-                if not current_base_url or current_base_url == "http://localhost:8000":
-                    current_base_url = (step.get("base_url") or "").strip()
-                if not current_base_url:
-                    current_base_url = "http://localhost:8000"
-
-                step_data = {
-                    "step_order": step_order,
-                    "url": "",
-                    "method": step.get("api_method", step.get("method", "GET")).upper(),
-                    "request_data": step.get("params", {}),
-                    "request_headers": step.get("headers", {}).copy(),
-                    "success": False,
-                    "status_code": "Error"
-                }
-                
-                try:
-                    api_path = step.get('api_path', step.get('path', ''))
-                    safe_path = urllib.parse.quote(api_path.lstrip('/'), safe="/?=&")
-                    url = f"{current_base_url.rstrip('/')}/{safe_path}"
-                    step_data["url"] = url
-                    
-                    params_body = (step.get("params") or {}).copy()
-                    params_query = (step.get("url_params") or {}).copy()
-                    request_headers = (step.get("headers") or {}).copy()
-                    method = step_data["method"]
-                    
-                    # 记录提取过程
-                    extractions = []
-                    
-                    # 深度依赖映射处理
-                    for mapping in step.get("param_mappings", []):
-                        from_step_idx = mapping.get("from_step")
-                        from_field = mapping.get("from_field")
-                        to_field = mapping.get("to_field")
-                        to_type = mapping.get("to_type", "params") 
-                        
-                        if from_step_idx is None or to_field is None: continue
-                        
-                        # 创建提取记录
-                        extraction = {
-                            "from_step": from_step_idx,
-                            "from_field": from_field,
-                            "to_field": to_field,
-                            "to_type": to_type,
-                            "success": False,
-                            "extracted_value": None,
-                            "error_msg": None
-                        }
-                        
-                        search_key = f"step_{from_step_idx}"
-                        from_data = context.get(search_key, {}).get("response")
-                        field_val = get_value_by_path(from_data, from_field)
-                        
-                        # 调试日志
-                        print(f"DEBUG: Extracting from step {from_step_idx}")
-                        print(f"DEBUG: from_field = {from_field}")
-                        print(f"DEBUG: extracted value = {str(field_val)[:50] if field_val else 'None'}...")
-                        
-                        if field_val is not None:
-                            extraction["success"] = True
-                            extraction["extracted_value"] = str(field_val)[:100] if len(str(field_val)) > 100 else field_val
-                            
-                            if to_type == "headers": 
-                                val_str = str(field_val)
-                                if to_field.lower() == "authorization" and not val_str.lower().startswith("bearer "):
-                                    val_str = f"Bearer {val_str}"
-                                request_headers[to_field] = val_str
-                                print(f"DEBUG: Set header {to_field} = {val_str[:50]}...")
-                            elif to_type == "url_params" or to_type == "query": 
-                                params_query[to_field] = field_val
-                            else: 
-                                params_body[to_field] = field_val
-                        else:
-                            extraction["error_msg"] = f"无法从步骤{from_step_idx}提取{from_field}"
-                            print(f"DEBUG: WARNING - Could not extract {from_field} from step {from_step_idx}")
-                        
-                        extractions.append(extraction)
-
-                    step_data["request_data"] = params_body
-                    step_data["url_params"] = params_query
-                    step_data["request_headers"] = request_headers
-                    step_data["extractions"] = extractions  # 添加提取记录
-                    
-                    # 2. 发送请求
-                    res = await client.request(
-                        method, 
-                        url, 
-                        params=params_query if params_query else None, 
-                        json=params_body if method != "GET" and params_body else None, 
-                        headers=request_headers,
-                        timeout=15.0
-                    )
-                    duration = (datetime.now() - start_time).total_seconds()
-                    print(f"DEBUG: Step {step_order} response status: {res.status_code}")
-                    
-                    res_content = res.text
-                    try: res_content = res.json()
-                    except: pass
-                    
-                    # 关键修复：深拷贝一份数据放入 context，防止后续引用修改
-                    step_data.update({
-                        "status_code": res.status_code,
-                        "duration": duration,
-                        "response": res_content,
-                        "success": res.status_code < 400
-                    })
-                    
-                    # 调试日志
-                    print(f"DEBUG: Saving step {step_order} to context")
-                    if isinstance(res_content, dict) and 'data' in res_content:
-                        if 'token' in res_content.get('data', {}):
-                            token_val = res_content['data']['token']
-                            print(f"DEBUG: Response contains token: {str(token_val)[:30]}...")
-                    
-                    context[f"step_{step_order}"] = json.loads(json.dumps(step_data, default=str)) 
-                    step_results.append(step_data)
-                except Exception as e:
-                    import traceback
-                    print(f"CRITICAL ERROR in Step {step_order}:")
-                    traceback.print_exc()
-                    step_data["error"] = f"{type(e).__name__}: {str(e)}"
-                    step_results.append(step_data)
+        if req.execution_mode not in EXECUTION_MODES:
+            raise HTTPException(status_code=400, detail=f"不支持的执行模式: {req.execution_mode}")
+        engine_options = _engine_options(req)
+
+        async with http_pool.client(verify=False) as client:
+            engine = ExecutionEngine(client, base_url=req.base_url, mode=req.execution_mode, **engine_options)
+            step_results = await engine.run(steps)
 
         # 4. 保存执行记录
-        final_status = "success" if all(s.get("success", False) for s in step_results) else "failed"
+        final_status = _final_status(step_results)
+        def _save(conn):
+            return save_execution(conn.cursor(), blob_store, req.test_case_id, final_status, step_results, project_id, environment=req.environment)
+
         try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO executions (test_case_id, status, results) VALUES (?, ?, ?)",
-                (req.test_case_id or 0, final_status, json.dumps(step_results))
-            )
-            exec_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            exec_id = await db.write(_save)
         except:
             exec_id = 0
         
@@ -747,6 +975,206 @@ async def execute_case(req: ExecutionRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/v1/executions/stream")
+async def execute_case_stream(req: ExecutionRequest):
+    """
+    流式执行：通过 Server-Sent Events 逐步推送结果
+
+    事件顺序: start -> (step, progress)* -> summary
+    客户端中途断开不会中断执行，结果仍会完整落库。
+    """
+    steps, project_id = await _load_execution_steps(req)
+    if req.execution_mode not in EXECUTION_MODES:
+        raise HTTPException(status_code=400, detail=f"不支持的执行模式: {req.execution_mode}")
+    engine_options = _engine_options(req)
+
+    # 先落一条 running 记录，开始事件即可带上执行 ID
+    saved = await db.execute(
+        "INSERT INTO executions (test_case_id, status, results) VALUES (?, ?, ?)",
+        (req.test_case_id or 0, "running", "[]")
+    )
+    exec_id = saved["lastrowid"]
+
+    queue: asyncio.Queue = asyncio.Queue()
+    total = len(steps)
+
+    async def _run():
+        completed = 0
+        passed = 0
+
+        async def _on_step(result: Dict):
+            nonlocal completed, passed
+            completed += 1
+            passed += 1 if result.get("success") else 0
+            await queue.put(_sse("step", result))
+            await queue.put(_sse("progress", {"completed": completed, "total": total, "passed": passed}))
+
+        step_results = []
+        final_status = "failed"
+        try:
+            async with http_pool.client(verify=False) as client:
+                engine = ExecutionEngine(client, base_url=req.base_url, mode=req.execution_mode, on_step=_on_step, **engine_options)
+                step_results = await engine.run(steps)
+            final_status = _final_status(step_results)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            await queue.put(_sse("error", {"detail": str(e)}))
+        finally:
+            def _save(conn):
+                save_execution(conn.cursor(), blob_store, req.test_case_id, final_status, step_results, project_id, exec_id, environment=req.environment)
+
+            try:
+                await db.write(_save)
+            except Exception as e:
+                print(f"❌ 保存执行记录失败: {str(e)}")
+            await queue.put(_sse("summary", {
+                "id": exec_id,
+                "status": final_status,
+                "total": total,
+                "passed": sum(1 for s in step_results if s.get("success")),
+                "failed": sum(1 for s in step_results if not s.get("success"))
+            }))
+            await queue.put(None)
+
+    task = asyncio.create_task(_run())
+    # 持有强引用，客户端断开后任务仍能跑完并落库
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+    async def _events():
+        yield _sse("start", {"id": exec_id, "total": total, "execution_mode": req.execution_mode})
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            yield item
+        await task
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# 批量执行时单个请求允许的最大并发用例数
+SUITE_MAX_CONCURRENCY = int(os.getenv("SUITE_MAX_CONCURRENCY", "64"))
+
+class SuiteExecutionRequest(BaseModel):
+    test_case_ids: Optional[List[int]] = None
+    project_id: Optional[str] = None  # 未指定 test_case_ids 时执行项目下全部用例
+    concurrency: int = Field(8, ge=1, le=SUITE_MAX_CONCURRENCY)
+    environment: str = "test"
+    base_url: str = "http://localhost:8000"
+    execution_mode: str = "sequential"
+    response_mode: str = "full"
+    max_body_size: int = DEFAULT_MAX_BODY_SIZE
+    keep_full_body: bool = False
+
+@app.post("/api/v1/executions/suite")
+async def execute_suite(req: SuiteExecutionRequest):
+    """批量执行用例：有界并发 + 共享连接池 + 单事务落库"""
+    if req.execution_mode not in EXECUTION_MODES:
+        raise HTTPException(status_code=400, detail=f"不支持的执行模式: {req.execution_mode}")
+    engine_options = _engine_options(req)
+    if not req.test_case_ids and not req.project_id:
+        raise HTTPException(status_code=400, detail="必须提供 test_case_ids 或 project_id")
+
+    if req.test_case_ids:
+        placeholders = ",".join("?" * len(req.test_case_ids))
+        found = await db.fetchall(f"SELECT id, steps, project_id FROM test_cases WHERE id IN ({placeholders})", req.test_case_ids)
+    else:
+        found = await db.fetchall("SELECT id, steps, project_id FROM test_cases WHERE project_id = ? ORDER BY id", (req.project_id,))
+    rows = {row["id"]: row for row in found}
+
+    case_ids = req.test_case_ids or list(rows.keys())
+    missing = [cid for cid in case_ids if cid not in rows]
+    cases = []
+    for cid in case_ids:
+        if cid not in rows:
+            continue
+        try:
+            steps = normalize_steps(json.loads(rows[cid]["steps"] or "[]"))
+        except Exception:
+            steps = []
+        cases.append({"test_case_id": cid, "steps": steps})
+
+    print(f"🚀 批量执行 {len(cases)} 个用例 | 并发: {req.concurrency} | 模式: {req.execution_mode}")
+    start_time = datetime.now()
+    case_results = await run_suite(cases, http_pool, base_url=req.base_url, mode=req.execution_mode, concurrency=req.concurrency, **engine_options)
+    total_time = (datetime.now() - start_time).total_seconds()
+
+    # 单事务批量写入执行记录
+    def _save_all(conn):
+        cursor = conn.cursor()
+        ids = []
+        for result in case_results:
+            project_id = rows[result["test_case_id"]]["project_id"] or "default-project"
+            ids.append(save_execution(cursor, blob_store, result["test_case_id"], result["status"], result["results"], project_id, environment=req.environment))
+        return ids
+
+    try:
+        for result, exec_id in zip(case_results, await db.write(_save_all)):
+            result["id"] = exec_id
+    except Exception as e:
+        print(f"❌ 批量写入执行记录失败: {str(e)}")
+        for result in case_results:
+            result["id"] = 0
+
+    passed = sum(1 for r in case_results if r["status"] == "success")
+    return {
+        "status": "success" if passed == len(case_results) and not missing else "failed",
+        "summary": {
+            "total": len(case_results),
+            "passed": passed,
+            "failed": len(case_results) - passed,
+            "missing": missing,
+            "total_time": total_time
+        },
+        "executions": case_results
+    }
+
+@app.get("/api/v1/executions/pool-stats")
+async def get_http_pool_stats():
+    """执行引擎 HTTP 连接池使用情况"""
+    return http_pool.stats()
+
+@app.get("/api/v1/ai/client-stats")
+async def get_ai_client_stats():
+    """LLM 调用的限流、并发、重试统计，以及各供应商的熔断状态和对冲情况"""
+    return {**ai_client.clients.stats(), "routing": ai_client.router.stats()}
+
+@app.get("/api/v1/ai/cache/stats")
+async def get_ai_cache_stats():
+    """AI 响应缓存的命中率、节省的耗时与 token"""
+    if ai_client.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **await ai_client.cache.get_stats()}
+
+@app.delete("/api/v1/ai/cache")
+async def clear_ai_cache():
+    """清空 AI 响应缓存"""
+    if ai_client.cache is None:
+        return {"success": True, "deleted": 0}
+    return {"success": True, "deleted": await ai_client.cache.clear()}
+
+@app.get("/api/v1/executions/{exec_id}")
+async def get_execution(exec_id: int):
+    """获取执行记录，按引用还原各步骤的请求 / 响应体"""
+    def _load(conn):
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM executions WHERE id = ?", (exec_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        execution = dict(row)
+        execution["results"] = blob_store.unpack_results(cursor, execution["results"])
+        return execution
+
+    execution = await db.read(_load)
+    if not execution: raise HTTPException(status_code=404, detail="执行记录不存在")
+    return execution
+
 # --- 导入与列表 (保持原有逻辑) ---
 
 class ProjectBase(BaseModel):
@@ -769,34 +1197,36 @@ class CurlParseRequest(BaseModel):
 
 class StressTestRequest(BaseModel):
     api_id: int
-    test_count: int = 10
-    expected_debounce_time: int = 500
-    request_interval: int = 100
+    mode: str = "load"  # load: 负载压测; debounce: 防抖/重复提交探测
+    test_count: int = 10  # load: 未指定 duration 时的总请求数; debounce: 并发突发的请求数
+    expected_debounce_time: int = 500  # 预期防抖窗口(ms)
+    request_interval: int = 100  # 额外探测的请求间隔(ms)
+    # 负载配置
+    concurrency: int = 10  # 固定并发数；RPS 模式下为最大在途请求数
+    target_rps: Optional[float] = None  # 设置后按目标 RPS 发压
+    duration: Optional[float] = None  # 持续时间(秒)
+    ramp_up: float = 0  # 爬坡时间(秒)
+    workers: int = 1  # 发压进程数
+    timeout: float = 15.0
+    base_url: Optional[str] = None
+    headers: Optional[Dict[str, str]] = None
+    body: Optional[Any] = None
+    params: Optional[Dict[str, Any]] = None
 
 @app.get("/api/v1/projects")
 async def list_projects():
     """获取系统中所有项目信息"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM projects ORDER BY created_at DESC")
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    return await db.fetchall("SELECT * FROM projects ORDER BY created_at DESC")
 
 @app.post("/api/v1/projects")
 async def create_project(project: ProjectBase):
     """创建新项目 (自动生成唯一 ID)"""
     try:
         project_id = str(uuid.uuid4())[:8] # 使用 8 位短 UUID
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
+        await db.execute(
             "INSERT INTO projects (id, name, description) VALUES (?, ?, ?)",
             (project_id, project.name, project.description)
         )
-        conn.commit()
-        conn.close()
         return {"success": True, "project_id": project_id, "name": project.name}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -806,8 +1236,7 @@ async def delete_project(project_id: str):
     """删除项目及其关联数据"""
     if project_id == "default-project":
         raise HTTPException(status_code=400, detail="不能删除默认项目")
-    try:
-        conn = sqlite3.connect(DB_PATH)
+    def _delete(conn):
         cursor = conn.cursor()
         
         # 删除项目、API、环境、用例、场景等
@@ -816,9 +1245,9 @@ async def delete_project(project_id: str):
         cursor.execute("DELETE FROM project_environments WHERE project_id = ?", (project_id,))
         cursor.execute("DELETE FROM scenarios WHERE project_id = ?", (project_id,))
         cursor.execute("DELETE FROM test_cases WHERE project_id = ?", (project_id,))
-        
-        conn.commit()
-        conn.close()
+
+    try:
+        await db.write(_delete)
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -863,15 +1292,15 @@ async def import_swagger(project_id: str = Form("default-project"), source: str
                         project_id
                     ))
         
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM apis WHERE project_id = ?", (project_id,))
-        cursor.executemany("""
-            INSERT INTO apis (path, method, summary, description, base_url, parameters, request_body, project_id) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, apis)
-        conn.commit()
-        conn.close()
+        def _replace_apis(conn):
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM apis WHERE project_id = ?", (project_id,))
+            cursor.executemany("""
+                INSERT INTO apis (path, method, summary, description, base_url, parameters, request_body, project_id) 
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, apis)
+
+        await db.write(_replace_apis)
         
         return {"success": True, "indexed": len(apis), "total": len(apis), "project_id": project_id}
     except Exception as e:
@@ -885,17 +1314,13 @@ async def create_api(api: APIBase):
             if isinstance(val, (dict, list)): return json.dumps(val)
             return str(val)
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
+        await db.execute("""
             INSERT INTO apis (path, method, summary, description, base_url, parameters, request_body, headers, project_id)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             api.path, api.method, api.name, api.description, api.base_url,
             to_json(api.parameters), to_json(api.request_body), to_json(api.headers), api.project_id
         ))
-        conn.commit()
-        conn.close()
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -908,9 +1333,7 @@ async def update_api(api_id: int, api: APIBase):
             if isinstance(val, (dict, list)): return json.dumps(val)
             return str(val)
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
+        await db.execute("""
             UPDATE apis SET 
                 path = ?, method = ?, summary = ?, description = ?, 
                 base_url = ?, parameters = ?, request_body = ?, headers = ?, project_id = ?
@@ -920,8 +1343,6 @@ async def update_api(api_id: int, api: APIBase):
             to_json(api.parameters), to_json(api.request_body), to_json(api.headers), api.project_id,
             api_id
         ))
-        conn.commit()
-        conn.close()
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -930,21 +1351,17 @@ async def update_api(api_id: int, api: APIBase):
 async def delete_api_entry(api_id: int):
     """删除单个接口定义"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM apis WHERE id = ?", (api_id,))
-        conn.commit()
-        conn.close()
+        await db.execute("DELETE FROM apis WHERE id = ?", (api_id,))
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/v1/parse/curl")
-async def parse_curl_command(req: CurlParseRequest):
-    """使用 AI 极速解析 cURL"""
+async def parse_curl_command(req: CurlParseRequest, refresh: bool = False):
+    """使用 AI 极速解析 cURL（refresh=true 时不使用 AI 响应缓存）"""
     try:
         system_prompt = "你是一个接口专家。解析 cURL 并返回 JSON：{name(中文名), method, path, base_url, headers, request_body, parameters}。无则返回默认值。"
-        result = await ai_client.chat(system_prompt, req.curl)
+        result = await ai_client.chat(system_prompt, req.curl, use_cache=not refresh)
         if "body" in result and "request_body" not in result:
             result["request_body"] = result["body"]
         return result
@@ -953,39 +1370,134 @@ async def parse_curl_command(req: CurlParseRequest):
 
 @app.post("/api/v1/test/stress-test")
 async def api_stress_test(req: StressTestRequest):
-    """简单的压测分析接口（占位实现）"""
-    # 这里可以添加真实的并发测试逻辑，目前返回模拟数据以支持前端 UI 展示
+    """接口压测：对已存储的 API 发起真实负载，统计延迟分布、错误与实际吞吐；debounce 模式探测重复提交"""
+    if req.mode not in ("load", "debounce"):
+        raise HTTPException(status_code=400, detail=f"不支持的压测模式: {req.mode}")
+    if req.concurrency < 1 or req.workers < 1:
+        raise HTTPException(status_code=400, detail="concurrency 与 workers 必须大于 0")
+    if req.target_rps is not None and req.target_rps <= 0:
+        raise HTTPException(status_code=400, detail="target_rps 必须大于 0")
+    if req.duration is not None and not (0 < req.duration <= MAX_STRESS_DURATION):
+        raise HTTPException(status_code=400, detail=f"duration 必须在 0 ~ {MAX_STRESS_DURATION} 秒之间")
+
+    api = await db.fetchone("SELECT * FROM apis WHERE id = ?", (req.api_id,))
+    if not api:
+        raise HTTPException(status_code=404, detail="接口不存在")
+
+    spec = build_request_spec(
+        api,
+        base_url=req.base_url or "",
+        overrides={"headers": req.headers, "body": req.body, "params": req.params}
+    )
+
+    if req.mode == "debounce":
+        if not (2 <= req.test_count <= MAX_BURST_REQUESTS):
+            raise HTTPException(status_code=400, detail=f"debounce 模式的 test_count 必须在 2 ~ {MAX_BURST_REQUESTS} 之间")
+        print(f"🎯 防抖探测开始 | {spec['method']} {spec['url']} | 突发: {req.test_count} | 窗口: {req.expected_debounce_time}ms")
+        try:
+            return await run_debounce_probe(
+                spec,
+                burst_count=req.test_count,
+                expected_debounce_ms=req.expected_debounce_time,
+                request_interval_ms=req.request_interval,
+                timeout=req.timeout
+            )
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"防抖探测失败: {str(e)}")
+
+    config = {
+        "concurrency": req.concurrency,
+        "target_rps": req.target_rps,
+        "duration": req.duration,
+        "total_requests": req.test_count,
+        "ramp_up": req.ramp_up,
+        "timeout": req.timeout
+    }
+    print(f"🔥 压测开始 | {spec['method']} {spec['url']} | {config}")
+    try:
+        result = await run_load_test(spec, config, workers=req.workers)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"压测失败: {str(e)}")
+
     return {
         "analysis": {
             "has_debounce": False,
-            "confidence": 100,
-            "reasons": ["目前仅作为功能测试返回值"]
-        },
-        "stats": {
-            "total_requests": req.test_count,
-            "successful_requests": req.test_count,
-            "avg_duration": 0.05,
-            "total_time": req.test_count * 0.1
+            "confidence": 0,
+            "reasons": ["负载模式不做防抖判断"]
         },
-        "test_results": [
-            {
-                "request_id": i + 1,
-                "success": True,
-                "duration": 0.05,
-                "status_code": 200,
-                "response": {"message": "Success"}
-            } for i in range(req.test_count)
-        ]
+        **result
     }
 
+@app.get("/api/v1/apis/search")
+async def search_api_catalog(q: str, project_id: Optional[str] = None, method: Optional[str] = None, limit: int = 20):
+    """
+    接口检索（本地 FTS5 索引）
+
+    按路径、摘要、描述和参数名分词匹配并按相关度排序，结果不足时补充路径 / 摘要的模糊匹配
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="检索内容不能为空")
+    return {"results": await db.read(search_apis, q, project_id, method, limit)}
+
 @app.get("/api/v1/apis")
-async def list_apis():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM apis ORDER BY created_at DESC")
-    rows = cursor.fetchall()
-    conn.close()
+async def list_apis(
+    response: Response,
+    project_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    view: str = "full"
+):
+    """
+    接口列表
+
+    - project_id: 只返回该项目的接口
+    - limit / cursor: 游标分页；不传 limit 时返回全部，next_cursor 为空表示没有下一页
+      （与场景列表一致，下一页游标同时放在响应头 X-Next-Cursor 中）
+    - view: full 返回完整定义；summary 只返回摘要列，不解析 parameters / request_body / headers
+    """
+    if view not in ("full", "summary"):
+        raise HTTPException(status_code=400, detail=f"不支持的 view: {view}")
+    conditions, params = [], []
+    if project_id:
+        conditions.append("project_id = ?")
+        params.append(project_id)
+    try:
+        after, after_params = keyset_clause(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if after:
+        conditions.append(after)
+        params.extend(after_params)
+    limit = clamp_limit(limit)
+
+    columns = "id, path, method, summary, base_url, project_id, created_at" if view == "summary" else "*"
+    sql = f"SELECT {columns} FROM apis"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY " + order_clause()
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+
+    rows, next_cursor = page(await db.fetchall(sql, params), limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if view == "summary":
+        return {"apis": [
+            {
+                "id": r["id"],
+                "path": r["path"],
+                "method": r["method"],
+                "name": r["summary"] or r["path"],
+                "base_url": r["base_url"],
+                "project_id": r["project_id"],
+                "created_at": r["created_at"]
+            } for r in rows
+        ], "next_cursor": next_cursor}
     return {"apis": [
         {
             "id": r["id"], 
@@ -1000,7 +1512,67 @@ async def list_apis():
             "project_id": r["project_id"],
             "tags": []
         } for r in rows
-    ]}
+    ], "next_cursor": next_cursor}
+
+# --- 测试报告 ---
+
+@app.get("/api/v1/reports/overview")
+async def get_report_overview(project_id: str = "default-project", time_range: str = "7d", scenario_id: Optional[int] = None):
+    """概览统计（读取小时 / 天汇总表）"""
+    try:
+        return await report_service.get_overview_stats(project_id, time_range, scenario_id=scenario_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"无效的时间范围: {time_range}")
+
+@app.get("/api/v1/reports/trends")
+async def get_report_trends(project_id: str = "default-project", metric: str = "success_rate", days: int = 30, scenario_id: Optional[int] = None):
+    """按天的趋势数据 (metric: success_rate, response_time, execution_count)"""
+    return await report_service.get_trend_data(project_id, metric, days, scenario_id=scenario_id)
+
+@app.get("/api/v1/reports/api-stats")
+async def get_report_api_stats(project_id: str = "default-project", days: int = 30, sort_by: str = "total", limit: int = 20):
+    """各接口的调用次数、成功率与响应时间（sort_by: total, slowest, failure_rate）"""
+    try:
+        return await report_service.get_api_stats(project_id, days=days, sort_by=sort_by, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/v1/reports/latency")
+async def get_report_latency(
+    project_id: str = "default-project",
+    dimension: str = "api",
+    days: int = 30,
+    key: Optional[str] = None,
+    interval: str = "total"
+):
+    """
+    响应时间分位数 p50 / p90 / p99
+
+    - dimension: api（维度值 "METHOD path"）/ scenario（场景 ID，整次执行耗时）/ environment（环境名）
+    - interval: total 合并整个窗口；day / month 返回按天 / 按月的趋势
+    """
+    try:
+        return await report_service.get_latency_quantiles(project_id, dimension, days=days, key=key, interval=interval)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/v1/reports/regressions")
+async def get_report_regressions(
+    project_id: str = "default-project",
+    recent_days: int = 1,
+    baseline_days: int = 14,
+    scenario_id: Optional[int] = None,
+    recent_runs: Optional[int] = None,
+    baseline_runs: int = 30
+):
+    """响应时间回归：最近窗口相对基线窗口耗时显著上升的接口"""
+    try:
+        return await report_service.get_latency_regressions(
+            project_id, recent_days, baseline_days, scenario_id=scenario_id,
+            recent_runs=recent_runs, baseline_runs=baseline_runs
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 if __name__ == "__main__":
     print(f"🚀 启动统一后端 (Unified Backend)... 数据库: {DB_PATH}")
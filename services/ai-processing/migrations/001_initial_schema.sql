@@ -0,0 +1,69 @@
+-- 基础表结构（原 init_database 中的建表语句）
+-- 已有数据库执行时均为 IF NOT EXISTS，不影响现有数据
+
+-- API 表
+CREATE TABLE IF NOT EXISTS apis (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    method TEXT NOT NULL,
+    summary TEXT,
+    description TEXT,
+    base_url TEXT,
+    parameters TEXT, -- JSON 存储
+    request_body TEXT, -- JSON 存储
+    headers TEXT, -- JSON 存储
+    project_id TEXT DEFAULT 'default-project',
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 场景表
+CREATE TABLE IF NOT EXISTS scenarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    description TEXT,
+    natural_language_input TEXT,
+    project_id TEXT DEFAULT 'default-project',
+    nlu_result TEXT,
+    test_case_id INTEGER,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 测试用例表 (步骤序列)
+CREATE TABLE IF NOT EXISTS test_cases (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    steps TEXT, -- JSON 存储步骤
+    project_id TEXT DEFAULT 'default-project',
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 执行记录表
+CREATE TABLE IF NOT EXISTS executions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    test_case_id INTEGER,
+    status TEXT, -- success, fail, running
+    results TEXT, -- JSON 存储各步详情
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 项目环境配置表
+CREATE TABLE IF NOT EXISTS project_environments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id TEXT NOT NULL,
+    env_name TEXT NOT NULL, -- 如 test, dev, prod
+    base_url TEXT NOT NULL,
+    is_default INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(project_id, env_name)
+);
+
+-- 项目表
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 默认项目
+INSERT OR IGNORE INTO projects (id, name, description) VALUES ('default-project', '默认项目', '系统自动创建的默认项目');
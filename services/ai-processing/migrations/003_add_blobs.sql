@@ -0,0 +1,9 @@
+-- 执行载荷表 (executions.results 中的请求/响应体按哈希去重)
+
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY, -- sha256(原始内容)
+    codec TEXT NOT NULL, -- zstd, gzip
+    size INTEGER NOT NULL, -- 原始字节数
+    data BLOB NOT NULL,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
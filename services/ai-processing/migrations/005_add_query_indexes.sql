@@ -0,0 +1,14 @@
+-- 常用查询索引
+-- 创建时间: 2026-10-16
+
+-- 按项目列出 / 按 (method, path) 匹配接口
+CREATE INDEX IF NOT EXISTS idx_apis_project_method_path ON apis(project_id, method, path);
+
+-- 按用例查询执行历史
+CREATE INDEX IF NOT EXISTS idx_executions_test_case_created ON executions(test_case_id, created_at);
+
+-- 按项目列出场景
+CREATE INDEX IF NOT EXISTS idx_scenarios_project_created ON scenarios(project_id, created_at);
+
+-- 批量执行按项目取用例
+CREATE INDEX IF NOT EXISTS idx_test_cases_project_id ON test_cases(project_id);
@@ -0,0 +1,6 @@
+-- 列表接口游标分页索引 (按 created_at, id 倒序)
+-- 创建时间: 2026-10-16
+
+CREATE INDEX IF NOT EXISTS idx_apis_project_created ON apis(project_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_apis_created ON apis(created_at);
+CREATE INDEX IF NOT EXISTS idx_scenarios_created ON scenarios(created_at);
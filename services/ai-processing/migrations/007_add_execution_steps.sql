@@ -0,0 +1,25 @@
+-- 执行步骤明细表 (从 executions.results 拆出，供报表按接口聚合)
+-- 创建时间: 2026-10-16
+
+CREATE TABLE IF NOT EXISTS execution_steps (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    execution_id INTEGER NOT NULL,
+    test_case_id INTEGER,
+    project_id TEXT,
+    step_order INTEGER,
+    method TEXT,
+    path TEXT, -- 接口路径模板 (api_path)，与 apis 表对应
+    status_code INTEGER, -- 请求异常时为 NULL
+    duration_ms REAL,
+    success INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    extractions_total INTEGER DEFAULT 0,
+    extractions_failed INTEGER DEFAULT 0,
+    extractions TEXT, -- JSON: [{from_step, from_field, to_field, to_type, success, error_msg}]
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (execution_id) REFERENCES executions(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_execution_steps_execution ON execution_steps(execution_id);
+CREATE INDEX IF NOT EXISTS idx_execution_steps_project_created ON execution_steps(project_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_execution_steps_api ON execution_steps(project_id, method, path, created_at);
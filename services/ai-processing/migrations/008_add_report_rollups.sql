@@ -0,0 +1,37 @@
+-- 报表汇总表：按小时 / 按天，分项目、分场景累计执行统计
+-- 执行完成时增量更新；历史数据用 python -m services.report_rollup <db_path> 回填
+-- 创建时间: 2026-10-16
+
+-- 执行记录归属（汇总维度）
+ALTER TABLE executions ADD COLUMN project_id TEXT;
+ALTER TABLE executions ADD COLUMN scenario_id INTEGER; -- 0 表示未关联场景（直接传入 steps 执行）
+
+CREATE TABLE IF NOT EXISTS rollup_hourly (
+    bucket TEXT NOT NULL, -- UTC 小时: 2026-01-01 08:00:00
+    project_id TEXT NOT NULL,
+    scenario_id INTEGER NOT NULL DEFAULT 0,
+    executions INTEGER NOT NULL DEFAULT 0,
+    success_executions INTEGER NOT NULL DEFAULT 0,
+    steps INTEGER NOT NULL DEFAULT 0,
+    success_steps INTEGER NOT NULL DEFAULT 0,
+    duration_sum_ms REAL NOT NULL DEFAULT 0, -- 步骤耗时之和
+    duration_count INTEGER NOT NULL DEFAULT 0, -- 有耗时的步骤数
+    PRIMARY KEY (project_id, bucket, scenario_id)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_daily (
+    bucket TEXT NOT NULL, -- UTC 日期: 2026-01-01
+    project_id TEXT NOT NULL,
+    scenario_id INTEGER NOT NULL DEFAULT 0,
+    executions INTEGER NOT NULL DEFAULT 0,
+    success_executions INTEGER NOT NULL DEFAULT 0,
+    steps INTEGER NOT NULL DEFAULT 0,
+    success_steps INTEGER NOT NULL DEFAULT 0,
+    duration_sum_ms REAL NOT NULL DEFAULT 0,
+    duration_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, bucket, scenario_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_hourly_scenario ON rollup_hourly(scenario_id, bucket);
+CREATE INDEX IF NOT EXISTS idx_rollup_daily_scenario ON rollup_daily(scenario_id, bucket);
+CREATE INDEX IF NOT EXISTS idx_executions_project_created ON executions(project_id, created_at);
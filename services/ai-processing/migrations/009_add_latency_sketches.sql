@@ -0,0 +1,16 @@
+-- 响应时间分位数草图 (DDSketch)，按天分桶，可跨天 / 跨进程合并
+-- 格式见 services/latency_sketch.py；历史数据用 python -m services.report_rollup <db_path> 重建
+-- 创建时间: 2026-10-16
+
+-- 执行时使用的环境（environment 维度）
+ALTER TABLE executions ADD COLUMN environment TEXT;
+
+CREATE TABLE IF NOT EXISTS latency_sketches (
+    project_id TEXT NOT NULL,
+    dimension TEXT NOT NULL, -- api / scenario / environment
+    bucket TEXT NOT NULL, -- UTC 日期: 2026-01-01
+    dim_key TEXT NOT NULL, -- "METHOD path" / 场景 ID / 环境名
+    count INTEGER NOT NULL DEFAULT 0,
+    sketch BLOB NOT NULL,
+    PRIMARY KEY (project_id, dimension, bucket, dim_key)
+);
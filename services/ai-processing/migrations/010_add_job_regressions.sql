@@ -0,0 +1,4 @@
+-- 定时任务每次运行后的响应时间回归检测结果
+-- 创建时间: 2026-10-16
+
+ALTER TABLE job_executions ADD COLUMN latency_regressions TEXT; -- JSON 数组，见 services/regression_detector.py
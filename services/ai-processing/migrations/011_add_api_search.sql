@@ -0,0 +1,64 @@
+-- 接口目录全文检索：FTS5 分词索引 + trigram 模糊索引
+-- 由 apis 表上的触发器保持同步（导入、新增、修改、删除都会自动更新），查询见 services/api_search.py
+-- 创建时间: 2026-10-16
+
+-- 参与检索的字段；parameters 为 JSON，取出参数名（数组元素的 name 或对象的 key）
+CREATE VIEW IF NOT EXISTS apis_search_source AS
+SELECT
+    a.id,
+    a.path,
+    COALESCE(a.summary, '') AS summary,
+    COALESCE(a.description, '') AS description,
+    CASE WHEN json_valid(a.parameters) THEN COALESCE((
+        SELECT group_concat(
+            CASE
+                WHEN typeof(j.key) = 'text' THEN j.key
+                WHEN j.type = 'object' THEN json_extract(j.value, '$.name')
+                WHEN j.type = 'text' THEN j.value
+            END, ' ')
+        FROM json_each(a.parameters) j
+    ), '') ELSE '' END AS param_names,
+    a.method,
+    a.project_id
+FROM apis a;
+
+-- 分词索引：路径按 / 和 {} 拆成单词，支持前缀匹配和 bm25 排序
+CREATE VIRTUAL TABLE IF NOT EXISTS apis_fts USING fts5(
+    path, summary, description, param_names,
+    method UNINDEXED, project_id UNINDEXED,
+    tokenize = 'unicode61'
+);
+
+-- trigram 索引：路径 / 摘要的子串匹配和拼写容错，也用于没有空格分隔的中文
+CREATE VIRTUAL TABLE IF NOT EXISTS apis_trigram USING fts5(
+    path, summary,
+    method UNINDEXED, project_id UNINDEXED,
+    tokenize = 'trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS apis_search_insert AFTER INSERT ON apis BEGIN
+    INSERT INTO apis_fts (rowid, path, summary, description, param_names, method, project_id)
+        SELECT id, path, summary, description, param_names, method, project_id FROM apis_search_source WHERE id = new.id;
+    INSERT INTO apis_trigram (rowid, path, summary, method, project_id)
+        VALUES (new.id, new.path, COALESCE(new.summary, ''), new.method, new.project_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS apis_search_update AFTER UPDATE ON apis BEGIN
+    DELETE FROM apis_fts WHERE rowid = old.id;
+    DELETE FROM apis_trigram WHERE rowid = old.id;
+    INSERT INTO apis_fts (rowid, path, summary, description, param_names, method, project_id)
+        SELECT id, path, summary, description, param_names, method, project_id FROM apis_search_source WHERE id = new.id;
+    INSERT INTO apis_trigram (rowid, path, summary, method, project_id)
+        VALUES (new.id, new.path, COALESCE(new.summary, ''), new.method, new.project_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS apis_search_delete AFTER DELETE ON apis BEGIN
+    DELETE FROM apis_fts WHERE rowid = old.id;
+    DELETE FROM apis_trigram WHERE rowid = old.id;
+END;
+
+-- 已有数据
+INSERT INTO apis_fts (rowid, path, summary, description, param_names, method, project_id)
+    SELECT id, path, summary, description, param_names, method, project_id FROM apis_search_source;
+INSERT INTO apis_trigram (rowid, path, summary, method, project_id)
+    SELECT id, path, COALESCE(summary, ''), method, project_id FROM apis;
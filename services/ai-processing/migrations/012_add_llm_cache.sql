@@ -0,0 +1,16 @@
+-- LLM 响应缓存，见 services/llm_cache.py
+-- 创建时间: 2026-10-16
+
+CREATE TABLE IF NOT EXISTS llm_cache (
+    cache_key TEXT PRIMARY KEY, -- sha256(供应商, 模型, 温度, 响应格式, system prompt, user prompt)
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL, -- 解析后的 JSON
+    latency_ms REAL, -- 原始调用耗时
+    total_tokens INTEGER, -- 原始调用消耗的 token
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL, -- unix 时间戳
+    last_used REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used);
@@ -0,0 +1,7 @@
+-- 列表接口游标分页索引：排序键为 COALESCE(created_at, '')，兼容 created_at 为 NULL 的旧数据
+-- 创建时间: 2026-10-16
+
+CREATE INDEX IF NOT EXISTS idx_apis_project_keyset ON apis(project_id, COALESCE(created_at, ''), id);
+CREATE INDEX IF NOT EXISTS idx_apis_keyset ON apis(COALESCE(created_at, ''), id);
+CREATE INDEX IF NOT EXISTS idx_scenarios_keyset ON scenarios(COALESCE(created_at, ''), id);
+CREATE INDEX IF NOT EXISTS idx_scenarios_project_keyset ON scenarios(project_id, COALESCE(created_at, ''), id);
@@ -0,0 +1,6 @@
+-- 006 的列表索引已被 013 的 keyset 索引（COALESCE(created_at, ''), id）取代，查询不再使用，删除以免白白增加写入开销
+-- 创建时间: 2026-10-16
+
+DROP INDEX IF EXISTS idx_apis_project_created;
+DROP INDEX IF EXISTS idx_apis_created;
+DROP INDEX IF EXISTS idx_scenarios_created;
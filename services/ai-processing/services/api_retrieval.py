@@ -0,0 +1,211 @@
+"""
+用例编排前的接口召回
+
+generate_case 不再把项目下任意 50 个接口整体塞给 LLM，而是先按场景意图 (nlu_result) 给接口打分，
+再把排名靠前的接口在 token 预算内编码进提示词（见 prompt_schema）：
+1. 词法：BM25。英文按单词（拆分驼峰和路径），中文按相邻两字切分，不依赖分词库
+2. 向量（可选）：调用方传入的语义相似度 {(method, path): 0~1}
+3. 图谱邻居：排名靠前的接口的上下游接口（知识图谱的依赖边、已保存用例中前后相邻的步骤）按种子分数加分，
+   把意图里没直接提到、但链路上必需的接口（如创建订单前的查询商品）一并带上
+4. 鉴权：登录 / 获取 token 类接口总是排在前列（用例第 1 步通常是登录）
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json
+import math
+import re
+
+
+ApiKey = Tuple[str, str]
+
+MAX_DESCRIPTION_CHARS = 200
+
+LEXICAL_WEIGHT = 1.0
+VECTOR_WEIGHT = 1.0
+NEIGHBOUR_WEIGHT = 0.5
+NEIGHBOUR_SEEDS = 10
+AUTH_APIS = 2
+
+_WORD_RE = re.compile(r"[A-Za-z][a-z]*|[A-Z]+(?![a-z])|\d+")
+_CJK_RUN_RE = re.compile(r"[一-鿿]+")
+_AUTH_RE = re.compile(r"login|signin|sign-in|auth|token|登录|登陆|鉴权", re.IGNORECASE)
+
+
+def api_key(api: Dict) -> ApiKey:
+    return (str(api.get("method") or "").upper(), str(api.get("path") or ""))
+
+
+def tokenize(text: str) -> List[str]:
+    """英文单词（驼峰拆开、转小写）+ 中文两字切分"""
+    tokens = [w.lower() for w in _WORD_RE.findall(text)]
+    for run in _CJK_RUN_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _flatten(value: Any) -> Iterable[str]:
+    if isinstance(value, dict):
+        for v in value.values():
+            yield from _flatten(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from _flatten(v)
+    elif value is not None:
+        yield str(value)
+
+
+def intent_text(nlu_result: Any) -> str:
+    """把 nlu_result（JSON 字符串或对象）展开成检索用的文本"""
+    if isinstance(nlu_result, str):
+        try:
+            nlu_result = json.loads(nlu_result)
+        except ValueError:
+            return nlu_result
+    return " ".join(_flatten(nlu_result))
+
+
+def _parameter_names(raw: Any) -> List[str]:
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            return []
+    if isinstance(raw, dict):
+        return [str(k) for k in raw]
+    if isinstance(raw, list):
+        return [str(p.get("name")) for p in raw if isinstance(p, dict) and p.get("name")]
+    return []
+
+
+def api_text(api: Dict) -> str:
+    return " ".join([
+        str(api.get("path") or ""),
+        str(api.get("summary") or ""),
+        str(api.get("description") or "")[:MAX_DESCRIPTION_CHARS],
+        " ".join(_parameter_names(api.get("parameters")))
+    ])
+
+
+def is_auth_api(api: Dict) -> bool:
+    """登录 / 获取 token 类接口"""
+    return bool(_AUTH_RE.search(api_text(api)[:300]))
+
+
+def bm25_scores(query: str, apis: List[Dict], k1: float = 1.5, b: float = 0.75) -> List[float]:
+    docs = [tokenize(api_text(api)) for api in apis]
+    query_terms = set(tokenize(query))
+    if not docs or not query_terms:
+        return [0.0] * len(apis)
+    avg_len = sum(len(d) for d in docs) / len(docs) or 1.0
+    df: Dict[str, int] = {}
+    for doc in docs:
+        for term in set(doc) & query_terms:
+            df[term] = df.get(term, 0) + 1
+    idf = {term: math.log(1 + (len(docs) - n + 0.5) / (n + 0.5)) for term, n in df.items()}
+
+    scores = []
+    for doc in docs:
+        tf: Dict[str, int] = {}
+        for term in doc:
+            if term in idf:
+                tf[term] = tf.get(term, 0) + 1
+        norm = k1 * (1 - b + b * len(doc) / avg_len)
+        scores.append(sum(idf[t] * f * (k1 + 1) / (f + norm) for t, f in tf.items()))
+    return scores
+
+
+def case_neighbours(case_steps: Iterable[Any]) -> Dict[ApiKey, List[ApiKey]]:
+    """已保存用例中前后相邻的步骤互为邻居"""
+    neighbours: Dict[ApiKey, List[ApiKey]] = {}
+    for steps in case_steps:
+        if isinstance(steps, str):
+            try:
+                steps = json.loads(steps)
+            except ValueError:
+                continue
+        if not isinstance(steps, list):
+            continue
+        keys = [
+            (str(s.get("api_method") or s.get("method") or "").upper(), str(s.get("api_path") or s.get("path") or ""))
+            for s in steps if isinstance(s, dict)
+        ]
+        for a, b in zip(keys, keys[1:]):
+            if a != b:
+                neighbours.setdefault(a, []).append(b)
+                neighbours.setdefault(b, []).append(a)
+    return neighbours
+
+
+def graph_neighbours(graph) -> Dict[ApiKey, List[ApiKey]]:
+    """知识图谱（networkx 图，节点属性含 method / path）中有依赖边的接口互为邻居"""
+    neighbours: Dict[ApiKey, List[ApiKey]] = {}
+    for u, v in graph.edges():
+        a, b = api_key(graph.nodes[u]), api_key(graph.nodes[v])
+        if a[1] and b[1] and a != b:
+            neighbours.setdefault(a, []).append(b)
+            neighbours.setdefault(b, []).append(a)
+    return neighbours
+
+
+def merge_neighbours(*sources: Optional[Dict[ApiKey, List[ApiKey]]]) -> Dict[ApiKey, List[ApiKey]]:
+    merged: Dict[ApiKey, List[ApiKey]] = {}
+    for source in sources:
+        for key, values in (source or {}).items():
+            merged.setdefault(key, []).extend(values)
+    return merged
+
+
+def rank_apis(
+    apis: List[Dict],
+    query: str,
+    vector_scores: Optional[Dict[ApiKey, float]] = None,
+    neighbours: Optional[Dict[ApiKey, List[ApiKey]]] = None
+) -> List[Tuple[float, Dict]]:
+    """
+    给接口打分并排序
+
+    Returns:
+        [(score, api), ...]，分数降序
+    """
+    lexical = bm25_scores(query, apis)
+    top_lexical = max(lexical, default=0) or 1.0
+    vector_scores = vector_scores or {}
+    scores = {
+        api_key(api): LEXICAL_WEIGHT * lexical[i] / top_lexical + VECTOR_WEIGHT * vector_scores.get(api_key(api), 0.0)
+        for i, api in enumerate(apis)
+    }
+
+    # 图谱邻居：取排名靠前的种子，邻居按种子分数的一定比例加分
+    if neighbours:
+        seeds = sorted((s, k) for k, s in scores.items() if s > 0)[-NEIGHBOUR_SEEDS:]
+        boost: Dict[ApiKey, float] = {}
+        for seed_score, seed in seeds:
+            for n in neighbours.get(seed, []):
+                if n in scores and n != seed:
+                    boost[n] = max(boost.get(n, 0.0), NEIGHBOUR_WEIGHT * seed_score)
+        for key, value in boost.items():
+            scores[key] += value
+
+    # 鉴权接口保底排在前列
+    top = max(scores.values(), default=0.0)
+    auth = [api_key(api) for api in apis if is_auth_api(api)]
+    for key in sorted(auth, key=lambda k: scores[k], reverse=True)[:AUTH_APIS]:
+        scores[key] = max(scores[key], top)
+
+    ranked = [(scores[api_key(api)], api) for api in apis]
+    ranked.sort(key=lambda item: item[0], reverse=True)
+    return ranked
+
+
+def relevant_apis(ranked: List[Tuple[float, Dict]]) -> List[Dict]:
+    """
+    按排名取出要发给 LLM 的接口（由 prompt_schema.encode_apis 在 token 预算内编码）
+
+    有相关接口时不带零分接口；全部为零分（意图为空）时按原顺序全部返回，由预算截断
+    """
+    if ranked and ranked[0][0] > 0:
+        return [api for score, api in ranked if score > 0]
+    return [api for _, api in ranked]
@@ -0,0 +1,153 @@
+"""
+接口目录检索（SQLite FTS5，本地完成，不依赖向量服务）
+
+两级检索，索引由 migrations/011_add_api_search.sql 中的触发器维护：
+1. apis_fts：按词匹配路径、摘要、描述和参数名，每个词做前缀匹配，bm25 排序（摘要和路径权重更高）
+2. apis_trigram：分词检索结果不足时补充模糊匹配。按查询串的三字母组召回候选，
+   再用逐词补齐的三字母组 Dice 相似度重新打分，容忍拼写错误和路径片段（如 "usr/lst"）；
+   不足三个字符的查询（如两个字的中文）退化为子串匹配
+"""
+
+from typing import Dict, List, Optional, Set
+import re
+import sqlite3
+
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 200
+
+# bm25 列权重：path, summary, description, param_names, method, project_id
+FTS_WEIGHTS = (4.0, 5.0, 1.0, 2.0, 0.0, 0.0)
+
+# 模糊匹配的最低相似度和候选数
+MIN_SIMILARITY = 0.3
+FUZZY_CANDIDATES = 200
+MAX_QUERY_TRIGRAMS = 64
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def fts_query(query: str) -> str:
+    """把用户输入转成 FTS5 查询：每个词加引号做前缀匹配，词之间为 AND；没有可检索的词时返回空串"""
+    return " ".join(f"{_quote(token)}*" for token in _TOKEN_RE.findall(query))
+
+
+def trigrams(text: str) -> Set[str]:
+    """召回用的三字母组（与 trigram 分词器一致，不做补齐）"""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def word_trigrams(text: str) -> Set[str]:
+    """打分用的三字母组：逐词计算，词首补两个空格、词尾补一个空格（同 pg_trgm），短词和词首尾的拼写错误也能得分"""
+    grams = set()
+    for word in _TOKEN_RE.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(query_grams: Set[str], text: str) -> float:
+    """三字母组 Dice 系数"""
+    grams = word_trigrams(text)
+    if not query_grams or not grams:
+        return 0.0
+    return 2 * len(query_grams & grams) / (len(query_grams) + len(grams))
+
+
+def _filters(project_id: Optional[str], method: Optional[str], alias: str):
+    conditions, params = [], []
+    if project_id:
+        conditions.append(f"{alias}.project_id = ?")
+        params.append(project_id)
+    if method:
+        conditions.append(f"{alias}.method = ?")
+        params.append(method.upper())
+    return "".join(f" AND {c}" for c in conditions), params
+
+
+def _fts_search(conn: sqlite3.Connection, query: str, project_id, method, limit: int) -> List[Dict]:
+    match = fts_query(query)
+    if not match:
+        return []
+    where, params = _filters(project_id, method, "f")
+    rows = conn.execute(f"""
+        SELECT a.id, a.method, a.path, a.summary, a.base_url, a.project_id,
+               bm25(apis_fts, {", ".join(str(w) for w in FTS_WEIGHTS)}) AS rank
+        FROM apis_fts f JOIN apis a ON a.id = f.rowid
+        WHERE apis_fts MATCH ?{where}
+        ORDER BY rank
+        LIMIT ?
+    """, [match, *params, limit]).fetchall()
+    return [
+        {"id": r[0], "method": r[1], "path": r[2], "summary": r[3], "base_url": r[4], "project_id": r[5],
+         "score": round(-r[6], 4), "match": "fts"}
+        for r in rows
+    ]
+
+
+def _fuzzy_search(conn: sqlite3.Connection, query: str, project_id, method, limit: int) -> List[Dict]:
+    query = query.strip()
+    if not query:
+        return []
+    where, params = _filters(project_id, method, "t")
+    if len(query) < 3:
+        condition, match, order = "(t.path LIKE ? OR t.summary LIKE ?)", [f"%{query}%", f"%{query}%"], "a.id"
+        query_grams = set()
+    else:
+        # 召回按 bm25 排序：罕见的三字母组权重高，"/api/v1" 这类公共片段不会挤占候选名额
+        grams = sorted(trigrams(query))[:MAX_QUERY_TRIGRAMS]
+        condition, match, order = "apis_trigram MATCH ?", [" OR ".join(_quote(g) for g in grams)], "rank"
+        query_grams = word_trigrams(query)
+    rows = conn.execute(f"""
+        SELECT a.id, a.method, a.path, a.summary, a.base_url, a.project_id
+        FROM apis_trigram t JOIN apis a ON a.id = t.rowid
+        WHERE {condition}{where}
+        ORDER BY {order}
+        LIMIT ?
+    """, [*match, *params, FUZZY_CANDIDATES]).fetchall()
+
+    results = []
+    for r in rows:
+        if query_grams:
+            score = max(similarity(query_grams, r[2] or ""), similarity(query_grams, r[3] or ""))
+            if score < MIN_SIMILARITY:
+                continue
+        else:
+            score = 1.0
+        results.append({
+            "id": r[0], "method": r[1], "path": r[2], "summary": r[3], "base_url": r[4], "project_id": r[5],
+            "score": round(score, 4), "match": "fuzzy"
+        })
+    results.sort(key=lambda item: item["score"], reverse=True)
+    return results[:limit]
+
+
+def search_apis(
+    conn: sqlite3.Connection,
+    query: str,
+    project_id: Optional[str] = None,
+    method: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT
+) -> List[Dict]:
+    """
+    检索接口
+
+    Returns:
+        [{"id", "method", "path", "summary", "base_url", "project_id", "score", "match": "fts" | "fuzzy"}, ...]
+        分词命中的结果在前（按 bm25），模糊匹配的结果补在后面（按相似度）
+    """
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    results = _fts_search(conn, query, project_id, method, limit)
+    if len(results) < limit:
+        seen = {item["id"] for item in results}
+        for item in _fuzzy_search(conn, query, project_id, method, limit):
+            if item["id"] not in seen:
+                results.append(item)
+                if len(results) >= limit:
+                    break
+    return results
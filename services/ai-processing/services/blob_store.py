@@ -0,0 +1,255 @@
+"""
+执行载荷的内容寻址存储
+
+executions.results 中每个步骤的请求 / 响应体按内容哈希 (sha256) 去重存入 blobs 表，
+并压缩保存（优先 zstd，未安装 zstandard 时使用 gzip）。执行记录里只保留引用：
+
+    {"__blob__": "<sha256>"}
+
+读取时再按引用批量取回并还原。重复执行同一用例时，相同的请求 / 响应体只会存一份。
+不再被任何执行记录引用的 blob 由 collect_garbage 定期清理。
+
+blobs 表由 migrations/003_add_blobs.sql 创建。
+旧库压缩并清理：python -m services.blob_store <db_path>
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set
+import gzip
+import hashlib
+import json
+import re
+import sqlite3
+import sys
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+BLOB_REF_KEY = "__blob__"
+
+# 步骤结果中外置存储的字段
+BLOB_FIELDS = ("request_data", "request_headers", "url_params", "response")
+
+# 序列化后小于该长度的值直接内联，不值得单独存储
+MIN_BLOB_SIZE = 256
+
+# SQLite 单条语句的变量上限较低，批量读取时分批查询
+_FETCH_BATCH = 500
+
+# 新写入的 blob 在该时长内不清理（秒）
+GC_GRACE_SECONDS = 3600
+
+# 执行记录 JSON 中的引用：{"__blob__": "<sha256>"}
+_REF_RE = re.compile(r'"__blob__":\s*"([0-9a-f]{64})"')
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and isinstance(value.get(BLOB_REF_KEY), str)
+
+
+class BlobStore:
+    def __init__(self, codec: Optional[str] = None, min_size: int = MIN_BLOB_SIZE):
+        """
+        Args:
+            codec: 压缩算法 (zstd, gzip)，默认有 zstandard 时用 zstd
+            min_size: 外置存储的最小字节数
+        """
+        if codec is None:
+            codec = "zstd" if ZSTD_AVAILABLE else "gzip"
+        if codec == "zstd" and not ZSTD_AVAILABLE:
+            print("⚠️ 未安装 zstandard，blob 压缩已降级为 gzip (pip install zstandard)")
+            codec = "gzip"
+        if codec not in ("zstd", "gzip"):
+            raise ValueError(f"不支持的压缩算法: {codec}")
+        self.codec = codec
+        self.min_size = min_size
+
+    def _compress(self, raw: bytes) -> bytes:
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=3).compress(raw)
+        return gzip.compress(raw, compresslevel=6)
+
+    @staticmethod
+    def _decompress(codec: str, data: bytes) -> bytes:
+        if codec == "zstd":
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError("读取 zstd 压缩的 blob 需要安装 zstandard")
+            return zstandard.ZstdDecompressor().decompress(data)
+        if codec == "gzip":
+            return gzip.decompress(data)
+        raise ValueError(f"未知的 blob 压缩算法: {codec}")
+
+    def put(self, cursor: sqlite3.Cursor, raw: bytes) -> str:
+        """写入内容（已存在则跳过），返回其哈希"""
+        digest = hashlib.sha256(raw).hexdigest()
+        cursor.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,))
+        if cursor.fetchone() is None:
+            cursor.execute(
+                "INSERT OR IGNORE INTO blobs (hash, codec, size, data) VALUES (?, ?, ?, ?)",
+                (digest, self.codec, len(raw), self._compress(raw))
+            )
+        return digest
+
+    def get_many(self, cursor: sqlite3.Cursor, digests: Iterable[str]) -> Dict[str, Any]:
+        """按哈希批量读取并反序列化"""
+        digests = list(set(digests))
+        values = {}
+        for i in range(0, len(digests), _FETCH_BATCH):
+            batch = digests[i:i + _FETCH_BATCH]
+            cursor.execute(
+                f"SELECT hash, codec, data FROM blobs WHERE hash IN ({','.join('?' * len(batch))})",
+                batch
+            )
+            for digest, codec, data in cursor.fetchall():
+                values[digest] = json.loads(self._decompress(codec, data))
+        return values
+
+    def pack_results(self, cursor: sqlite3.Cursor, step_results: List[Dict]) -> str:
+        """把步骤结果中的请求 / 响应体外置为 blob，返回写入 executions.results 的 JSON"""
+        packed = []
+        for step in step_results:
+            if not isinstance(step, dict):
+                packed.append(step)
+                continue
+            step = dict(step)
+            for field in BLOB_FIELDS:
+                value = step.get(field)
+                if value is None or _is_ref(value):
+                    continue
+                raw = _encode(value)
+                if len(raw) >= self.min_size:
+                    step[field] = {BLOB_REF_KEY: self.put(cursor, raw)}
+            packed.append(step)
+        return json.dumps(packed)
+
+    def unpack_results(self, cursor: sqlite3.Cursor, results: Any) -> List[Dict]:
+        """还原 executions.results（兼容未外置的旧记录）"""
+        if isinstance(results, (str, bytes)):
+            results = json.loads(results) if results else []
+        if not isinstance(results, list):
+            return results
+
+        digests: Set[str] = set()
+        for step in results:
+            if isinstance(step, dict):
+                digests.update(step[f][BLOB_REF_KEY] for f in BLOB_FIELDS if _is_ref(step.get(f)))
+        if not digests:
+            return results
+
+        values = self.get_many(cursor, digests)
+        for step in results:
+            if not isinstance(step, dict):
+                continue
+            for field in BLOB_FIELDS:
+                if _is_ref(step.get(field)):
+                    digest = step[field][BLOB_REF_KEY]
+                    if digest in values:
+                        step[field] = values[digest]
+                    else:
+                        print(f"DEBUG: WARNING - blob {digest} missing")
+                        step[field] = None
+        return results
+
+    def compact_executions(self, conn: sqlite3.Connection, batch_size: int = 200) -> Dict:
+        """把旧执行记录中内联的请求 / 响应体迁移为 blob 引用"""
+        read_cursor = conn.cursor()
+        write_cursor = conn.cursor()
+        rewritten = 0
+        before = after = 0
+        last_id = 0
+        while True:
+            read_cursor.execute(
+                "SELECT id, results FROM executions WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size)
+            )
+            rows = read_cursor.fetchall()
+            if not rows:
+                break
+            for exec_id, results in rows:
+                last_id = exec_id
+                try:
+                    step_results = json.loads(results) if results else []
+                except ValueError:
+                    continue
+                if not isinstance(step_results, list):
+                    continue
+                packed = self.pack_results(write_cursor, step_results)
+                if packed != results:
+                    before += len(results or "")
+                    after += len(packed)
+                    write_cursor.execute("UPDATE executions SET results = ? WHERE id = ?", (packed, exec_id))
+                    rewritten += 1
+            conn.commit()
+        return {"rewritten": rewritten, "inline_bytes_before": before, "inline_bytes_after": after}
+
+    @staticmethod
+    def collect_garbage(cursor: sqlite3.Cursor, grace_seconds: float = GC_GRACE_SECONDS, batch_size: int = 500) -> Dict:
+        """
+        删除不再被任何执行记录引用的 blob（标记 - 清除）
+
+        须在写事务中调用：写入方 put 会复用已存在的 blob，标记与清除之间不能有新的执行写入。
+
+        Args:
+            grace_seconds: 只清理创建时间早于该时长的 blob
+
+        Returns:
+            {"scanned_executions", "deleted", "freed_bytes"}
+        """
+        referenced: Set[str] = set()
+        scanned = 0
+        last_id = 0
+        while True:
+            cursor.execute(
+                "SELECT id, results FROM executions WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            for exec_id, results in rows:
+                last_id = exec_id
+                scanned += 1
+                if results:
+                    referenced.update(_REF_RE.findall(results))
+
+        cursor.execute(
+            "SELECT hash, size FROM blobs WHERE created_at < datetime('now', ?)",
+            (f"-{int(grace_seconds)} seconds",)
+        )
+        garbage = [(digest, size) for digest, size in cursor.fetchall() if digest not in referenced]
+        for i in range(0, len(garbage), _FETCH_BATCH):
+            batch = [digest for digest, _ in garbage[i:i + _FETCH_BATCH]]
+            cursor.execute(f"DELETE FROM blobs WHERE hash IN ({','.join('?' * len(batch))})", batch)
+        return {
+            "scanned_executions": scanned,
+            "deleted": len(garbage),
+            "freed_bytes": sum(size for _, size in garbage)
+        }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("用法: python -m services.blob_store <db_path>")
+        sys.exit(1)
+    from services.database import connect
+    from services.migrator import run_migrations
+
+    db = connect(sys.argv[1])
+    try:
+        run_migrations(db)
+        summary = BlobStore().compact_executions(db)
+        gc = BlobStore.collect_garbage(db.cursor())
+        db.commit()
+        db.execute("VACUUM")
+    finally:
+        db.close()
+    print(f"✅ 已压缩 {summary['rewritten']} 条执行记录: "
+          f"{summary['inline_bytes_before']} -> {summary['inline_bytes_after']} 字节；"
+          f"清理 {gc['deleted']} 个未引用的 blob ({gc['freed_bytes']} 字节)")
@@ -0,0 +1,300 @@
+"""
+基于知识图谱的用例模板生成（不调用 LLM）
+
+大多数场景是简单链路："登录 -> 带 token 调用 X"。LightweightKnowledgeGraph 中的边记录了
+生产者 -> 消费者的依赖和 field_mapping（如 {"token": "Authorization"}），据此可以直接确定性地编排：
+1. 目标接口：按意图打分（不含图谱邻居加分）后，取分数接近最高分的非鉴权接口（须在图谱中）
+2. 生产者链路：每个目标所需的每个入参字段选一个生产者（优先已在链路中的，其次使用次数最多的），
+   递归补齐生产者的生产者；多个目标按可达关系拓扑排序（互相可达即成环，不走模板）
+3. 步骤：param_mappings 由边上的 field_mapping 生成（来源路径取边上记录的字段，每个映射只生成一条）；
+   params / url_params 复用项目已保存用例中同一接口的数据，没有时取接口定义中的 example / default
+
+置信度 = 意图明确程度 × 数据完整度，低于阈值时由调用方退回 LLM 编排：
+- 意图明确程度：1 - 未进入链路的接口最高分 / 目标最高分（意图还提到了链路外的接口时偏低）
+- 数据完整度：必填请求数据（接口定义中的 required 字段，扣除由映射注入的）都有值的步骤占比，
+  复用的已保存数据同样要检查
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import copy
+
+from services.api_retrieval import ApiKey, api_key, is_auth_api
+from services.prompt_schema import is_schema, load_json
+
+
+DEFAULT_MIN_CONFIDENCE = 0.6
+TARGET_RATIO = 0.6
+MAX_TARGETS = 3
+MAX_STEPS = 8
+
+HEADER_PREFIXES = ("x-",)
+HEADER_FIELDS = {"authorization", "cookie"}
+
+
+def _node_index(graph, api_keys: Set[ApiKey]) -> Dict[ApiKey, Any]:
+    """图谱节点按 (method, path) 建索引，只保留当前项目存在的接口"""
+    index = {}
+    for node, attrs in graph.nodes(data=True):
+        key = api_key(attrs)
+        if key in api_keys:
+            index[key] = node
+    return index
+
+
+def saved_step_data(case_steps: Iterable[Any]) -> Dict[ApiKey, Dict]:
+    """已保存用例中每个接口最近一次使用的 params / url_params"""
+    data: Dict[ApiKey, Dict] = {}
+    for steps in case_steps:
+        steps = load_json(steps)
+        if not isinstance(steps, list):
+            continue
+        for step in steps:
+            if not isinstance(step, dict):
+                continue
+            key = (str(step.get("api_method") or step.get("method") or "").upper(), str(step.get("api_path") or step.get("path") or ""))
+            params = step.get("params") if isinstance(step.get("params"), dict) else {}
+            url_params = step.get("url_params") if isinstance(step.get("url_params"), dict) else {}
+            if params or url_params:
+                data[key] = {"params": params, "url_params": url_params}
+    return data
+
+
+def _schema_example(schema: Any) -> Tuple[Optional[Dict], Set[str]]:
+    """从对象 schema 取示例：返回 (示例, 必填字段)"""
+    if not isinstance(schema, dict):
+        return None, set()
+    if isinstance(schema.get("example"), dict):
+        return dict(schema["example"]), set(schema.get("required") or [])
+    if "$ref" in schema:
+        # 导入时未保存 components，引用的结构未知
+        return None, {"$ref"}
+    properties = schema.get("properties") if isinstance(schema.get("properties"), dict) else {}
+    example = {
+        name: prop.get("example", prop.get("default"))
+        for name, prop in properties.items()
+        if isinstance(prop, dict) and ("example" in prop or "default" in prop)
+    }
+    required = set(schema.get("required") or []) if "required" in schema else set(properties)
+    return example, required
+
+
+def _requirements(api: Dict) -> Tuple[Dict, Dict, Set[str]]:
+    """接口的示例请求数据：(params 示例, url_params 示例, 必填字段)"""
+    params, url_params, required = {}, {}, set()
+    raw_params = load_json(api.get("parameters"))
+    if isinstance(raw_params, dict):
+        url_params.update(raw_params)
+    for p in raw_params if isinstance(raw_params, list) else []:
+        if not isinstance(p, dict) or not p.get("name"):
+            continue
+        schema = p.get("schema") if isinstance(p.get("schema"), dict) else p
+        value = p.get("example", schema.get("example", schema.get("default")))
+        if p.get("in") == "body":
+            example, fields = _schema_example(p.get("schema"))
+            params.update(example or {})
+            required |= fields
+        elif p.get("in", "query") == "query":
+            if value is not None:
+                url_params[p["name"]] = value
+            if p.get("required"):
+                required.add(p["name"])
+
+    body = load_json(api.get("request_body"))
+    if isinstance(body, dict) and body:
+        if isinstance(body.get("content"), dict):
+            content = body["content"]
+            media = content.get("application/json") or next(iter(content.values()), None)
+            if isinstance(media, dict) and isinstance(media.get("example"), dict):
+                params.update(media["example"])
+            elif isinstance(media, dict):
+                example, fields = _schema_example(media.get("schema"))
+                params.update(example or {})
+                required |= fields
+        elif is_schema(body):
+            example, fields = _schema_example(body)
+            params.update(example or {})
+            required |= fields
+        else:
+            params.update(body)  # 手工录入的示例值
+    return params, url_params, required
+
+
+def _missing(required: Set[str], params: Dict, url_params: Dict) -> Set[str]:
+    return required - set(params) - set(url_params)
+
+
+def body_requirements(api: Dict) -> Tuple[Dict, Dict, Set[str]]:
+    """
+    接口的示例请求数据
+
+    Returns:
+        (params 示例, url_params 示例, 缺少示例的必填字段)
+    """
+    params, url_params, required = _requirements(api)
+    return params, url_params, _missing(required, params, url_params)
+
+
+def _mapping_target(to_field: str, api: Dict) -> Tuple[str, str]:
+    """field_mapping 的目标字段 -> (to_field, to_type)"""
+    for prefix, to_type in (("headers.", "headers"), ("header.", "headers"), ("url_params.", "url_params"),
+                            ("query.", "url_params"), ("params.", "params"), ("body.", "params")):
+        if to_field.startswith(prefix):
+            return to_field[len(prefix):], to_type
+    if to_field.lower() in HEADER_FIELDS or to_field.lower().startswith(HEADER_PREFIXES):
+        return to_field, "headers"
+    raw_params = load_json(api.get("parameters"))
+    for p in raw_params if isinstance(raw_params, list) else []:
+        if isinstance(p, dict) and p.get("name") == to_field and p.get("in") == "query":
+            return to_field, "url_params"
+    return to_field, "params"
+
+
+def _mapping_source(from_field: str) -> str:
+    """field_mapping 的来源字段 -> 响应中的取值路径（去掉 response. / body. 前缀，按边上记录的路径取值）"""
+    for prefix in ("response.", "body."):
+        if from_field.startswith(prefix):
+            return from_field[len(prefix):]
+    return from_field
+
+
+def _order_targets(kg, targets: List[Any]) -> List[Any]:
+    """
+    目标之间按可达关系拓扑排序：a 能沿依赖边到达 b 时 a 排在 b 前面，
+    没有先后关系的保持意图打分的顺序；互相可达时抛出 ValueError
+    """
+    after = {t: {u for u in targets if u != t and kg.find_path(t, u)} for t in targets}
+    indegree = {t: 0 for t in targets}
+    for t in targets:
+        for u in after[t]:
+            indegree[u] += 1
+    order, pending = [], list(targets)
+    while pending:
+        ready = next((t for t in pending if indegree[t] == 0), None)
+        if ready is None:
+            raise ValueError("依赖成环")
+        pending.remove(ready)
+        order.append(ready)
+        for u in after[ready]:
+            indegree[u] -= 1
+    return order
+
+
+class _Chain:
+    """按入参字段递归选择生产者，得到拓扑有序的调用链"""
+
+    def __init__(self, graph, allowed: Set):
+        self.graph = graph
+        self.allowed = allowed  # 只使用当前项目存在的接口
+        self.order: List[Any] = []
+        self.producers: Dict[Any, List[Tuple[Any, Dict]]] = {}  # 节点 -> [(生产者, field_mapping)]
+
+    def place(self, node, visiting: Optional[Set] = None):
+        if node in self.order:
+            return
+        if visiting is None:
+            visiting = set()
+        if node in visiting:
+            raise ValueError("依赖成环")
+        visiting.add(node)
+
+        # 同一个入参字段可能有多个生产者（如登录、注册都返回 token），只取一个
+        options: Dict[str, List[Tuple[Any, str, int]]] = {}
+        for producer in self.graph.predecessors(node):
+            if producer not in self.allowed:
+                continue
+            edge = self.graph[producer][node]
+            for source, target in (edge.get("field_mapping") or {}).items():
+                options.setdefault(str(target), []).append((producer, str(source), edge.get("count", 0)))
+        chosen: Dict[Any, Dict] = {}
+        for target, candidates in options.items():
+            candidates.sort(key=lambda c: (c[0] not in self.order, -c[2]))
+            producer, source, _ = candidates[0]
+            chosen.setdefault(producer, {})[source] = target
+
+        for producer in chosen:
+            self.place(producer, visiting)
+        self.producers[node] = list(chosen.items())
+        self.order.append(node)
+        if len(self.order) > MAX_STEPS:
+            raise ValueError(f"链路超过 {MAX_STEPS} 步")
+
+
+def build_template_case(
+    kg,
+    apis: List[Dict],
+    ranked: List[Tuple[float, Dict]],
+    case_steps: Iterable[Any] = (),
+    scenario_name: Optional[str] = None
+) -> Dict:
+    """
+    按知识图谱生成用例
+
+    Args:
+        kg: LightweightKnowledgeGraph
+        apis: 项目下的接口
+        ranked: rank_apis 的结果（不带图谱邻居加分）
+        case_steps: 项目已保存用例的 steps，用于复用请求数据
+
+    Returns:
+        {"case": {"scenario_name", "steps"} | None, "confidence": 0~1, "reason": str}
+    """
+    by_key = {api_key(api): api for api in apis}
+    index = _node_index(kg.graph, set(by_key))
+    if not index:
+        return {"case": None, "confidence": 0.0, "reason": "图谱中没有本项目的接口"}
+
+    relevant = [(score, api) for score, api in ranked if score > 0 and not is_auth_api(api)]
+    targets = [index[api_key(api)] for score, api in relevant if api_key(api) in index]
+    if not targets:
+        return {"case": None, "confidence": 0.0, "reason": "意图没有匹配到图谱中的接口"}
+    top = relevant[0][0]
+    targets = [
+        index[api_key(api)] for score, api in relevant
+        if api_key(api) in index and score >= TARGET_RATIO * top
+    ][:MAX_TARGETS] or targets[:1]
+
+    chain = _Chain(kg.graph, set(index.values()))
+    try:
+        for target in _order_targets(kg, targets):
+            chain.place(target)
+    except ValueError as e:
+        return {"case": None, "confidence": 0.0, "reason": str(e)}
+
+    in_chain = {api_key(kg.graph.nodes[node]) for node in chain.order}
+    best_other = max((score for score, api in relevant if api_key(api) not in in_chain), default=0.0)
+    clarity = max(0.0, 1 - best_other / top)
+
+    saved = saved_step_data(case_steps)
+    steps, covered = [], 0
+    for i, node in enumerate(chain.order):
+        key = api_key(kg.graph.nodes[node])
+        api = by_key[key]
+        mappings, mapped = [], set()
+        for producer, field_mapping in chain.producers[node]:
+            from_step = chain.order.index(producer) + 1
+            for source, target in field_mapping.items():
+                to_field, to_type = _mapping_target(target, api)
+                mapped.add(to_field)
+                mappings.append({"from_step": from_step, "from_field": _mapping_source(source), "to_field": to_field, "to_type": to_type})
+
+        params, url_params, required = _requirements(api)
+        if key in saved:
+            # 已保存的数据同样检查必填字段；$ref 结构未知，以保存的请求体为准
+            params, url_params = saved[key]["params"], saved[key]["url_params"]
+            required = required - {"$ref"} if params else required
+        if not (_missing(required, params, url_params) - mapped):
+            covered += 1
+        steps.append({
+            "step_order": i + 1,
+            "api_path": key[1],
+            "api_method": key[0],
+            "params": copy.deepcopy(params),
+            "url_params": copy.deepcopy(url_params),
+            "headers": {},
+            "param_mappings": mappings
+        })
+
+    completeness = covered / len(steps)
+    confidence = round(clarity * completeness, 3)
+    reason = f"意图明确程度 {clarity:.2f}，数据完整度 {covered}/{len(steps)}"
+    return {"case": {"scenario_name": scenario_name, "steps": steps}, "confidence": confidence, "reason": reason}
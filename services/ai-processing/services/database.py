@@ -0,0 +1,143 @@
+"""
+异步数据库访问层
+
+FastAPI 路由都是 async def，直接调用 sqlite3 会阻塞事件循环，拖慢同时在途的 HTTP 步骤和 LLM 调用。
+这里把所有数据库操作放到后台线程执行：
+- 读：固定大小的读线程池，每个线程复用自己的连接
+- 写：单个写线程串行执行，SQLite 本身同一时刻只允许一个写事务，串行化可以避免锁竞争
+
+用法：
+    db = Database(DB_PATH)
+    rows = await db.fetchall("SELECT * FROM apis WHERE project_id = ?", (project_id,))
+
+    def _save(conn):
+        cursor = conn.cursor()
+        cursor.execute(...)
+        return cursor.lastrowid
+    new_id = await db.write(_save)   # 成功自动提交，异常自动回滚
+
+所有连接都使用同一套 PRAGMA 配置（见 connect）：WAL 让读写互不阻塞，busy_timeout 避免 "database is locked"。
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import os
+import sqlite3
+import threading
+
+
+# 等待数据库锁的超时时间（秒），即 busy_timeout
+BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "30"))
+
+# 连接级 PRAGMA 配置，可通过环境变量调整
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",  # WAL 模式下 NORMAL 只在检查点时 fsync，掉电最多丢失最近的事务，不会损坏数据库
+    "mmap_size": int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": -int(os.getenv("DB_CACHE_SIZE_KB", "65536")),  # 负数表示 KiB
+    "temp_store": "MEMORY",
+}
+
+
+def connect(db_path: str, timeout: float = BUSY_TIMEOUT, **kwargs) -> sqlite3.Connection:
+    """按统一的 PRAGMA 配置打开连接"""
+    conn = sqlite3.connect(db_path, timeout=timeout, **kwargs)
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+class Database:
+    def __init__(self, db_path: str, max_readers: int = 4, timeout: float = BUSY_TIMEOUT):
+        """
+        Args:
+            db_path: 数据库文件路径
+            max_readers: 读线程数（即读连接数）
+            timeout: 等待数据库锁的超时时间（秒）
+        """
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._readers = ThreadPoolExecutor(max_workers=max(1, max_readers), thread_name_prefix="db-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+
+    def connect(self) -> sqlite3.Connection:
+        """新建一个连接（row_factory 为 sqlite3.Row）"""
+        conn = connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _thread_connection(self) -> sqlite3.Connection:
+        """当前线程复用的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self.connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _run_read(self, fn: Callable, args: tuple) -> Any:
+        conn = self._thread_connection()
+        try:
+            return fn(conn, *args)
+        finally:
+            # 结束隐式事务，避免长期持有读快照
+            if conn.in_transaction:
+                conn.rollback()
+
+    def _run_write(self, fn: Callable, args: tuple) -> Any:
+        conn = self._thread_connection()
+        try:
+            result = fn(conn, *args)
+            conn.commit()
+            return result
+        except BaseException:
+            conn.rollback()
+            raise
+
+    async def read(self, fn: Callable[..., Any], *args) -> Any:
+        """在读线程池中执行 fn(conn, *args)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, functools.partial(self._run_read, fn, args))
+
+    async def write(self, fn: Callable[..., Any], *args) -> Any:
+        """在写线程中以单个事务执行 fn(conn, *args)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, functools.partial(self._run_write, fn, args))
+
+    async def fetchall(self, sql: str, params: Sequence = ()) -> List[Dict]:
+        def _query(conn):
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+        return await self.read(_query)
+
+    async def fetchone(self, sql: str, params: Sequence = ()) -> Optional[Dict]:
+        def _query(conn):
+            row = conn.execute(sql, params).fetchone()
+            return dict(row) if row else None
+        return await self.read(_query)
+
+    async def execute(self, sql: str, params: Sequence = ()) -> Dict:
+        """执行单条写语句，返回 {"lastrowid", "rowcount"}"""
+        def _exec(conn):
+            cursor = conn.execute(sql, params)
+            return {"lastrowid": cursor.lastrowid, "rowcount": cursor.rowcount}
+        return await self.write(_exec)
+
+    def close(self):
+        """关闭线程池和所有连接（应用退出时调用）"""
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                # 让 SQLite 按需更新查询规划器统计信息
+                conn.execute("PRAGMA optimize")
+                conn.close()
+            except Exception as e:
+                print(f"❌ 关闭数据库连接失败: {e}")
@@ -0,0 +1,322 @@
+"""
+防抖 / 重复提交探测
+
+两部分探测：
+1. 并发突发 (burst): N 个相同请求预先建立连接并写入除最后一个字节外的全部报文，
+   在 asyncio.Barrier 放行后同时写出最后一个字节，使请求在微秒级窗口内到达服务端
+2. 间隔扫描 (spacing): 以防抖窗口附近的若干间隔成对发送请求，
+   探测运行在服务的事件循环上，间隔只用 asyncio.sleep 等待（不自旋占用事件循环），
+   误差受定时器粒度限制（约 1ms），结论按实际测得的间隔判断
+
+最终根据业务响应判断重复提交是否被接受。
+"""
+
+from typing import Dict, List, Optional, Any, Tuple
+import asyncio
+import json
+import ssl
+import time
+import urllib.parse
+
+
+# 业务状态码字段别名（与断言字段映射保持一致）
+CODE_FIELDS = ["code", "errcode", "RetCode", "status", "ret", "error_code"]
+SUCCESS_CODES = {0, 200, "0", "200", "success", "SUCCESS", "ok", "OK"}
+
+
+class _PreparedRequest:
+    """预先建立连接并写好报文前缀的请求，调用 fire() 写出最后一个字节"""
+
+    def __init__(self, payload: bytes):
+        self.payload = payload
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.sent_ns = 0
+        self.received_ns = 0
+
+    async def open(self, host: str, port: int, use_ssl: bool, timeout: float):
+        ssl_ctx = None
+        if use_ssl:
+            ssl_ctx = ssl.create_default_context()
+            ssl_ctx.check_hostname = False
+            ssl_ctx.verify_mode = ssl.CERT_NONE
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=ssl_ctx), timeout
+        )
+        self.writer.write(self.payload[:-1])
+        await self.writer.drain()
+
+    def fire(self):
+        self.writer.write(self.payload[-1:])
+        self.sent_ns = time.perf_counter_ns()
+
+    async def read_response(self, timeout: float) -> Tuple[int, Any]:
+        await self.writer.drain()
+        raw = await asyncio.wait_for(self.reader.read(), timeout)
+        self.received_ns = time.perf_counter_ns()
+        return _parse_http_response(raw)
+
+    def close(self):
+        if self.writer is not None:
+            try:
+                self.writer.close()
+            except Exception:
+                pass
+
+
+def _build_payload(spec: Dict) -> Tuple[str, int, bool, bytes]:
+    """把请求描述编码为原始 HTTP/1.1 报文"""
+    url = urllib.parse.urlsplit(spec["url"])
+    use_ssl = url.scheme == "https"
+    host = url.hostname or "localhost"
+    port = url.port or (443 if use_ssl else 80)
+
+    target = url.path or "/"
+    query = url.query
+    if spec.get("params"):
+        extra = urllib.parse.urlencode(spec["params"], doseq=True)
+        query = f"{query}&{extra}" if query else extra
+    if query:
+        target = f"{target}?{query}"
+
+    body = b""
+    headers = {k: v for k, v in (spec.get("headers") or {}).items() if k.lower() not in ("host", "content-length", "connection")}
+    if spec.get("json") is not None:
+        body = json.dumps(spec["json"], ensure_ascii=False).encode("utf-8")
+        if not any(k.lower() == "content-type" for k in headers):
+            headers["Content-Type"] = "application/json"
+
+    host_header = host if url.port is None else f"{host}:{port}"
+    lines = [f"{spec['method']} {target} HTTP/1.1", f"Host: {host_header}"]
+    lines += [f"{k}: {v}" for k, v in headers.items()]
+    lines += [f"Content-Length: {len(body)}", "Connection: close", "", ""]
+    return host, port, use_ssl, "\r\n".join(lines).encode("utf-8") + body
+
+
+def _decode_chunked(data: bytes) -> bytes:
+    out = b""
+    while data:
+        line, _, rest = data.partition(b"\r\n")
+        try:
+            size = int(line.split(b";")[0], 16)
+        except ValueError:
+            break
+        if size == 0:
+            break
+        out += rest[:size]
+        data = rest[size + 2:]
+    return out
+
+
+def _parse_http_response(raw: bytes) -> Tuple[int, Any]:
+    head, _, body = raw.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        status_code = int(lines[0].split(" ")[1])
+    except (IndexError, ValueError):
+        return 0, raw[:500].decode("utf-8", "replace")
+    if any(l.lower().startswith("transfer-encoding:") and "chunked" in l.lower() for l in lines[1:]):
+        body = _decode_chunked(body)
+    text = body.decode("utf-8", "replace")
+    try:
+        return status_code, json.loads(text)
+    except Exception:
+        return status_code, text[:500]
+
+
+def is_accepted(status_code: int, response: Any) -> bool:
+    """判断请求是否被业务接受：HTTP 成功且业务码（如有）表示成功"""
+    if not status_code or status_code >= 400:
+        return False
+    if isinstance(response, dict):
+        if isinstance(response.get("success"), bool):
+            return response["success"]
+        for field in CODE_FIELDS:
+            if field in response:
+                return response[field] in SUCCESS_CODES
+    return True
+
+
+async def _wait_until(target: float):
+    """等待到 perf_counter 的目标时刻（定时器可能提前唤醒，未到时刻则继续等待）"""
+    while True:
+        remaining = target - time.perf_counter()
+        if remaining <= 0:
+            return
+        await asyncio.sleep(remaining)
+
+
+async def _prepare(spec: Dict, count: int, timeout: float) -> List[_PreparedRequest]:
+    host, port, use_ssl, payload = _build_payload(spec)
+    requests = [_PreparedRequest(payload) for _ in range(count)]
+    await asyncio.gather(*(r.open(host, port, use_ssl, timeout) for r in requests))
+    return requests
+
+
+async def _collect(req: _PreparedRequest, timeout: float) -> Dict:
+    try:
+        status_code, response = await req.read_response(timeout)
+        error = None
+    except Exception as e:
+        status_code, response, error = 0, None, f"{type(e).__name__}: {str(e)}"
+    finally:
+        req.close()
+    return {
+        "status_code": status_code or "Error",
+        "response": response if error is None else error,
+        "accepted": error is None and is_accepted(status_code, response),
+        "sent_ns": req.sent_ns,
+        "duration": round((req.received_ns - req.sent_ns) / 1e9, 6) if req.received_ns else None
+    }
+
+
+async def run_burst(spec: Dict, count: int, timeout: float = 15.0) -> Dict:
+    """
+    并发突发：count 个相同请求同时发出
+
+    每个参与者先各自建连并写入报文前缀，在 Barrier 处汇合；全部就绪后由
+    index 为 0 的参与者在一个紧凑循环里写出所有请求的最后一个字节，
+    避免逐个唤醒协程带来的调度抖动。
+    """
+    count = max(2, count)
+    host, port, use_ssl, payload = _build_payload(spec)
+    requests = [_PreparedRequest(payload) for _ in range(count)]
+    barrier = asyncio.Barrier(count)
+
+    async def _participant(req: _PreparedRequest) -> Dict:
+        try:
+            await req.open(host, port, use_ssl, timeout)
+        except Exception:
+            await barrier.abort()
+            raise
+        if await barrier.wait() == 0:
+            for r in requests:
+                r.fire()
+        return await _collect(req, timeout)
+
+    try:
+        results = await asyncio.gather(*(_participant(r) for r in requests))
+    finally:
+        for r in requests:
+            r.close()
+
+    sent = [r["sent_ns"] for r in results if r["sent_ns"]]
+    return {
+        "sent": count,
+        "accepted": sum(1 for r in results if r["accepted"]),
+        "send_spread_us": round((max(sent) - min(sent)) / 1000, 3) if sent else None,
+        "results": results
+    }
+
+
+async def run_spaced_pair(spec: Dict, gap_ms: float, timeout: float = 15.0) -> Dict:
+    """以精确间隔发送两个相同请求"""
+    first, second = await _prepare(spec, 2, timeout)
+    start = time.perf_counter()
+    first.fire()
+    await _wait_until(start + gap_ms / 1000)
+    second.fire()
+    r1, r2 = await asyncio.gather(_collect(first, timeout), _collect(second, timeout))
+    return {
+        "target_gap_ms": gap_ms,
+        "actual_gap_ms": round((second.sent_ns - first.sent_ns) / 1e6, 4),
+        "first_accepted": r1["accepted"],
+        "second_accepted": r2["accepted"],
+        "results": [r1, r2]
+    }
+
+
+def _spacing_plan(debounce_ms: int, interval_ms: int) -> List[float]:
+    """围绕防抖窗口生成扫描间隔"""
+    gaps = {round(debounce_ms * f, 3) for f in (0.5, 0.9, 1.1, 1.5)}
+    if interval_ms and interval_ms > 0:
+        gaps.add(float(interval_ms))
+    return sorted(g for g in gaps if g > 0)
+
+
+async def run_debounce_probe(
+    spec: Dict,
+    burst_count: int = 10,
+    expected_debounce_ms: int = 500,
+    request_interval_ms: int = 100,
+    timeout: float = 15.0
+) -> Dict:
+    """
+    执行完整的防抖探测并给出结论
+
+    Returns:
+        与压测接口一致的 analysis / stats / test_results 结构，另附 burst 与 spacing 明细
+    """
+    start = time.perf_counter()
+    burst = await run_burst(spec, burst_count, timeout)
+
+    spacing = []
+    settle = max(expected_debounce_ms, request_interval_ms) * 2 / 1000
+    for gap in _spacing_plan(expected_debounce_ms, request_interval_ms):
+        # 等待上一轮的防抖窗口完全过去，避免相互干扰
+        await asyncio.sleep(settle)
+        spacing.append(await run_spaced_pair(spec, gap, timeout))
+    total_time = time.perf_counter() - start
+
+    reasons = []
+    duplicate_accepted = burst["accepted"] > 1
+    if burst["accepted"] == 0:
+        reasons.append(f"并发突发的 {burst['sent']} 个请求全部被拒绝，无法判断是否防抖（请检查请求本身是否有效）")
+    elif duplicate_accepted:
+        reasons.append(f"并发突发 {burst['sent']} 个相同请求（发送离散度 {burst['send_spread_us']}μs）中 {burst['accepted']} 个被接受，存在重复提交")
+    else:
+        reasons.append(f"并发突发 {burst['sent']} 个相同请求（发送离散度 {burst['send_spread_us']}μs）仅 1 个被接受")
+
+    inside = [p for p in spacing if p["actual_gap_ms"] < expected_debounce_ms and p["first_accepted"]]
+    outside = [p for p in spacing if p["actual_gap_ms"] > expected_debounce_ms and p["first_accepted"]]
+    inside_dup = [p for p in inside if p["second_accepted"]]
+    outside_ok = [p for p in outside if p["second_accepted"]]
+    for p in inside_dup:
+        reasons.append(f"间隔 {p['actual_gap_ms']}ms（小于防抖窗口 {expected_debounce_ms}ms）的重复请求被接受")
+    if inside and not inside_dup:
+        reasons.append(f"防抖窗口内的 {len(inside)} 组间隔请求均只接受了第一个")
+    if outside and len(outside_ok) < len(outside):
+        reasons.append("超出防抖窗口的请求仍被拒绝，实际防抖窗口可能大于预期或接口存在幂等限制")
+
+    accepted_gaps = [p["actual_gap_ms"] for p in spacing if p["first_accepted"] and p["second_accepted"]]
+    duplicate_accepted = duplicate_accepted or bool(inside_dup)
+    has_debounce = burst["accepted"] >= 1 and not duplicate_accepted
+
+    if duplicate_accepted:
+        # 直接观测到重复提交被接受
+        confidence = 100
+    elif has_debounce:
+        # 一致性：突发仅接受一个 + 窗口内均被拒 + 窗口外均被接受
+        checks = 1 + len(inside) + len(outside)
+        confidence = round(100 * (1 + len(inside) + len(outside_ok)) / checks)
+    else:
+        confidence = 0
+
+    all_results = burst["results"] + [r for p in spacing for r in p["results"]]
+    durations = [r["duration"] for r in all_results if r["duration"] is not None]
+    return {
+        "analysis": {
+            "has_debounce": has_debounce,
+            "duplicate_accepted": duplicate_accepted,
+            "confidence": confidence,
+            "observed_min_accepted_gap_ms": min(accepted_gaps) if accepted_gaps else None,
+            "reasons": reasons
+        },
+        "stats": {
+            "total_requests": len(all_results),
+            "successful_requests": sum(1 for r in all_results if r["accepted"]),
+            "avg_duration": round(sum(durations) / len(durations), 4) if durations else 0,
+            "total_time": round(total_time, 3)
+        },
+        "burst": {k: v for k, v in burst.items() if k != "results"},
+        "spacing": [{k: v for k, v in p.items() if k != "results"} for p in spacing],
+        "test_results": [
+            {
+                "request_id": i + 1,
+                "success": r["accepted"],
+                "duration": r["duration"],
+                "status_code": r["status_code"],
+                "response": r["response"]
+            } for i, r in enumerate(all_results)
+        ]
+    }
@@ -0,0 +1,467 @@
+"""
+用例执行引擎
+
+负责步骤间的参数映射、HTTP 请求发送与结果收集，支持两种执行模式：
+- sequential: 严格按步骤顺序逐个执行（默认）
+- parallel: 根据 param_mappings.from_step 构建依赖 DAG，互不依赖的步骤并发执行，
+  依赖的步骤失败时跳过该步骤
+
+响应读取支持两种方式：
+- full: 一次性读取并解析完整响应体（默认）
+- stream: 流式读取，超过 max_body_size 的响应只保留后续映射 / 断言引用到的子树
+"""
+
+from typing import Dict, List, Any, Optional, Tuple, Callable, Awaitable
+from datetime import datetime
+import asyncio
+import os
+import traceback
+import urllib.parse
+import uuid
+import httpx
+
+from services.http_client_pool import HttpClientPool
+from services.field_extractor import FieldExtractor, compile_path
+from services.response_stream import read_response
+
+
+EXECUTION_MODES = ("sequential", "parallel")
+RESPONSE_MODES = ("full", "stream")
+
+# stream 模式下完整保存响应体的默认上限（字节）
+DEFAULT_MAX_BODY_SIZE = 1024 * 1024
+
+
+def normalize_steps(steps: List[Dict]) -> List[Dict]:
+    """自动补齐 step_order (防止 context 冲突)"""
+    for i, s in enumerate(steps):
+        if not s.get("step_order"): s["step_order"] = i + 1
+    return steps
+
+
+def build_step_dependencies(steps: List[Dict]) -> List[List[int]]:
+    """
+    根据 param_mappings.from_step 构建步骤依赖关系
+
+    只认可引用「当前步骤之前」的步骤：顺序模式下引用自身或后续步骤本来就取不到值，
+    这样也保证了依赖图一定无环。同一个 step_order 出现多次时，依赖其最近的一次。
+
+    Returns:
+        与 steps 等长的列表，每项为该步骤所依赖步骤的下标
+    """
+    orders = [step.get("step_order", i + 1) for i, step in enumerate(steps)]
+    dependencies = []
+    for i, step in enumerate(steps):
+        deps = set()
+        for mapping in step.get("param_mappings") or []:
+            if not isinstance(mapping, dict):
+                continue
+            from_step = mapping.get("from_step")
+            if from_step is None:
+                continue
+            for j in range(i - 1, -1, -1):
+                if str(orders[j]) == str(from_step):
+                    deps.add(j)
+                    break
+        dependencies.append(sorted(deps))
+    return dependencies
+
+
+class ExecutionContext:
+    """
+    步骤上下文：只保留后续映射真正需要的字段
+
+    执行前登记每个步骤会被哪些 (from_field, match) 引用；步骤完成时只提取这些字段的值，
+    不再复制整份响应。响应解析后即视为只读，这里保存的是对原对象子树的引用。
+    登记时按映射计数，某个步骤的全部映射都读取过之后即释放其保存的值。
+    """
+
+    def __init__(self):
+        self._needs: Dict[str, Dict[Tuple[str, str], FieldExtractor]] = {}
+        self._values: Dict[str, Dict[Tuple[str, str], Any]] = {}
+        self._pending: Dict[str, int] = {}  # 步骤 -> 尚未读取的映射数
+
+    @staticmethod
+    def _key(step_order: Any) -> str:
+        return str(step_order)
+
+    def require(self, from_step: Any, extractor: FieldExtractor, match: str = "first"):
+        """登记后续步骤需要从 from_step 的响应中提取的字段"""
+        match = "all" if match == "all" and not extractor.definite else "first"
+        key = self._key(from_step)
+        self._needs.setdefault(key, {})[(extractor.path, match)] = extractor
+        self._pending[key] = self._pending.get(key, 0) + 1
+
+    def publish(self, step_order: Any, response: Any):
+        """步骤完成后写入其被引用字段的值"""
+        key = self._key(step_order)
+        needs = self._needs.get(key)
+        if not needs:
+            return
+        values = {}
+        for (path, match), extractor in needs.items():
+            values[(path, match)] = (extractor.all(response) or None) if match == "all" else extractor.first(response)
+        self._values[key] = values
+
+    def needed(self, step_order: Any) -> List[FieldExtractor]:
+        """后续步骤需要从该步骤响应中提取的字段"""
+        return list(self._needs.get(self._key(step_order), {}).values())
+
+    def lookup(self, from_step: Any, path: str, match: str = "first") -> Any:
+        """读取一个映射的值；每次读取消耗一次登记，全部读取后释放该步骤的值"""
+        key = self._key(from_step)
+        values = self._values.get(key)
+        if not values:
+            return None
+        if (path, "all") in values and match == "all":
+            value = values[(path, "all")]
+        else:
+            value = values.get((path, "first"))
+        self._pending[key] = self._pending.get(key, 0) - 1
+        if self._pending[key] <= 0:
+            del self._values[key]
+        return value
+
+    def __contains__(self, step_order: Any) -> bool:
+        return self._key(step_order) in self._values
+
+
+class ExecutionEngine:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        base_url: str = "",
+        mode: str = "sequential",
+        on_step: Optional[Callable[[Dict], Awaitable[None]]] = None,
+        response_mode: str = "full",
+        max_body_size: int = DEFAULT_MAX_BODY_SIZE,
+        body_dir: Optional[str] = None
+    ):
+        """
+        Args:
+            client: 共享的 HTTP 客户端（由调用方负责生命周期）
+            base_url: 请求级 Base URL，为空或为默认值时回退到步骤自带的 base_url
+            mode: 执行模式 (sequential, parallel)
+            on_step: 每个步骤完成后的异步回调（按完成顺序触发，用于流式推送）
+            response_mode: 响应读取方式 (full, stream)
+            max_body_size: stream 模式下完整保存响应体的上限（字节）
+            body_dir: 超限响应体的落盘目录；为空则不保留完整响应体
+        """
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"不支持的执行模式: {mode}")
+        if response_mode not in RESPONSE_MODES:
+            raise ValueError(f"不支持的响应读取方式: {response_mode}")
+        self.client = client
+        self.base_url = base_url
+        self.mode = mode
+        self.on_step = on_step
+        self.response_mode = response_mode
+        self.max_body_size = max(0, int(max_body_size))
+        self.body_dir = body_dir
+        self.context = ExecutionContext()
+        self._extractors: Dict[str, Any] = {}
+
+    def _get_extractor(self, path: str) -> Any:
+        """获取编译后的提取器；表达式非法时返回异常对象"""
+        if path not in self._extractors:
+            try:
+                self._extractors[path] = compile_path(path)
+            except ValueError as e:
+                print(f"DEBUG: WARNING - Invalid from_field {path}: {e}")
+                self._extractors[path] = e
+        return self._extractors[path]
+
+    async def run(self, steps: List[Dict]) -> List[Dict]:
+        """执行全部步骤，返回按原始顺序排列的步骤结果"""
+        # 每个用例只编译一次全部 from_field，并登记上下文需要保留的字段
+        for step in steps:
+            for mapping in step.get("param_mappings") or []:
+                if not isinstance(mapping, dict) or not mapping.get("from_field") or mapping.get("from_step") is None:
+                    continue
+                extractor = self._get_extractor(mapping["from_field"])
+                if isinstance(extractor, FieldExtractor):
+                    self.context.require(mapping["from_step"], extractor, mapping.get("match", "first"))
+
+        if self.mode == "parallel":
+            return await self._run_parallel(steps)
+
+        step_results = []
+        for i, step in enumerate(steps):
+            step_results.append(await self._run_and_emit(step, i))
+        return step_results
+
+    async def _run_and_emit(self, step: Dict, index: int, skip_reason: Optional[str] = None) -> Dict:
+        if skip_reason is None:
+            result = await self.run_step(step, index)
+        else:
+            result = self._step_data(step, index)
+            result.update({"skipped": True, "error": skip_reason})
+        if self.on_step is not None:
+            try:
+                await self.on_step(result)
+            except Exception as e:
+                print(f"DEBUG: on_step callback failed: {e}")
+        return result
+
+    async def _run_parallel(self, steps: List[Dict]) -> List[Dict]:
+        """
+        DAG 并发执行：每个步骤等待其依赖的步骤完成后立即发出请求
+
+        依赖的步骤失败（或被跳过）时不再发请求，直接记为跳过。
+        注意：并发模式只识别显式的 param_mappings 依赖，
+        依赖 Cookie 等隐式会话状态的用例请使用顺序模式。
+        """
+        dependencies = build_step_dependencies(steps)
+        done = [asyncio.Event() for _ in steps]
+        step_results: List[Optional[Dict]] = [None] * len(steps)
+
+        async def _worker(i: int, step: Dict):
+            try:
+                for dep in dependencies[i]:
+                    await done[dep].wait()
+                failed = [
+                    str(steps[dep].get("step_order", dep + 1)) for dep in dependencies[i]
+                    if not (step_results[dep] or {}).get("success")
+                ]
+                skip_reason = f"依赖的步骤 {', '.join(failed)} 未成功，已跳过" if failed else None
+                step_results[i] = await self._run_and_emit(step, i, skip_reason)
+            finally:
+                done[i].set()
+
+        await asyncio.gather(*(_worker(i, step) for i, step in enumerate(steps)))
+        return step_results
+
+    def _resolve_base_url(self, step: Dict) -> str:
+        """确定 Base URL"""
+        current_base_url = self.base_url.strip() if self.base_url else ""
+        if not current_base_url or current_base_url == "http://localhost:8000":
+            current_base_url = (step.get("base_url") or "").strip()
+        if not current_base_url:
+            current_base_url = "http://localhost:8000"
+        return current_base_url
+
+    def _retained_extractors(self, step: Dict, step_order: Any) -> List[FieldExtractor]:
+        """超限响应需要保留的字段：后续映射引用的字段 + 本步骤断言的字段"""
+        extractors = self.context.needed(step_order)
+        for assertion in step.get("assertions") or []:
+            field = assertion.get("field") if isinstance(assertion, dict) else None
+            if not field:
+                continue
+            if field == "response" or field.startswith("response."):
+                field = field[len("response."):]
+            extractor = self._get_extractor(field) if field else None
+            if isinstance(extractor, FieldExtractor):
+                extractors.append(extractor)
+        return extractors
+
+    async def _send_streaming(self, step: Dict, step_order: Any, start_time: datetime, **request) -> Dict:
+        """流式发送请求并读取响应体"""
+        async with self.client.stream(**request) as res:
+            print(f"DEBUG: Step {step_order} response status: {res.status_code}")
+            spill_path = os.path.join(self.body_dir, f"{uuid.uuid4().hex}.body") if self.body_dir else None
+            body = await read_response(
+                res, self._retained_extractors(step, step_order), self.max_body_size, spill_path
+            )
+            result = {
+                "status_code": res.status_code,
+                "duration": (datetime.now() - start_time).total_seconds(),
+                "response": body["response"],
+                "success": res.status_code < 400
+            }
+        if body["truncated"]:
+            print(f"DEBUG: Step {step_order} response truncated ({body['size']} bytes)")
+            result.update({
+                "response_truncated": True,
+                "response_size": body["size"],
+                "response_preview": body["preview"],
+                "response_file": body["file"]
+            })
+        return result
+
+    @staticmethod
+    def _step_data(step: Dict, index: int) -> Dict:
+        """步骤结果的初始内容（尚未发送请求）"""
+        return {
+            "step_order": step.get("step_order", index + 1),
+            "url": "",
+            "api_path": step.get("api_path", step.get("path", "")),
+            "method": step.get("api_method", step.get("method", "GET")).upper(),
+            "request_data": step.get("params", {}),
+            "request_headers": step.get("headers", {}).copy(),
+            "success": False,
+            "status_code": "Error"
+        }
+
+    async def run_step(self, step: Dict, index: int) -> Dict:
+        """执行单个步骤：参数映射 -> 发送请求 -> 写入上下文"""
+        step_order = step.get("step_order", index + 1)
+        print(f"DEBUG: Starting step {step_order} [{step.get('api_method', 'GET')} {step.get('api_path')}]")
+        start_time = datetime.now()
+
+        current_base_url = self._resolve_base_url(step)
+
+        step_data = self._step_data(step, index)
+
+        try:
+            api_path = step.get('api_path', step.get('path', ''))
+            safe_path = urllib.parse.quote(api_path.lstrip('/'), safe="/?=&")
+            url = f"{current_base_url.rstrip('/')}/{safe_path}"
+            step_data["url"] = url
+
+            params_body = (step.get("params") or {}).copy()
+            params_query = (step.get("url_params") or {}).copy()
+            request_headers = (step.get("headers") or {}).copy()
+            method = step_data["method"]
+
+            # 记录提取过程
+            extractions = []
+
+            # 深度依赖映射处理
+            for mapping in step.get("param_mappings", []):
+                from_step_idx = mapping.get("from_step")
+                from_field = mapping.get("from_field")
+                to_field = mapping.get("to_field")
+                to_type = mapping.get("to_type", "params")
+
+                if from_step_idx is None or to_field is None: continue
+
+                # 创建提取记录
+                extraction = {
+                    "from_step": from_step_idx,
+                    "from_field": from_field,
+                    "to_field": to_field,
+                    "to_type": to_type,
+                    "success": False,
+                    "extracted_value": None,
+                    "error_msg": None
+                }
+
+                extractor = self._get_extractor(from_field) if from_field else None
+                if isinstance(extractor, FieldExtractor):
+                    # 通配符/过滤器默认取第一个匹配，match=all 时取全部匹配
+                    field_val = self.context.lookup(from_step_idx, from_field, mapping.get("match", "first"))
+                else:
+                    field_val = None
+
+                # 调试日志
+                print(f"DEBUG: Extracting from step {from_step_idx}")
+                print(f"DEBUG: from_field = {from_field}")
+                print(f"DEBUG: extracted value = {str(field_val)[:50] if field_val else 'None'}...")
+
+                if field_val is not None:
+                    extraction["success"] = True
+                    extraction["extracted_value"] = str(field_val)[:100] if len(str(field_val)) > 100 else field_val
+
+                    if to_type == "headers":
+                        val_str = str(field_val)
+                        if to_field.lower() == "authorization" and not val_str.lower().startswith("bearer "):
+                            val_str = f"Bearer {val_str}"
+                        request_headers[to_field] = val_str
+                        print(f"DEBUG: Set header {to_field} = {val_str[:50]}...")
+                    elif to_type == "url_params" or to_type == "query":
+                        params_query[to_field] = field_val
+                    else:
+                        params_body[to_field] = field_val
+                elif isinstance(extractor, ValueError):
+                    extraction["error_msg"] = f"路径表达式无效: {extractor}"
+                else:
+                    extraction["error_msg"] = f"无法从步骤{from_step_idx}提取{from_field}"
+                    print(f"DEBUG: WARNING - Could not extract {from_field} from step {from_step_idx}")
+
+                extractions.append(extraction)
+
+            step_data["request_data"] = params_body
+            step_data["url_params"] = params_query
+            step_data["request_headers"] = request_headers
+            step_data["extractions"] = extractions  # 添加提取记录
+
+            # 2. 发送请求
+            request = dict(
+                method=method,
+                url=url,
+                params=params_query if params_query else None,
+                json=params_body if method != "GET" and params_body else None,
+                headers=request_headers,
+                timeout=15.0
+            )
+            if self.response_mode == "stream":
+                step_data.update(await self._send_streaming(step, step_order, start_time, **request))
+            else:
+                res = await self.client.request(**request)
+                duration = (datetime.now() - start_time).total_seconds()
+                print(f"DEBUG: Step {step_order} response status: {res.status_code}")
+
+                res_content = res.text
+                try: res_content = res.json()
+                except: pass
+
+                step_data.update({
+                    "status_code": res.status_code,
+                    "duration": duration,
+                    "response": res_content,
+                    "success": res.status_code < 400
+                })
+            res_content = step_data["response"]
+
+            # 调试日志
+            print(f"DEBUG: Saving step {step_order} to context")
+            if isinstance(res_content, dict) and 'data' in res_content:
+                if 'token' in res_content.get('data', {}):
+                    token_val = res_content['data']['token']
+                    print(f"DEBUG: Response contains token: {str(token_val)[:30]}...")
+
+            # 只把后续映射引用到的字段写入 context，不复制整份响应
+            self.context.publish(step_order, res_content)
+        except Exception as e:
+            print(f"CRITICAL ERROR in Step {step_order}:")
+            traceback.print_exc()
+            step_data["error"] = f"{type(e).__name__}: {str(e)}"
+
+        return step_data
+
+
+async def run_suite(
+    cases: List[Dict],
+    pool: HttpClientPool,
+    base_url: str = "",
+    mode: str = "sequential",
+    concurrency: int = 8,
+    **engine_options
+) -> List[Dict]:
+    """
+    并发执行一批用例
+
+    所有用例共享同一个连接池，但每个用例使用独立的客户端（Cookie 互不串扰），
+    同时运行的用例数受 concurrency 限制。
+
+    Args:
+        cases: [{"test_case_id": 1, "steps": [...]}, ...]
+        pool: 进程级 HTTP 连接池
+        base_url: 请求级 Base URL
+        mode: 单个用例内部的执行模式
+        concurrency: 最大并发用例数
+        engine_options: 透传给 ExecutionEngine 的响应读取参数 (response_mode, max_body_size, body_dir)
+
+    Returns:
+        与 cases 顺序一致的执行结果 [{"test_case_id", "status", "results", "duration"}]
+    """
+    concurrency = max(1, concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _run_case(case: Dict) -> Dict:
+        async with semaphore:
+            start_time = datetime.now()
+            try:
+                async with pool.client(verify=False) as client:
+                    engine = ExecutionEngine(client, base_url=base_url, mode=mode, **engine_options)
+                    step_results = await engine.run(case["steps"])
+                status = "success" if all(s.get("success", False) for s in step_results) else "failed"
+                result = {"status": status, "results": step_results}
+            except Exception as e:
+                traceback.print_exc()
+                result = {"status": "failed", "results": [], "error": f"{type(e).__name__}: {str(e)}"}
+            result["test_case_id"] = case["test_case_id"]
+            result["duration"] = (datetime.now() - start_time).total_seconds()
+            return result
+
+    return await asyncio.gather(*(_run_case(case) for case in cases))
@@ -0,0 +1,125 @@
+"""
+执行记录持久化
+
+一次执行写入两处：
+- executions: 整体状态 + 各步骤详情（请求 / 响应体外置到 blob 存储）
+- execution_steps: 每个步骤一行的规范化明细（方法、路径、状态码、耗时、提取结果），供报表用 SQL 聚合
+并累加到报表汇总表 (rollup_hourly / rollup_daily) 和响应时间分位数草图 (latency_sketches)。
+
+调用方传入游标，保证以上写入在同一个事务内完成。
+"""
+
+from typing import Any, Dict, List, Optional
+import json
+import sqlite3
+
+from services.blob_store import BlobStore
+from services.latency_sketch import apply_execution_sketches
+from services.report_rollup import apply_execution, resolve_scenario_id
+
+
+def _status_code(value: Any) -> Optional[int]:
+    """请求异常时 status_code 为 "Error"，落库为 NULL"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def step_rows(step_results: List[Dict]) -> List[Dict]:
+    """把步骤结果转换为 execution_steps 的行（不含执行级字段）"""
+    rows = []
+    for i, step in enumerate(step_results):
+        if not isinstance(step, dict):
+            continue
+        extractions = [
+            {
+                "from_step": e.get("from_step"),
+                "from_field": e.get("from_field"),
+                "to_field": e.get("to_field"),
+                "to_type": e.get("to_type"),
+                "success": bool(e.get("success")),
+                "error_msg": e.get("error_msg")
+            }
+            for e in step.get("extractions") or [] if isinstance(e, dict)
+        ]
+        duration = step.get("duration")
+        try:
+            step_order = int(step.get("step_order", i + 1))
+        except (TypeError, ValueError):
+            step_order = i + 1
+        rows.append({
+            "step_order": step_order,
+            "method": str(step.get("method") or "").upper(),
+            "path": step.get("api_path") or step.get("url") or "",
+            "status_code": _status_code(step.get("status_code")),
+            "duration_ms": round(duration * 1000, 3) if isinstance(duration, (int, float)) else None,
+            "success": 1 if step.get("success") else 0,
+            "error": step.get("error"),
+            "extractions_total": len(extractions),
+            "extractions_failed": sum(1 for e in extractions if not e["success"]),
+            "extractions": json.dumps(extractions, ensure_ascii=False) if extractions else None
+        })
+    return rows
+
+
+def insert_execution_steps(
+    cursor: sqlite3.Cursor,
+    execution_id: int,
+    test_case_id: Optional[int],
+    project_id: Optional[str],
+    step_results: List[Dict]
+):
+    """写入（或重写）某次执行的步骤明细"""
+    cursor.execute("DELETE FROM execution_steps WHERE execution_id = ?", (execution_id,))
+    cursor.executemany("""
+        INSERT INTO execution_steps
+            (execution_id, test_case_id, project_id, step_order, method, path, status_code,
+             duration_ms, success, error, extractions_total, extractions_failed, extractions)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (
+            execution_id, test_case_id, project_id, r["step_order"], r["method"], r["path"], r["status_code"],
+            r["duration_ms"], r["success"], r["error"], r["extractions_total"], r["extractions_failed"], r["extractions"]
+        )
+        for r in step_rows(step_results)
+    ])
+
+
+def save_execution(
+    cursor: sqlite3.Cursor,
+    blob_store: BlobStore,
+    test_case_id: Optional[int],
+    status: str,
+    step_results: List[Dict],
+    project_id: Optional[str] = None,
+    execution_id: Optional[int] = None,
+    environment: Optional[str] = None
+) -> int:
+    """
+    保存一次执行
+
+    Args:
+        execution_id: 为空时新建执行记录；否则更新已有的 running 记录（流式执行）
+        environment: 执行时使用的环境名
+
+    Returns:
+        执行 ID
+    """
+    results = blob_store.pack_results(cursor, step_results)
+    scenario_id = resolve_scenario_id(cursor, test_case_id)
+    if execution_id is None:
+        cursor.execute(
+            "INSERT INTO executions (test_case_id, status, results, project_id, scenario_id, environment) VALUES (?, ?, ?, ?, ?, ?)",
+            (test_case_id or 0, status, results, project_id, scenario_id, environment)
+        )
+        execution_id = cursor.lastrowid
+    else:
+        cursor.execute(
+            "UPDATE executions SET status = ?, results = ?, project_id = ?, scenario_id = ?, environment = ? WHERE id = ?",
+            (status, results, project_id, scenario_id, environment, execution_id)
+        )
+    insert_execution_steps(cursor, execution_id, test_case_id or 0, project_id, step_results)
+    apply_execution(cursor, execution_id)
+    apply_execution_sketches(cursor, execution_id)
+    return execution_id
@@ -0,0 +1,299 @@
+"""
+响应字段提取器
+
+把 param_mappings 的 from_field 编译为可复用的提取函数，兼容原有的 a.b.0.c 写法，
+并支持 JSONPath 风格的选择器：
+- $ 根节点前缀（可省略）:      $.data.token
+- 负数下标:                  data.list[-1].id / data.list.-1.id
+- 通配符:                    data.items[*].id / data.items.*.id
+- 过滤器:                    data.orders[?(@.status == 'paid')].id
+                              支持 == != > >= < <=、字段存在判断 [?(@.id)] 以及 && / ||
+- 带引号的键:                 data['user.name']
+
+包含通配符或过滤器的路径会匹配多个值：first() 返回第一个匹配，all() 返回全部匹配。
+"""
+
+from typing import Any, Callable, List, Optional, Tuple
+from functools import lru_cache
+import json
+import re
+
+
+_MISSING = object()
+_INT_RE = re.compile(r"^-?\d+$")
+_COMPARE_OPS = ("==", "!=", ">=", "<=", ">", "<")
+
+
+def _child(node: Any, key: str) -> Any:
+    """按名称取子节点：字典按键，列表按（可为负数的）下标"""
+    if isinstance(node, dict):
+        return node.get(key, _MISSING)
+    if isinstance(node, list) and _INT_RE.match(key):
+        return _index(node, int(key))
+    return _MISSING
+
+
+def _index(node: Any, idx: int) -> Any:
+    if isinstance(node, list) and -len(node) <= idx < len(node):
+        return node[idx]
+    return _MISSING
+
+
+def _children(node: Any) -> List[Any]:
+    if isinstance(node, dict):
+        return list(node.values())
+    if isinstance(node, list):
+        return list(node)
+    return []
+
+
+def _parse_literal(text: str) -> Any:
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in ("'", '"'):
+        return text[1:-1]
+    try:
+        return json.loads(text)
+    except ValueError:
+        raise ValueError(f"无法解析过滤值: {text}")
+
+
+def _scan(expr: str, seps: Tuple[str, ...]) -> List[Tuple[int, str]]:
+    """找出引号之外出现的分隔符，返回 [(位置, 分隔符)]；seps 中较长的写在前面"""
+    found = []
+    quote = None
+    i = 0
+    while i < len(expr):
+        ch = expr[i]
+        if quote:
+            if ch == "\\":
+                i += 2
+                continue
+            if ch == quote:
+                quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+        else:
+            sep = next((s for s in seps if expr.startswith(s, i)), None)
+            if sep:
+                found.append((i, sep))
+                i += len(sep)
+                continue
+        i += 1
+    if quote:
+        raise ValueError(f"过滤表达式引号不匹配: {expr}")
+    return found
+
+
+def _split(expr: str, sep: str) -> List[str]:
+    """按引号之外的分隔符切分"""
+    parts, start = [], 0
+    for pos, _ in _scan(expr, (sep,)):
+        parts.append(expr[start:pos])
+        start = pos + len(sep)
+    parts.append(expr[start:])
+    return parts
+
+
+def _compile_condition(expr: str) -> Callable[[Any], bool]:
+    """编译单个过滤条件，如 @.status == 'paid' 或 @.id"""
+    expr = expr.strip()
+    ops = _scan(expr, _COMPARE_OPS)
+    match = None
+    if ops:
+        pos, op = ops[0]
+        match = (expr[:pos].strip(), op, expr[pos + len(op):])
+    left = match[0] if match else expr
+    if not left.startswith("@"):
+        raise ValueError(f"过滤条件必须以 @ 开头: {expr}")
+    getter = compile_path(left[1:].lstrip(".")) if left != "@" else None
+
+    def _value(item):
+        return item if getter is None else getter.first(item, _MISSING)
+
+    if not match:
+        return lambda item: _value(item) not in (_MISSING, None)
+
+    op, expected = match[1], _parse_literal(match[2])
+
+    def _check(item) -> bool:
+        actual = _value(item)
+        if actual is _MISSING:
+            return False
+        try:
+            if op == "==": return actual == expected
+            if op == "!=": return actual != expected
+            if op == ">": return actual > expected
+            if op == ">=": return actual >= expected
+            if op == "<": return actual < expected
+            if op == "<=": return actual <= expected
+        except TypeError:
+            return False
+        return False
+
+    return _check
+
+
+def _compile_filter(expr: str) -> Callable[[Any], bool]:
+    """编译过滤表达式，支持 && 与 ||（&& 优先级更高，引号内的 && / || 按字面值处理）"""
+    any_of = []
+    for or_part in _split(expr, "||"):
+        all_of = [_compile_condition(c) for c in _split(or_part, "&&")]
+        any_of.append(lambda item, conds=all_of: all(c(item) for c in conds))
+    return lambda item: any(c(item) for c in any_of)
+
+
+def _find_bracket_end(path: str, start: int) -> int:
+    """返回与 path[start] == '[' 匹配的 ']' 位置（忽略引号内字符）"""
+    quote = None
+    depth = 0
+    for i in range(start, len(path)):
+        ch = path[i]
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+        elif ch == "[":
+            depth += 1
+        elif ch == "]":
+            depth -= 1
+            if depth == 0:
+                return i
+    raise ValueError(f"路径缺少 ']': {path}")
+
+
+def _tokenize(path: str) -> List[Tuple[str, Any]]:
+    """把路径拆分为 (类型, 参数) 片段"""
+    tokens = []
+    path = path.strip()
+    if path.startswith("$"):
+        path = path[1:]
+    i = 0
+    while i < len(path):
+        ch = path[i]
+        if ch == ".":
+            i += 1
+            continue
+        if ch == "[":
+            end = _find_bracket_end(path, i)
+            inner = path[i + 1:end].strip()
+            i = end + 1
+            if inner == "*":
+                tokens.append(("wildcard", None))
+            elif inner.startswith("?"):
+                body = inner[1:].strip()
+                if body.startswith("(") and body.endswith(")"):
+                    body = body[1:-1]
+                tokens.append(("filter", _compile_filter(body)))
+            elif len(inner) >= 2 and inner[0] == inner[-1] and inner[0] in ("'", '"'):
+                tokens.append(("key", inner[1:-1]))
+            elif _INT_RE.match(inner):
+                tokens.append(("index", int(inner)))
+            else:
+                raise ValueError(f"不支持的下标: [{inner}]")
+            continue
+        j = i
+        while j < len(path) and path[j] not in ".[":
+            j += 1
+        name = path[i:j]
+        tokens.append(("wildcard", None) if name == "*" else ("name", name))
+        i = j
+    return tokens
+
+
+class FieldExtractor:
+    """编译后的字段提取器"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tokens = _tokenize(path)
+        self.definite = all(kind in ("name", "key", "index") for kind, _ in self._tokens)
+
+    def static_prefix(self) -> List[str]:
+        """
+        路径开头连续的「纯键名」部分，如 data.list[?(...)].id -> ["data", "list"]
+
+        遇到下标、通配符、过滤器或纯数字键名（可能是列表下标）即停止，
+        流式解析时只需构建该前缀下的子树即可完成提取。
+        """
+        prefix = []
+        for kind, arg in self._tokens:
+            if kind == "key" or (kind == "name" and not _INT_RE.match(arg)):
+                prefix.append(arg)
+            else:
+                break
+        return prefix
+
+    def _walk(self, data: Any) -> List[Any]:
+        nodes = [data]
+        for kind, arg in self._tokens:
+            nxt = []
+            for node in nodes:
+                if kind == "name":
+                    val = _child(node, arg)
+                    if val is not _MISSING: nxt.append(val)
+                elif kind == "key":
+                    if isinstance(node, dict) and arg in node: nxt.append(node[arg])
+                elif kind == "index":
+                    val = _index(node, arg)
+                    if val is not _MISSING: nxt.append(val)
+                elif kind == "wildcard":
+                    nxt.extend(_children(node))
+                elif kind == "filter":
+                    nxt.extend(item for item in _children(node) if arg(item))
+            nodes = nxt
+            if not nodes:
+                break
+        return nodes
+
+    def first(self, data: Any, default: Any = None) -> Any:
+        """返回第一个匹配值"""
+        if data is None or not self._tokens:
+            return default
+        if self.definite:
+            # 确定路径走快速通道，不构造中间列表
+            node = data
+            for kind, arg in self._tokens:
+                if kind == "name":
+                    node = _child(node, arg)
+                elif kind == "key":
+                    node = node.get(arg, _MISSING) if isinstance(node, dict) else _MISSING
+                else:
+                    node = _index(node, arg)
+                if node is _MISSING:
+                    return default
+            return node
+        nodes = self._walk(data)
+        return nodes[0] if nodes else default
+
+    def all(self, data: Any) -> List[Any]:
+        """返回全部匹配值"""
+        if data is None or not self._tokens:
+            return []
+        return self._walk(data)
+
+    def __repr__(self):
+        return f"FieldExtractor({self.path!r})"
+
+
+@lru_cache(maxsize=2048)
+def compile_path(path: str) -> FieldExtractor:
+    """编译（并缓存）路径表达式，表达式非法时抛出 ValueError"""
+    return FieldExtractor(path or "")
+
+
+def extract(data: Any, path: Optional[str], match: str = "first") -> Any:
+    """
+    按路径提取字段
+
+    Args:
+        data: 响应数据
+        path: 路径表达式
+        match: first 返回第一个匹配；all 返回全部匹配组成的列表（无匹配时为 None）
+    """
+    if data is None or not path:
+        return None
+    extractor = compile_path(path)
+    if match == "all" and not extractor.definite:
+        return extractor.all(data) or None
+    return extractor.first(data)
@@ -0,0 +1,185 @@
+"""
+进程级 HTTP 连接池
+
+执行引擎的所有请求都经由这里复用 TCP/TLS 连接：
+- 按 (目标源站, TLS 校验) 维度各自维护一个连接池，单主机连接数受限
+- 可选 HTTP/2（需要安装 h2，见 requirements-optional.txt）
+- 每次执行拿到的是轻量级客户端（独立 Cookie），关闭客户端不会关闭底层连接池
+"""
+
+from typing import Dict, List, Tuple
+from datetime import datetime
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class _PoolEntry:
+    """单个源站的连接池及其使用统计"""
+
+    def __init__(self, origin: str, verify: bool, http2: bool, limits: httpx.Limits):
+        self.origin = origin
+        self.verify = verify
+        self.http2 = http2
+        self.transport = httpx.AsyncHTTPTransport(verify=verify, http2=http2, limits=limits)
+        self.created_at = datetime.now().isoformat()
+        self.last_used = None
+        self.total_requests = 0
+        self.in_flight = 0
+        self.errors = 0
+
+    def stats(self) -> Dict:
+        connections = []
+        pool = getattr(self.transport, "_pool", None)
+        if pool is not None:
+            connections = list(getattr(pool, "connections", []))
+
+        idle = 0
+        for conn in connections:
+            try:
+                if conn.is_idle():
+                    idle += 1
+            except Exception:
+                pass
+
+        return {
+            "origin": self.origin,
+            "verify": self.verify,
+            "http2": self.http2,
+            "created_at": self.created_at,
+            "last_used": self.last_used,
+            "total_requests": self.total_requests,
+            "in_flight": self.in_flight,
+            "errors": self.errors,
+            "connections": len(connections),
+            "idle_connections": idle
+        }
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """包装响应体流：响应体读完并关闭（连接归还连接池）时才结束在途计数"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, entry: _PoolEntry):
+        self._stream = stream
+        self._entry = entry
+        self._closed = False
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        except Exception:
+            self._entry.errors += 1
+            raise
+
+    async def aclose(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._entry.in_flight -= 1
+        await self._stream.aclose()
+
+
+class _RoutingTransport(httpx.AsyncBaseTransport):
+    """按请求的源站把请求路由到对应的共享连接池"""
+
+    def __init__(self, pool: "HttpClientPool", verify: bool):
+        self._pool = pool
+        self._verify = verify
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        entry = self._pool._get_entry(request.url, self._verify)
+        entry.total_requests += 1
+        entry.in_flight += 1
+        entry.last_used = datetime.now().isoformat()
+        try:
+            response = await entry.transport.handle_async_request(request)
+        except BaseException:
+            entry.in_flight -= 1
+            entry.errors += 1
+            raise
+        # 拿到响应头时连接仍被占用，在途计数由响应体流关闭时结束
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_TrackedStream(response.stream, entry),
+            extensions=response.extensions
+        )
+
+    async def aclose(self):
+        # 连接池由 HttpClientPool 统一关闭
+        pass
+
+
+class HttpClientPool:
+    def __init__(
+        self,
+        max_connections_per_host: int = 50,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False
+    ):
+        """
+        Args:
+            max_connections_per_host: 单个源站的最大连接数
+            max_keepalive_connections: 单个源站保持的最大空闲连接数
+            keepalive_expiry: 空闲连接保活时间（秒）
+            http2: 是否启用 HTTP/2（未安装 h2 时自动降级为 HTTP/1.1）
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        if http2 and not HTTP2_AVAILABLE:
+            print("⚠️ 未安装 h2，HTTP/2 已降级为 HTTP/1.1 (pip install h2)")
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._entries: Dict[Tuple[str, bool], _PoolEntry] = {}
+
+    def _get_entry(self, url: httpx.URL, verify: bool) -> _PoolEntry:
+        port = url.port or (443 if url.scheme == "https" else 80)
+        origin = f"{url.scheme}://{url.host}:{port}"
+        key = (origin, verify)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _PoolEntry(origin, verify, self.http2, self.limits)
+            self._entries[key] = entry
+        return entry
+
+    def client(self, verify: bool = False, **kwargs) -> httpx.AsyncClient:
+        """
+        获取一个共享连接池的客户端
+
+        客户端本身很轻（只持有 Cookie 等会话状态），可以按执行随用随建，
+        用 async with 关闭也不会断开底层连接。
+        """
+        return httpx.AsyncClient(transport=_RoutingTransport(self, verify), **kwargs)
+
+    def stats(self) -> Dict:
+        """连接池使用统计"""
+        hosts: List[Dict] = [entry.stats() for entry in self._entries.values()]
+        return {
+            "http2": self.http2,
+            "max_connections_per_host": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "total_hosts": len(hosts),
+            "total_requests": sum(h["total_requests"] for h in hosts),
+            "in_flight": sum(h["in_flight"] for h in hosts),
+            "total_connections": sum(h["connections"] for h in hosts),
+            "hosts": hosts
+        }
+
+    async def aclose(self):
+        """关闭所有连接池（应用退出时调用）"""
+        entries = list(self._entries.values())
+        self._entries.clear()
+        for entry in entries:
+            try:
+                await entry.transport.aclose()
+            except Exception as e:
+                print(f"❌ 关闭连接池失败 {entry.origin}: {e}")
@@ -0,0 +1,94 @@
+"""
+流式 JSON 增量解析
+
+LLM 以 token 流返回形如 {"scenario_name": "...", "steps": [{...}, {...}]} 的 JSON。
+StepStreamParser 边接收边扫描（只维护字符串 / 转义状态和括号深度，每个字符只看一次），
+顶层对象中指定数组（默认 steps）的每个元素一闭合就解析出来返回，不必等整段输出结束。
+"""
+
+from typing import Any, Dict, List, Optional
+import json
+
+
+class StepStreamParser:
+    def __init__(self, array_key: str = "steps"):
+        self.array_key = array_key
+        self.items: List[Any] = []
+        self._chunks: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key: Optional[List[str]] = None   # 正在读取的顶层字符串
+        self._candidate: Optional[str] = None    # 刚读完的顶层字符串，后面跟 ':' 时才是键
+        self._last_key: Optional[str] = None
+        self._in_array = False
+        self._item: Optional[List[str]] = None  # 正在读取的数组元素
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> List[Any]:
+        """追加一段输出，返回本段内新闭合的数组元素"""
+        self._chunks.append(chunk)
+        completed = []
+        for ch in chunk:
+            if self._item is not None:
+                self._item.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key is not None:
+                        # 顶层对象中的字符串可能是键也可能是值，要看后面是不是 ':'
+                        self._candidate = self._parse('"' + "".join(self._key) + '"')
+                        self._key = None
+                    continue
+                if self._key is not None:
+                    self._key.append(ch)
+                continue
+
+            if self._depth == 1 and not ch.isspace():
+                if ch == ":" and self._candidate is not None:
+                    self._last_key = self._candidate
+                self._candidate = None
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._key = []
+            elif ch in "{[":
+                if self._depth == 1 and ch == "[" and self._last_key == self.array_key:
+                    self._in_array = True
+                elif self._in_array and self._depth == 2:
+                    self._item = [ch]
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._in_array and self._depth == 2 and self._item is not None:
+                    item = self._parse("".join(self._item))
+                    self._item = None
+                    if item is not None:
+                        self.items.append(item)
+                        completed.append(item)
+                elif self._in_array and self._depth == 1:
+                    self._in_array = False
+        return completed
+
+    @staticmethod
+    def _parse(fragment: str) -> Any:
+        try:
+            return json.loads(fragment)
+        except ValueError:
+            return None
+
+    def result(self) -> Dict:
+        """整段输出解析后的对象；输出不完整或不合法时，用已解析出的元素兜底"""
+        value = self._parse(self.text)
+        if isinstance(value, dict):
+            return value
+        return {self.array_key: list(self.items)}
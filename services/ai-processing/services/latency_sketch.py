@@ -0,0 +1,251 @@
+"""
+响应时间分位数草图 (DDSketch)
+
+平均值会掩盖长尾，报表需要 p50 / p90 / p99。保存全部原始耗时再排序代价太高，
+这里用 DDSketch 近似：按对数刻度把耗时分桶计数，任意分位数的相对误差不超过 relative_accuracy（默认 1%）。
+- 可合并：两个草图的桶计数相加即得到合并后的草图，天桶可以合成月、多个进程写入的结果可以直接合并
+- 体积小：只保存非空桶，序列化为变长整数，一天的数据通常只有几百字节
+
+持久化到 latency_sketches 表，按 (项目, 维度, 天, 维度值) 一行：
+- api: 每个步骤的耗时，维度值为 "METHOD path"
+- scenario: 整个场景一次执行的总耗时（各步骤耗时之和），维度值为场景 ID
+- environment: 每个步骤的耗时，维度值为执行时的环境名
+
+执行落库时调用 apply_execution_sketches，在同一事务内合并进已有的草图。
+历史数据随 python -m services.report_rollup <db_path> 一起重建。
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+import math
+import sqlite3
+import struct
+
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+# 小于等于该值（毫秒）的耗时计入零桶
+MIN_INDEXABLE_VALUE = 1e-3
+
+SKETCH_DIMENSIONS = ("api", "scenario", "environment")
+
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<BdQddd")  # 版本, 相对误差, 零桶计数, 最小值, 最大值, 总和
+
+
+def _write_varint(out: bytearray, value: int):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+class DDSketch:
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy 必须在 (0, 1) 之间: {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        """桶的代表值（桶区间的中点，保证相对误差）"""
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        if value is None or count <= 0:
+            return
+        value = max(float(value), 0.0)
+        if value <= MIN_INDEXABLE_VALUE:
+            self.zero_count += count
+        else:
+            key = self._key(value)
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "DDSketch"):
+        """把另一个草图合并进来（两者的相对误差必须相同）"""
+        if other.count == 0:
+            return
+        if other.gamma != self.gamma:
+            raise ValueError("相对误差不同的草图不能合并")
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """q 分位数（0 <= q <= 1），没有数据时返回 None"""
+        if self.count == 0:
+            return None
+        if not 0 <= q <= 1:
+            raise ValueError(f"分位数必须在 [0, 1] 之间: {q}")
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return self.min
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return min(max(self._value(key), self.min), self.max)
+        return self.max
+
+    @property
+    def avg(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def to_bytes(self) -> bytes:
+        """紧凑序列化：固定头 + 按 key 排序的 (key 差值, 计数) 变长整数对"""
+        out = bytearray(_HEADER.pack(
+            _FORMAT_VERSION, self.relative_accuracy, self.zero_count,
+            self.min if self.count else 0.0, self.max if self.count else 0.0, self.sum
+        ))
+        _write_varint(out, len(self.bins))
+        previous = 0
+        for key in sorted(self.bins):
+            delta = key - previous
+            _write_varint(out, (delta << 1) ^ (delta >> 63))  # zigzag：key 可能为负
+            _write_varint(out, self.bins[key])
+            previous = key
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "DDSketch":
+        version, relative_accuracy, zero_count, min_value, max_value, total = _HEADER.unpack_from(data, 0)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"不支持的草图格式版本: {version}")
+        sketch = cls(relative_accuracy)
+        pos = _HEADER.size
+        size, pos = _read_varint(data, pos)
+        key = 0
+        for _ in range(size):
+            encoded, pos = _read_varint(data, pos)
+            key += (encoded >> 1) ^ -(encoded & 1)
+            count, pos = _read_varint(data, pos)
+            sketch.bins[key] = count
+        sketch.zero_count = zero_count
+        sketch.count = zero_count + sum(sketch.bins.values())
+        sketch.sum = total
+        if sketch.count:
+            sketch.min, sketch.max = min_value, max_value
+        return sketch
+
+    @classmethod
+    def merged(cls, sketches: Iterable["DDSketch"]) -> "DDSketch":
+        result = None
+        for sketch in sketches:
+            if result is None:
+                result = cls(sketch.relative_accuracy)
+            result.merge(sketch)
+        return result or cls()
+
+
+def _execution_samples(cursor: sqlite3.Cursor, execution_id: int):
+    """
+    一次执行在各维度上的耗时样本
+
+    Returns:
+        (bucket, project_id, {(dimension, dim_key): [耗时毫秒, ...]})；执行不存在时返回 None
+    """
+    cursor.execute("""
+        SELECT date(created_at), COALESCE(project_id, 'default-project'), COALESCE(scenario_id, 0), environment
+        FROM executions WHERE id = ?
+    """, (execution_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    bucket, project_id, scenario_id, environment = tuple(row)
+    cursor.execute(
+        "SELECT method, path, duration_ms FROM execution_steps WHERE execution_id = ? AND duration_ms IS NOT NULL",
+        (execution_id,)
+    )
+    samples: Dict[Tuple[str, str], List[float]] = {}
+    durations = []
+    for method, path, duration_ms in cursor.fetchall():
+        durations.append(duration_ms)
+        samples.setdefault(("api", f"{method} {path}"), []).append(duration_ms)
+        if environment:
+            samples.setdefault(("environment", environment), []).append(duration_ms)
+    if durations and scenario_id:
+        samples[("scenario", str(scenario_id))] = [sum(durations)]
+    return bucket, project_id, samples
+
+
+def _merge_sketch(cursor: sqlite3.Cursor, bucket: str, project_id: str, dimension: str, dim_key: str, sketch: DDSketch):
+    cursor.execute("""
+        SELECT sketch FROM latency_sketches
+        WHERE project_id = ? AND dimension = ? AND bucket = ? AND dim_key = ?
+    """, (project_id, dimension, bucket, dim_key))
+    row = cursor.fetchone()
+    if row:
+        existing = DDSketch.from_bytes(row[0])
+        existing.merge(sketch)
+        sketch = existing
+    cursor.execute("""
+        INSERT INTO latency_sketches (project_id, dimension, bucket, dim_key, count, sketch)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(project_id, dimension, bucket, dim_key) DO UPDATE SET
+            count = excluded.count, sketch = excluded.sketch
+    """, (project_id, dimension, bucket, dim_key, sketch.count, sketch.to_bytes()))
+
+
+def apply_execution_sketches(cursor: sqlite3.Cursor, execution_id: int):
+    """把一次执行的步骤耗时合并进当天的草图（应在写入 execution_steps 的同一事务内调用）"""
+    collected = _execution_samples(cursor, execution_id)
+    if not collected:
+        return
+    bucket, project_id, samples = collected
+    for (dimension, dim_key), values in samples.items():
+        sketch = DDSketch()
+        for value in values:
+            sketch.add(value)
+        _merge_sketch(cursor, bucket, project_id, dimension, dim_key, sketch)
+
+
+def rebuild_latency_sketches(conn: sqlite3.Connection) -> int:
+    """从 execution_steps 重建全部草图，返回草图行数"""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM latency_sketches")
+    sketches: Dict[Tuple[str, str, str, str], DDSketch] = {}
+    ids = [row[0] for row in cursor.execute("SELECT id FROM executions WHERE status != 'running' ORDER BY id").fetchall()]
+    for execution_id in ids:
+        bucket, project_id, samples = _execution_samples(cursor, execution_id)
+        for (dimension, dim_key), values in samples.items():
+            sketch = sketches.setdefault((project_id, dimension, bucket, dim_key), DDSketch())
+            for value in values:
+                sketch.add(value)
+    cursor.executemany(
+        "INSERT INTO latency_sketches (project_id, dimension, bucket, dim_key, count, sketch) VALUES (?, ?, ?, ?, ?, ?)",
+        [(*key, sketch.count, sketch.to_bytes()) for key, sketch in sketches.items()]
+    )
+    conn.commit()
+    return len(sketches)
@@ -0,0 +1,166 @@
+"""
+LLM 响应缓存
+
+相同的 system prompt + user prompt（同一供应商、模型、温度）在有效期内直接返回上次的结果，
+重复点击生成、重复解析同一段 cURL、自愈重跑等场景从几秒到几十秒降为毫秒级，也不再重复消耗 token。
+
+- 持久化：存放在业务库的 llm_cache 表中，进程重启后仍然有效
+- 查询走读连接池；命中次数和最近使用时间先记在内存里，攒够 flush_every 条或写入 / 清理时批量落库
+- TTL：超过 ttl 秒的条目视为未命中，由定期执行的 sweep 删除
+- LRU：条目数超过 max_entries 时按最近使用时间淘汰
+- 统计：命中 / 未命中 / 跳过次数，以及命中所节省的调用耗时和 token
+"""
+
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import time
+
+from services.database import Database
+
+
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_FLUSH_EVERY = 50
+
+
+def cache_key(provider: str, model: str, temperature: float, response_format: Optional[Dict], system_prompt: str, user_prompt: str) -> str:
+    raw = json.dumps([provider, model, temperature, response_format, system_prompt, user_prompt], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(
+        self,
+        db: Database,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        flush_every: int = DEFAULT_FLUSH_EVERY
+    ):
+        """
+        Args:
+            db: 异步数据库访问层
+            ttl: 条目有效期（秒）
+            max_entries: 最多保留的条目数
+            flush_every: 未落库的命中记录达到该条数时批量写入
+        """
+        self.db = db
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self._touches: Dict[str, List[float]] = {}  # cache_key -> [新增命中次数, 最近使用时间]
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "stores": 0,
+            "evictions": 0,
+            "saved_ms": 0.0,
+            "saved_tokens": 0
+        }
+
+    async def get(self, key: str) -> Optional[Any]:
+        """命中时返回缓存的响应并记录一次使用；未命中或已过期返回 None"""
+        now = time.time()
+
+        def _get(conn):
+            row = conn.execute(
+                "SELECT response, latency_ms, total_tokens FROM llm_cache WHERE cache_key = ? AND created_at >= ?",
+                (key, now - self.ttl)
+            ).fetchone()
+            return dict(row) if row else None
+
+        row = await self.db.read(_get)
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        self.stats["saved_ms"] += row["latency_ms"] or 0
+        self.stats["saved_tokens"] += row["total_tokens"] or 0
+
+        touch = self._touches.setdefault(key, [0, now])
+        touch[0] += 1
+        touch[1] = now
+        if len(self._touches) >= self.flush_every:
+            await self.flush()
+        return json.loads(row["response"])
+
+    def _take_touches(self) -> List[tuple]:
+        touches, self._touches = self._touches, {}
+        return [(hits, last_used, key) for key, (hits, last_used) in touches.items()]
+
+    @staticmethod
+    def _apply_touches(conn, touches: List[tuple]):
+        conn.executemany(
+            "UPDATE llm_cache SET hits = hits + ?, last_used = MAX(last_used, ?) WHERE cache_key = ?", touches
+        )
+
+    def _evict(self, conn) -> int:
+        cursor = conn.execute("""
+            DELETE FROM llm_cache WHERE cache_key IN (
+                SELECT cache_key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+        return max(cursor.rowcount, 0)
+
+    async def flush(self):
+        """把内存中的命中次数和最近使用时间批量写入"""
+        touches = self._take_touches()
+        if touches:
+            await self.db.write(self._apply_touches, touches)
+
+    async def put(self, key: str, provider: str, model: str, response: Any, latency_ms: float = None, total_tokens: int = None):
+        """写入（覆盖）一条缓存，超出容量时淘汰最久未使用的条目"""
+        now = time.time()
+        touches = self._take_touches()
+
+        def _put(conn):
+            # 先落库命中记录，淘汰时按最新的使用时间排序
+            self._apply_touches(conn, touches)
+            conn.execute("""
+                INSERT INTO llm_cache (cache_key, provider, model, response, latency_ms, total_tokens, hits, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?)
+                ON CONFLICT(cache_key) DO UPDATE SET
+                    response = excluded.response, latency_ms = excluded.latency_ms, total_tokens = excluded.total_tokens,
+                    created_at = excluded.created_at, last_used = excluded.last_used
+            """, (key, provider, model, json.dumps(response, ensure_ascii=False), latency_ms, total_tokens, now, now))
+            return self._evict(conn)
+
+        evicted = await self.db.write(_put)
+        self.stats["stores"] += 1
+        self.stats["evictions"] += evicted
+
+    async def sweep(self) -> Dict:
+        """定期清理：落库命中记录，删除过期条目，淘汰超出容量的条目"""
+        now = time.time()
+        touches = self._take_touches()
+
+        def _sweep(conn):
+            self._apply_touches(conn, touches)
+            expired = conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,)).rowcount
+            return {"expired": max(expired, 0), "evicted": self._evict(conn)}
+
+        result = await self.db.write(_sweep)
+        self.stats["evictions"] += result["evicted"]
+        return result
+
+    def record_bypass(self):
+        self.stats["bypassed"] += 1
+
+    async def clear(self) -> int:
+        self._touches = {}
+        result = await self.db.execute("DELETE FROM llm_cache")
+        return result["rowcount"]
+
+    async def get_stats(self) -> Dict:
+        row = await self.db.fetchone("SELECT COUNT(*) AS entries, COALESCE(SUM(hits), 0) AS total_hits FROM llm_cache")
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "saved_ms": round(self.stats["saved_ms"], 1),
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0,
+            "entries": row["entries"],
+            "total_hits": row["total_hits"] + sum(hits for hits, _ in self._touches.values()),
+            "ttl": self.ttl,
+            "max_entries": self.max_entries
+        }
@@ -0,0 +1,253 @@
+"""
+LLM 客户端管理
+
+每个供应商只创建一次 AsyncOpenAI 客户端，底层共用一个带连接池的 httpx.AsyncClient，
+避免每次调用重新握手 TLS、泄漏连接。调用统一经过 LLMClientManager.call：
+- 并发上限：同一供应商同时在途的请求数
+- 令牌桶限流：每分钟请求数 (RPM) 和每分钟 token 数 (TPM)，超出时排队等待而不是被供应商拒绝
+- 重试：429 / 5xx / 连接错误按指数退避 + 随机抖动重试，优先遵循响应头 Retry-After
+- 流式请求（stream）同样受限流和并发约束，读完整个流才释放并发名额
+"""
+
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+import asyncio
+import random
+import time
+
+import httpx
+import openai
+
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """按分钟速率匀速补充的令牌桶；rate_per_minute 为 0 表示不限"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1) -> float:
+        """取走 amount 个令牌（超过桶容量时按容量计），不足时等待；返回等待的秒数"""
+        if self.rate <= 0:
+            return 0.0
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+    def adjust(self, amount: float):
+        """按实际用量修正（预估多扣的令牌退回，少扣的补扣，允许暂时为负）"""
+        if self.rate <= 0:
+            return
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class _ProviderState:
+    def __init__(self, max_concurrency: int, rpm: float, tpm: float):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.client = None
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "failures": 0,
+            "in_flight": 0,
+            "throttled_seconds": 0.0
+        }
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, openai.APIConnectionError):  # 包括超时
+        return True
+    status = getattr(error, "status_code", None)
+    return status in RETRYABLE_STATUS or (isinstance(status, int) and status >= 500)
+
+
+class LLMClientManager:
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        rpm: float = 60,
+        tpm: float = 90000,
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        max_connections: int = 20,
+        timeout: float = 60.0
+    ):
+        """
+        Args:
+            max_concurrency: 每个供应商同时在途的请求数
+            rpm / tpm: 每个供应商每分钟的请求数 / token 数上限，0 表示不限
+            max_retries: 可重试错误的最大重试次数
+            base_delay / max_delay: 退避的基准 / 上限时间（秒）
+            max_connections: 每个供应商连接池的最大连接数
+            timeout: 单次请求超时（秒）
+        """
+        self.max_concurrency = max_concurrency
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._providers: Dict[str, _ProviderState] = {}
+        self._http_clients = []
+
+    def _state(self, provider: str) -> _ProviderState:
+        state = self._providers.get(provider)
+        if state is None:
+            state = _ProviderState(self.max_concurrency, self.rpm, self.tpm)
+            self._providers[provider] = state
+        return state
+
+    def http_client(self) -> httpx.AsyncClient:
+        """新建一个长期复用的 httpx 客户端（由管理器负责关闭）"""
+        client = httpx.AsyncClient(
+            timeout=self.timeout,
+            trust_env=False,  # 禁用系统代理
+            limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        )
+        self._http_clients.append(client)
+        return client
+
+    def client(self, provider: str, factory: Callable[[httpx.AsyncClient], Any]) -> Any:
+        """供应商的 SDK 客户端，首次使用时由 factory(http_client) 创建，之后复用"""
+        state = self._state(provider)
+        if state.client is None:
+            state.client = factory(self.http_client())
+        return state.client
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # full jitter：在 [0, base * 2^attempt] 内随机，避免多个请求同时重试
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def call(self, provider: str, request: Callable[[], Awaitable[Any]], estimated_tokens: int = 0) -> Any:
+        """
+        限流、限并发并带重试地执行一次请求
+
+        Args:
+            request: 发起请求的协程工厂（每次重试重新调用）
+            estimated_tokens: 预估消耗的 token，用于 TPM 限流；拿到响应后按 usage 修正
+        """
+        state = self._state(provider)
+        attempt = 0
+        while True:
+            async with state.semaphore:
+                state.stats["throttled_seconds"] += await state.requests.acquire(1)
+                state.stats["throttled_seconds"] += await state.tokens.acquire(estimated_tokens)
+                state.stats["requests"] += 1
+                state.stats["in_flight"] += 1
+                try:
+                    response = await request()
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        state.stats["failures"] += 1
+                        raise
+                    error = e
+                else:
+                    usage = getattr(response, "usage", None)
+                    total_tokens = getattr(usage, "total_tokens", None)
+                    if total_tokens is not None:
+                        state.tokens.adjust(total_tokens - min(estimated_tokens, state.tokens.capacity))
+                    return response
+                finally:
+                    state.stats["in_flight"] -= 1
+
+            # 退避期间释放并发名额
+            delay = self._backoff(attempt, error)
+            attempt += 1
+            state.stats["retries"] += 1
+            print(f"⚠️ LLM 请求失败，{delay:.1f}s 后第 {attempt} 次重试 | Provider: {provider} | {error}")
+            await asyncio.sleep(delay)
+
+    async def stream(self, provider: str, request: Callable[[], Awaitable[Any]], estimated_tokens: int = 0) -> AsyncIterator[Any]:
+        """
+        流式请求：限流、限并发、重试规则同 call，逐个返回分片
+
+        读完整个流之前一直占用并发名额；只在建立流（拿到响应头）失败时重试，收到分片后出错直接抛出
+        """
+        state = self._state(provider)
+        attempt = 0
+        while True:
+            async with state.semaphore:
+                state.stats["throttled_seconds"] += await state.requests.acquire(1)
+                state.stats["throttled_seconds"] += await state.tokens.acquire(estimated_tokens)
+                state.stats["requests"] += 1
+                state.stats["in_flight"] += 1
+                try:
+                    try:
+                        response = await request()
+                    except Exception as e:
+                        if attempt >= self.max_retries or not is_retryable(e):
+                            state.stats["failures"] += 1
+                            raise
+                        error = e
+                    else:
+                        try:
+                            async with response:
+                                async for chunk in response:
+                                    yield chunk
+                        except Exception:
+                            state.stats["failures"] += 1
+                            raise
+                        return
+                finally:
+                    state.stats["in_flight"] -= 1
+
+            delay = self._backoff(attempt, error)
+            attempt += 1
+            state.stats["retries"] += 1
+            print(f"⚠️ LLM 流式请求失败，{delay:.1f}s 后第 {attempt} 次重试 | Provider: {provider} | {error}")
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "providers": {
+                name: {**state.stats, "throttled_seconds": round(state.stats["throttled_seconds"], 2)}
+                for name, state in self._providers.items()
+            }
+        }
+
+    async def aclose(self):
+        for client in self._http_clients:
+            await client.aclose()
+        self._http_clients = []
+        for state in self._providers.values():
+            state.client = None
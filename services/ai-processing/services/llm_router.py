@@ -0,0 +1,202 @@
+"""
+多供应商路由：对冲请求 + 熔断
+
+供应商偶发的长时间卡顿（几十秒无响应）决定了场景创建的尾延迟。路由层按顺序使用多个供应商：
+- 对冲：首选供应商在 hedge_delay 内没有返回，就同时向下一个供应商发同样的请求，
+  取先返回有效结果（JSON 解析成功）的那个，取消另一个；首选直接报错时立即切换，不等 hedge_delay
+- hedge_delay：配置了固定值时使用固定值；否则取该供应商最近成功调用耗时的 p95（样本不足时用默认值）
+- 熔断：某个供应商连续失败 failure_threshold 次后熔断 reset_timeout 秒，期间不再作为首选；
+  到期后放行一个探测请求（半开），成功则恢复，失败则继续熔断
+"""
+
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import time
+
+
+DEFAULT_HEDGE_DELAY = 10.0
+MIN_HEDGE_DELAY = 1.0
+MIN_LATENCY_SAMPLES = 20
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """当前是否可以向该供应商发请求（半开状态只放行一个探测请求）"""
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        return self.state == self.CLOSED or (self.state == self.HALF_OPEN and not self._probing)
+
+    def on_request(self):
+        """请求发出时调用：半开状态下标记探测中"""
+        if self.state == self.HALF_OPEN:
+            self._probing = True
+
+    def on_cancel(self):
+        """请求被取消（对冲的另一路先返回）：不计成功或失败，半开状态下允许重新探测"""
+        if self.state == self.HALF_OPEN:
+            self._probing = False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class _ProviderHealth:
+    def __init__(self, failure_threshold: int, reset_timeout: float, window: int):
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latencies = deque(maxlen=window)
+        self.stats = {"requests": 0, "successes": 0, "failures": 0, "cancelled": 0, "hedges": 0, "wins": 0}
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+class LLMRouter:
+    def __init__(
+        self,
+        hedge_delay: Optional[float] = None,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        latency_window: int = 200
+    ):
+        """
+        Args:
+            hedge_delay: 对冲等待时间（秒），为 None 时按首选供应商的 p95 耗时自适应
+            failure_threshold: 连续失败多少次后熔断
+            reset_timeout: 熔断持续时间（秒）
+            latency_window: 计算 p95 的最近成功调用数
+        """
+        self.hedge_delay = hedge_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency_window = latency_window
+        self._health: Dict[str, _ProviderHealth] = {}
+
+    def _get(self, provider: str) -> _ProviderHealth:
+        health = self._health.get(provider)
+        if health is None:
+            health = _ProviderHealth(self.failure_threshold, self.reset_timeout, self.latency_window)
+            self._health[provider] = health
+        return health
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        """供应商的熔断器（不经过 route 的调用，如流式输出，也可以记录成败）"""
+        return self._get(provider).breaker
+
+    def select(self, providers: List[str]) -> Optional[str]:
+        """不经过 route 的单路调用（如流式输出）使用的供应商：第一个未熔断的，全部熔断时返回 None"""
+        return next((p for p in providers if self._get(p).breaker.allow()), None)
+
+    def delay_for(self, provider: str) -> float:
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        p95 = self._get(provider).p95()
+        return max(MIN_HEDGE_DELAY, p95) if p95 is not None else DEFAULT_HEDGE_DELAY
+
+    def _order(self, providers: List[str]) -> List[str]:
+        """可用（未熔断）的供应商排在前面，保持配置顺序；全部熔断时仍按原顺序尝试"""
+        allowed = [p for p in providers if self._get(p).breaker.allow()]
+        return allowed + [p for p in providers if p not in allowed]
+
+    async def _attempt(self, provider: str, call: Callable[[str], Awaitable[Any]]) -> Any:
+        health = self._get(provider)
+        health.stats["requests"] += 1
+        health.breaker.on_request()
+        started = time.perf_counter()
+        try:
+            result = await call(provider)
+        except asyncio.CancelledError:
+            # 被对冲的另一路抢先返回，不计入熔断
+            health.stats["cancelled"] += 1
+            health.breaker.on_cancel()
+            raise
+        except Exception:
+            health.stats["failures"] += 1
+            health.breaker.record_failure()
+            raise
+        health.stats["successes"] += 1
+        health.latencies.append(time.perf_counter() - started)
+        health.breaker.record_success()
+        return result
+
+    async def route(self, providers: List[str], call: Callable[[str], Awaitable[Any]]) -> Tuple[str, Any]:
+        """
+        依次 / 对冲地调用 call(provider)，返回最先成功的结果
+
+        Returns:
+            (provider, result)
+        Raises:
+            所有供应商都失败时抛出最后一个异常
+        """
+        queue = self._order(providers)
+        pending: Dict[asyncio.Task, str] = {}
+        last_error: Optional[Exception] = None
+
+        def _launch():
+            provider = queue.pop(0)
+            if pending:
+                self._get(provider).stats["hedges"] += 1
+                print(f"🔀 LLM 对冲请求 -> {provider}")
+            pending[asyncio.ensure_future(self._attempt(provider, call))] = provider
+            return provider
+
+        current = _launch()
+        try:
+            while pending:
+                timeout = self.delay_for(current) if queue else None
+                done, _ = await asyncio.wait(pending.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # 超过对冲等待时间仍未返回：再发一路
+                    current = _launch()
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is None:
+                        self._get(provider).stats["wins"] += 1
+                        return provider, task.result()
+                    last_error = task.exception()
+                    print(f"⚠️ LLM 供应商 {provider} 调用失败: {last_error}")
+                if not pending and queue:
+                    # 失败后立即切换下一个供应商
+                    current = _launch()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            provider: {
+                **health.stats,
+                "circuit": health.breaker.state,
+                "consecutive_failures": health.breaker.failures,
+                "p95_seconds": round(health.p95(), 3) if health.p95() is not None else None,
+                "hedge_delay": round(self.delay_for(provider), 3)
+            }
+            for provider, health in self._health.items()
+        }
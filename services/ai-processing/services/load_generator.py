@@ -0,0 +1,352 @@
+"""
+压测引擎 - 基于 asyncio 的接口负载生成器
+
+支持两种负载模型：
+- 固定并发 (closed model): concurrency 个虚拟用户循环发请求，收到响应后立即发下一个
+- 目标 RPS (open model): 按 target_rps 的节奏发请求，不受响应快慢影响
+
+可配置预热爬坡 (ramp_up)、持续时间 (duration) 以及多进程 (workers) 以利用多核。
+每个进程独立产生原始延迟数据，最后在主进程合并计算分位数和直方图。
+"""
+
+from typing import Dict, List, Optional, Any
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import time
+import httpx
+
+
+# 延迟直方图桶上界 (ms)
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+# 保留的请求明细条数（供前端展示）
+MAX_SAMPLE_RESULTS = 100
+
+
+def _loads(val, default):
+    if isinstance(val, (dict, list)):
+        return val
+    try:
+        return json.loads(val) if val else default
+    except Exception:
+        return default
+
+
+def _example_from_request_body(request_body: Any) -> Any:
+    """从 OpenAPI requestBody 中取示例值；非 OpenAPI 结构则视为请求体本身"""
+    if not isinstance(request_body, dict) or not request_body:
+        return None
+    content = request_body.get("content")
+    if not isinstance(content, dict):
+        return request_body
+    for media in content.values():
+        if not isinstance(media, dict):
+            continue
+        if "example" in media:
+            return media["example"]
+        schema = media.get("schema") or {}
+        if isinstance(schema, dict) and "example" in schema:
+            return schema["example"]
+    return None
+
+
+def build_request_spec(api: Dict, base_url: str = "", overrides: Optional[Dict] = None) -> Dict:
+    """
+    根据存储的 API 定义构造压测请求
+
+    Args:
+        api: apis 表中的一行
+        base_url: 覆盖 API 自带的 base_url
+        overrides: 可选的 headers / body / params 覆盖
+
+    Returns:
+        {"method", "url", "headers", "params", "json"}
+    """
+    overrides = overrides or {}
+    method = str(api.get("method") or "GET").upper()
+    root = (base_url or api.get("base_url") or "http://localhost:8000").rstrip("/")
+    path = str(api.get("path") or "").lstrip("/")
+
+    api_headers = _loads(api.get("headers"), {})
+    headers = {str(k): str(v) for k, v in api_headers.items()} if isinstance(api_headers, dict) else {}
+    headers.update(overrides.get("headers") or {})
+
+    params = {}
+    parameters = _loads(api.get("parameters"), [])
+    if isinstance(parameters, dict):
+        params.update(parameters)
+    elif isinstance(parameters, list):
+        for p in parameters:
+            if isinstance(p, dict) and p.get("in") == "query" and "example" in p:
+                params[p.get("name")] = p["example"]
+    params.update(overrides.get("params") or {})
+
+    body = overrides.get("body")
+    if body is None and method != "GET":
+        body = _example_from_request_body(_loads(api.get("request_body"), {}))
+
+    return {
+        "method": method,
+        "url": f"{root}/{path}",
+        "headers": headers,
+        "params": params or None,
+        "json": body if method != "GET" else None
+    }
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩法计算分位数"""
+    if not sorted_values:
+        return 0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def summarize_latencies(latencies_ms: List[float]) -> Dict:
+    """计算延迟分位数与直方图"""
+    values = sorted(latencies_ms)
+    histogram = []
+    idx = 0
+    for bound in LATENCY_BUCKETS_MS:
+        count = 0
+        while idx < len(values) and values[idx] <= bound:
+            idx += 1
+            count += 1
+        histogram.append({"le": bound, "count": count})
+    histogram.append({"le": "+Inf", "count": len(values) - idx})
+
+    return {
+        "min": round(values[0], 3) if values else 0,
+        "avg": round(sum(values) / len(values), 3) if values else 0,
+        "p50": round(_percentile(values, 50), 3),
+        "p90": round(_percentile(values, 90), 3),
+        "p95": round(_percentile(values, 95), 3),
+        "p99": round(_percentile(values, 99), 3),
+        "max": round(values[-1], 3) if values else 0,
+        "histogram": histogram
+    }
+
+
+class _LoadRecorder:
+    """单进程内的原始结果记录"""
+
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.status_codes: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.success = 0
+        self.dispatched = 0  # 已派发（含尚未完成的）
+        self.sent = 0        # 已完成（收到响应或出错）
+        self.dropped = 0
+        self.samples: List[Dict] = []
+
+    def record(self, latency_ms: float, status_code: Any, error: Optional[str], response: Any = None):
+        self.sent += 1
+        self.latencies_ms.append(latency_ms)
+        if status_code is not None:
+            self.status_codes[str(status_code)] = self.status_codes.get(str(status_code), 0) + 1
+        if error:
+            self.errors[error] = self.errors.get(error, 0) + 1
+        else:
+            self.success += 1
+        if len(self.samples) < MAX_SAMPLE_RESULTS:
+            self.samples.append({
+                "success": error is None,
+                "duration": round(latency_ms / 1000, 4),
+                "status_code": status_code if status_code is not None else "Error",
+                "response": response if response is not None else error
+            })
+
+    def to_dict(self) -> Dict:
+        return {
+            "latencies_ms": self.latencies_ms,
+            "status_codes": self.status_codes,
+            "errors": self.errors,
+            "success": self.success,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "samples": self.samples
+        }
+
+
+async def _send(client: httpx.AsyncClient, spec: Dict, recorder: _LoadRecorder, keep_body: bool):
+    start = time.perf_counter()
+    try:
+        res = await client.request(
+            spec["method"], spec["url"],
+            headers=spec["headers"], params=spec["params"], json=spec["json"]
+        )
+        latency_ms = (time.perf_counter() - start) * 1000
+        error = f"HTTP {res.status_code}" if res.status_code >= 400 else None
+        body = None
+        if keep_body:
+            try: body = res.json()
+            except Exception: body = res.text[:500]
+        recorder.record(latency_ms, res.status_code, error, body)
+    except Exception as e:
+        latency_ms = (time.perf_counter() - start) * 1000
+        recorder.record(latency_ms, None, type(e).__name__)
+
+
+def _arrival_offset(k: int, target_rps: float, ramp_up: float) -> float:
+    """
+    第 k 个请求相对开始时间的派发时刻
+
+    爬坡期内速率从 0 线性增长到 target_rps，累计请求数 N(t) = rps * t^2 / (2 * ramp)，
+    反解即可得到每个请求的精确派发时刻；爬坡结束后按恒定速率派发。
+    """
+    if ramp_up and k < target_rps * ramp_up / 2:
+        return math.sqrt(2 * ramp_up * k / target_rps)
+    return k / target_rps + (ramp_up / 2 if ramp_up else 0)
+
+
+async def run_load(spec: Dict, config: Dict) -> Dict:
+    """
+    在当前进程中运行负载
+
+    Args:
+        spec: build_request_spec 生成的请求
+        config: {
+            "concurrency": 10,         # 固定并发数；RPS 模式下为最大在途请求数
+            "target_rps": None,        # 设置后使用 RPS 模式
+            "duration": None,          # 持续时间(秒)；为空时按 total_requests 结束
+            "total_requests": 100,
+            "ramp_up": 0,              # 爬坡时间(秒)
+            "timeout": 15.0
+        }
+    """
+    concurrency = max(1, int(config.get("concurrency") or 1))
+    target_rps = config.get("target_rps")
+    duration = config.get("duration")
+    total_requests = max(0, int(config.get("total_requests") or 0))
+    ramp_up = max(0.0, float(config.get("ramp_up") or 0))
+
+    recorder = _LoadRecorder()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    def _budget_left() -> bool:
+        if deadline is not None:
+            return time.perf_counter() < deadline
+        # 按已派发 + 已丢弃计数，在途请求也占用预算，保证恰好发出 total_requests 个
+        return recorder.dispatched + recorder.dropped < total_requests
+
+    async with httpx.AsyncClient(verify=False, limits=limits, timeout=config.get("timeout", 15.0)) as client:
+        if target_rps:
+            # open model：按节奏派发，在途请求达到上限时丢弃并计数
+            in_flight = set()
+            scheduled = 0
+            while _budget_left():
+                now = time.perf_counter()
+                next_at = start + _arrival_offset(scheduled, target_rps, ramp_up)
+                if now < next_at:
+                    await asyncio.sleep(next_at - now)
+                    continue
+                scheduled += 1
+                if len(in_flight) < concurrency:
+                    recorder.dispatched += 1
+                    task = asyncio.create_task(_send(client, spec, recorder, len(recorder.samples) < MAX_SAMPLE_RESULTS))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+                else:
+                    recorder.dropped += 1
+            if in_flight:
+                await asyncio.gather(*in_flight)
+        else:
+            # closed model：concurrency 个虚拟用户，爬坡期内均匀启动
+            async def _user(k: int):
+                if ramp_up:
+                    await asyncio.sleep(ramp_up * k / concurrency)
+                while _budget_left():
+                    recorder.dispatched += 1
+                    await _send(client, spec, recorder, len(recorder.samples) < MAX_SAMPLE_RESULTS)
+
+            await asyncio.gather(*(_user(k) for k in range(concurrency)))
+
+    result = recorder.to_dict()
+    result["elapsed"] = time.perf_counter() - start
+    return result
+
+
+def _run_load_in_process(spec: Dict, config: Dict) -> Dict:
+    """子进程入口"""
+    return asyncio.run(run_load(spec, config))
+
+
+def _split_config(config: Dict, workers: int) -> List[Dict]:
+    """把负载配置平均拆分到各个进程（余数分给前几个进程，总并发与总请求数保持不变）"""
+    parts = []
+    total = int(config.get("total_requests") or 0)
+    concurrency = max(1, int(config.get("concurrency") or 1))
+    for i in range(workers):
+        part = dict(config)
+        part["concurrency"] = max(1, concurrency // workers + (1 if i < concurrency % workers else 0))
+        if config.get("target_rps"):
+            part["target_rps"] = config["target_rps"] / workers
+        part["total_requests"] = total // workers + (1 if i < total % workers else 0)
+        parts.append(part)
+    return parts
+
+
+async def run_load_test(spec: Dict, config: Dict, workers: int = 1) -> Dict:
+    """
+    运行压测并汇总结果
+
+    workers > 1 时把负载拆分到多个进程，每个进程跑自己的事件循环。进程数不超过 CPU 核数和并发数，
+    子进程使用 spawn 启动：fork 会复制服务进程中数据库读写线程持有的锁，子进程可能因此死锁。
+    """
+    concurrency = max(1, int(config.get("concurrency") or 1))
+    workers = max(1, min(int(workers or 1), os.cpu_count() or 1, concurrency))
+    start = time.perf_counter()
+    if workers == 1:
+        parts = [await run_load(spec, config)]
+    else:
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            parts = await asyncio.gather(*(
+                loop.run_in_executor(executor, _run_load_in_process, spec, part)
+                for part in _split_config(config, workers)
+            ))
+    wall_time = time.perf_counter() - start
+
+    latencies = []
+    status_codes: Dict[str, int] = {}
+    errors: Dict[str, int] = {}
+    samples = []
+    for part in parts:
+        latencies.extend(part["latencies_ms"])
+        for k, v in part["status_codes"].items():
+            status_codes[k] = status_codes.get(k, 0) + v
+        for k, v in part["errors"].items():
+            errors[k] = errors.get(k, 0) + v
+        samples.extend(part["samples"][:MAX_SAMPLE_RESULTS - len(samples)])
+
+    completed = len(latencies)
+    success = sum(p["success"] for p in parts)
+    dropped = sum(p["dropped"] for p in parts)
+    load_time = max((p["elapsed"] for p in parts), default=wall_time)
+    latency = summarize_latencies(latencies)
+
+    return {
+        "stats": {
+            "total_requests": completed,
+            "successful_requests": success,
+            "failed_requests": completed - success,
+            "dropped_requests": dropped,
+            "avg_duration": round(latency["avg"] / 1000, 4),
+            "total_time": round(wall_time, 3),
+            "throughput": round(completed / load_time, 2) if load_time > 0 else 0,
+            "target_rps": config.get("target_rps"),
+            "concurrency": config.get("concurrency"),
+            "workers": workers
+        },
+        "latency": latency,
+        "status_codes": status_codes,
+        "errors": errors,
+        "test_results": [{"request_id": i + 1, **s} for i, s in enumerate(samples)]
+    }
@@ -0,0 +1,144 @@
+"""
+数据库迁移
+
+按版本号顺序执行迁移，已执行的版本记录在 schema_migrations 表中，每个迁移只执行一次。
+迁移有两种来源：
+- migrations/NNN_名称.sql: SQL 脚本，文件名前缀为版本号
+- PYTHON_MIGRATIONS: 无法用纯 SQL 表达的迁移（如「列不存在时才添加」）
+
+每个迁移在单独的事务中执行，失败时回滚并停止后续迁移。
+
+手动执行：python -m services.migrator <db_path>
+"""
+
+from typing import Callable, Dict, List, Tuple
+import os
+import re
+import sqlite3
+import sys
+
+
+_FILE_RE = re.compile(r"^(\d+)_(.+)\.sql$")
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+
+def _add_legacy_api_columns(conn: sqlite3.Connection):
+    """旧库的 apis 表缺少 base_url / parameters / request_body / headers 列"""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(apis)").fetchall()}
+    for column in ("base_url", "parameters", "request_body", "headers"):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE apis ADD COLUMN {column} TEXT")
+
+
+PYTHON_MIGRATIONS: Dict[int, Tuple[str, Callable[[sqlite3.Connection], None]]] = {
+    2: ("add_legacy_api_columns", _add_legacy_api_columns),
+}
+
+
+def collect_migrations(migrations_dir: str = MIGRATIONS_DIR) -> List[Tuple[int, str, object]]:
+    """
+    收集全部迁移，按版本号排序
+
+    Returns:
+        [(version, name, SQL 文本或可调用对象), ...]
+    """
+    migrations = {version: (name, fn) for version, (name, fn) in PYTHON_MIGRATIONS.items()}
+    if os.path.isdir(migrations_dir):
+        for filename in os.listdir(migrations_dir):
+            match = _FILE_RE.match(filename)
+            if not match:
+                continue
+            version = int(match.group(1))
+            if version in migrations:
+                raise ValueError(f"迁移版本号重复: {version} ({filename})")
+            with open(os.path.join(migrations_dir, filename), "r", encoding="utf-8") as f:
+                migrations[version] = (match.group(2), f.read())
+    return [(version, name, body) for version, (name, body) in sorted(migrations.items())]
+
+
+def _ensure_version_table(conn: sqlite3.Connection):
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )''')
+    conn.commit()
+
+
+def applied_versions(conn: sqlite3.Connection) -> List[int]:
+    _ensure_version_table(conn)
+    return [row[0] for row in conn.execute("SELECT version FROM schema_migrations ORDER BY version").fetchall()]
+
+
+def split_statements(script: str) -> List[str]:
+    """
+    把 SQL 脚本拆成单条语句
+
+    按 ';' 切分后用 sqlite3.complete_statement 判断语句是否完整，
+    触发器 BEGIN ... END、字符串和注释中的 ';' 不会被误切。
+    """
+    def _has_sql(text: str) -> bool:
+        # 只有注释或空语句时跳过
+        return any(line.strip(" \t;") and not line.strip().startswith("--") for line in text.splitlines())
+
+    statements = []
+    buffer = ""
+    parts = script.split(";")
+    for i, part in enumerate(parts):
+        buffer += part if i == len(parts) - 1 else part + ";"
+        if sqlite3.complete_statement(buffer):
+            if _has_sql(buffer):
+                statements.append(buffer.strip())
+            buffer = ""
+    if _has_sql(buffer):
+        statements.append(buffer.strip())
+    return statements
+
+
+def _apply(conn: sqlite3.Connection, version: int, name: str, body: object):
+    """在同一个事务中执行迁移并写入版本记录，任一语句失败整体回滚"""
+    if conn.in_transaction:
+        conn.commit()
+    # executescript 会先提交当前事务，无法回滚，这里逐条 execute
+    statements = None if callable(body) else split_statements(body)
+    conn.execute("BEGIN")
+    try:
+        if statements is None:
+            body(conn)
+        else:
+            for statement in statements:
+                conn.execute(statement)
+        conn.execute("INSERT INTO schema_migrations (version, name) VALUES (?, ?)", (version, name))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def run_migrations(conn: sqlite3.Connection, migrations_dir: str = MIGRATIONS_DIR) -> List[str]:
+    """执行所有未执行的迁移，返回本次执行的迁移名称"""
+    done = set(applied_versions(conn))
+    applied = []
+    for version, name, body in collect_migrations(migrations_dir):
+        if version in done:
+            continue
+        try:
+            _apply(conn, version, name, body)
+        except Exception as e:
+            raise RuntimeError(f"迁移 {version:03d}_{name} 执行失败: {e}") from e
+        print(f"🧱 已执行迁移 {version:03d}_{name}")
+        applied.append(f"{version:03d}_{name}")
+    return applied
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("用法: python -m services.migrator <db_path>")
+        sys.exit(1)
+    db = sqlite3.connect(sys.argv[1])
+    try:
+        result = run_migrations(db)
+    finally:
+        db.close()
+    print(f"✅ 数据库已是最新版本（本次执行 {len(result)} 个迁移）")
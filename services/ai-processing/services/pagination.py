@@ -0,0 +1,72 @@
+"""
+列表接口的游标分页
+
+按 (created_at, id) 倒序做 keyset 分页：下一页从上一页最后一行之后开始，
+不使用 OFFSET，翻到多深的页代价都一样，期间插入新数据也不会出现重复或遗漏。
+游标是对最后一行 (created_at, id) 的 base64 编码，对调用方不透明。
+
+旧数据的 created_at 可能为 NULL，而 NULL 参与行值比较的结果是 NULL，
+排序和游标条件都按 COALESCE(created_at, '') 计算（NULL 排在最后），
+查询须使用 order_clause 生成的 ORDER BY，与 keyset_clause 保持一致。
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import json
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(row: Dict) -> str:
+    raw = json.dumps([row.get("created_at") or "", row.get("id")], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    """解析游标，格式非法时抛出 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return created_at or "", int(row_id)
+    except Exception:
+        raise ValueError(f"无效的分页游标: {cursor}")
+
+
+def keyset_clause(cursor: Optional[str], alias: str = "") -> Tuple[str, List[Any]]:
+    """
+    生成「位于游标之后」的 WHERE 条件
+
+    Returns:
+        (条件 SQL, 参数)；cursor 为空时返回 ("", [])
+    """
+    if not cursor:
+        return "", []
+    created_at, row_id = decode_cursor(cursor)
+    prefix = f"{alias}." if alias else ""
+    return f"(COALESCE({prefix}created_at, ''), {prefix}id) < (?, ?)", [created_at, row_id]
+
+
+def order_clause(alias: str = "") -> str:
+    """与 keyset_clause 对应的排序（不含 ORDER BY 关键字）"""
+    prefix = f"{alias}." if alias else ""
+    return f"COALESCE({prefix}created_at, '') DESC, {prefix}id DESC"
+
+
+def clamp_limit(limit: Optional[int]) -> Optional[int]:
+    if limit is None:
+        return None
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def page(rows: List[Dict], limit: Optional[int]) -> Tuple[List[Dict], Optional[str]]:
+    """
+    截取一页并计算下一页游标
+
+    查询时应多取一行 (limit + 1)：多出来的那行存在即说明还有下一页。
+    """
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1])
@@ -0,0 +1,308 @@
+"""
+接口定义的紧凑提示词编码
+
+Swagger 导入的 parameters / request_body 原样 json.dumps 进提示词非常冗长（$ref、重复的对象结构、长描述），
+既拖慢响应、增加费用，也容易超出上下文窗口。这里把接口渲染成一行一个的签名写法：
+
+    POST /pet/{petId} path(petId:int) query(debug?:bool) body:Pet  # 更新宠物
+
+- $ref 折叠为引用名（#/components/schemas/Pet -> Pet）
+- 多个接口重复出现的对象结构提升为共享类型，在 types 段只定义一次
+- 所有接口都带的参数（如鉴权 header）只列一次
+- 摘要 / 描述截断；同一 (method, path) 只保留一个
+- 按给定顺序放入，直到超出 token 预算（计数见 services/tokens.py）
+"""
+
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+import json
+import re
+
+from services.tokens import count_tokens
+
+
+DEFAULT_TOKEN_BUDGET = 6000
+MAX_DESCRIPTION_CHARS = 60
+MAX_DEPTH = 4
+MAX_PROPERTIES = 30
+MAX_ENUM_VALUES = 6
+# 出现至少 2 次、且签名不短于该长度的对象结构才提升为共享类型
+MIN_HOIST_CHARS = 24
+
+LEGEND = (
+    "# 接口格式: METHOD 路径 path(..) query(..) header(..) body:类型  # 说明\n"
+    "# 类型写法: {字段:类型,可选字段?:类型} [元素类型] str/int/num/bool/any，\"a\"|\"b\" 为枚举"
+)
+
+PRIMITIVES = {"string": "str", "integer": "int", "number": "num", "boolean": "bool", "file": "file", "null": "null"}
+PARAM_LOCATIONS = ("path", "query", "header", "cookie", "formData")
+SCHEMA_KEYS = {"$ref", "properties", "items", "allOf", "oneOf", "anyOf", "enum"}
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_NAME_RE = re.compile(r"[^0-9A-Za-z_]")
+
+def compact_json(value: Any) -> str:
+    """无缩进、无多余空格的 JSON（提示词中替代 indent=2）"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def load_json(value: Any) -> Any:
+    """数据库中的 JSON 列：字符串解析为对象，解析失败返回 None"""
+    if isinstance(value, str):
+        try:
+            return json.loads(value) if value.strip() else None
+        except ValueError:
+            return None
+    return value
+
+
+def _ref_name(ref: str) -> str:
+    return str(ref).rstrip("/").split("/")[-1] or "any"
+
+
+def is_schema(value: Any) -> bool:
+    """是 JSON Schema 还是示例值（手工录入的接口常直接存示例）"""
+    if not isinstance(value, dict):
+        return False
+    return bool(SCHEMA_KEYS & value.keys()) or value.get("type") in PRIMITIVES or value.get("type") in ("object", "array")
+
+
+def _truncate(text: str, limit: int = MAX_DESCRIPTION_CHARS) -> str:
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class _Encoder:
+    """两遍渲染：第一遍统计对象结构出现次数，第二遍把重复的结构替换为共享类型名"""
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.names: Dict[str, str] = {}         # 原始签名 -> 类型名
+        self.definitions: Dict[str, str] = {}   # 类型名 -> 定义
+        self.deps: Dict[str, Set[str]] = {}     # 类型名 -> 定义中引用的其他类型
+        self.mode = "count"                     # count: 统计 / raw: 原样渲染 / hoist: 替换共享类型
+        self._used: Set[str] = set()
+
+    # ---------- 类型签名 ----------
+
+    def schema(self, schema: Any, depth: int = 0) -> str:
+        if not isinstance(schema, dict):
+            return "any"
+        if "$ref" in schema:
+            return _ref_name(schema["$ref"])
+        for key, sep in (("allOf", "&"), ("oneOf", "|"), ("anyOf", "|")):
+            if isinstance(schema.get(key), list) and schema[key]:
+                return sep.join(self.schema(s, depth) for s in schema[key])
+        if isinstance(schema.get("enum"), list) and schema["enum"]:
+            values = [json.dumps(v, ensure_ascii=False) for v in schema["enum"][:MAX_ENUM_VALUES]]
+            return "|".join(values) + ("|…" if len(schema["enum"]) > MAX_ENUM_VALUES else "")
+
+        kind = schema.get("type")
+        if isinstance(kind, list):  # OpenAPI 3.1: ["string", "null"]
+            kind = next((k for k in kind if k != "null"), "null")
+        if kind == "array" or "items" in schema:
+            return f"[{self.schema(schema.get('items'), depth + 1)}]"
+        if kind == "object" or "properties" in schema:
+            return self._object(schema, depth)
+        return PRIMITIVES.get(kind, "any")
+
+    def _object(self, schema: Dict, depth: int) -> str:
+        properties = schema.get("properties") or {}
+        if not isinstance(properties, dict) or not properties:
+            extra = schema.get("additionalProperties")
+            return f"{{str:{self.schema(extra, depth + 1)}}}" if isinstance(extra, dict) else "obj"
+        if depth >= MAX_DEPTH:
+            return "{…}"
+
+        if self.mode == "count":
+            raw = self._fields(schema, properties, depth, "count")
+            self.counts[raw] += 1
+            return raw
+        if self.mode == "raw":
+            return self._fields(schema, properties, depth, "raw")
+
+        raw = self._fields(schema, properties, depth, "raw")
+        if raw in self.names:
+            self._used.add(self.names[raw])
+            return self.names[raw]
+        if self.counts[raw] >= 2 and len(raw) >= MIN_HOIST_CHARS:
+            return self._hoist(raw, schema, properties, depth)
+        return self._fields(schema, properties, depth, "hoist")
+
+    def _fields(self, schema: Dict, properties: Dict, depth: int, mode: str) -> str:
+        saved = self.mode
+        self.mode = mode
+        try:
+            required = set(schema.get("required") or []) if "required" in schema else None
+            fields = [
+                f"{name}{'?' if required is not None and name not in required else ''}:{self.schema(prop, depth + 1)}"
+                for name, prop in list(properties.items())[:MAX_PROPERTIES]
+            ]
+        finally:
+            self.mode = saved
+        if len(properties) > MAX_PROPERTIES:
+            fields.append("…")
+        return "{" + ",".join(fields) + "}"
+
+    def _hoist(self, raw: str, schema: Dict, properties: Dict, depth: int) -> str:
+        base = _NAME_RE.sub("", str(schema.get("title") or "")) or "T"
+        name = base if base != "T" and base not in self.definitions else f"{base}{len(self.definitions) + 1}"
+        self.names[raw] = name
+        outer = self._used
+        self._used = set()
+        self.definitions[name] = self._fields(schema, properties, depth, "hoist")
+        self.deps[name] = self._used - {name}
+        self._used = outer | {name}
+        return name
+
+    def example(self, value: Any, depth: int = 0) -> str:
+        """手工录入的接口常以示例值代替 schema，按值推断类型"""
+        if isinstance(value, bool):
+            return "bool"
+        if isinstance(value, int):
+            return "int"
+        if isinstance(value, float):
+            return "num"
+        if isinstance(value, str):
+            return "str"
+        if isinstance(value, list):
+            return f"[{self.example(value[0], depth + 1) if value else 'any'}]"
+        if isinstance(value, dict):
+            if depth >= MAX_DEPTH:
+                return "{…}"
+            fields = [f"{k}:{self.example(v, depth + 1)}" for k, v in list(value.items())[:MAX_PROPERTIES]]
+            return "{" + ",".join(fields) + "}"
+        return "any"
+
+    def value(self, value: Any) -> str:
+        return self.schema(value) if is_schema(value) else self.example(value)
+
+    # ---------- 参数 / 请求体 ----------
+
+    def parameters(self, raw: Any) -> Tuple[List[Tuple[str, str]], Optional[str]]:
+        """返回 ([(位置, 参数签名)], Swagger 2 的 body 参数类型)"""
+        raw = load_json(raw)
+        params, body = [], None
+        if isinstance(raw, dict):
+            # 示例值形式 {"page": 1}：视为 query 参数
+            return [("query", f"{k}:{self.example(v)}") for k, v in raw.items()], None
+        for p in raw if isinstance(raw, list) else []:
+            if not isinstance(p, dict):
+                continue
+            if "$ref" in p:
+                params.append(("query", _ref_name(p["$ref"])))
+                continue
+            location = p.get("in") or "query"
+            if location == "body":
+                body = self.value(p.get("schema"))
+                continue
+            kind = self.schema(p.get("schema") if isinstance(p.get("schema"), dict) else p)
+            optional = "" if p.get("required") or location == "path" else "?"
+            params.append((location, f"{p.get('name')}{optional}:{kind}"))
+        return params, body
+
+    def request_body(self, raw: Any) -> Optional[str]:
+        raw = load_json(raw)
+        if raw in (None, "", [], {}):
+            return None
+        if isinstance(raw, dict) and "$ref" in raw and len(raw) == 1:
+            return _ref_name(raw["$ref"])
+        if isinstance(raw, dict) and isinstance(raw.get("content"), dict):
+            content = raw["content"]
+            media = content.get("application/json") or next(iter(content.values()), None)
+            schema = media.get("schema") if isinstance(media, dict) else None
+            return self.value(schema) if schema else None
+        return self.value(raw)
+
+    def api_line(self, api: Dict, common: Set[Tuple[str, str]]) -> str:
+        params, body = self.parameters(api.get("parameters"))
+        body = self.request_body(api.get("request_body")) or body
+        parts = [str(api.get("method") or "").upper(), str(api.get("path") or "")]
+        for location in PARAM_LOCATIONS:
+            names = [sig for loc, sig in params if loc == location and (loc, sig) not in common]
+            if names:
+                parts.append(f"{location}({','.join(names)})")
+        if body:
+            parts.append(f"body:{body}")
+        line = " ".join(parts)
+        description = _description(api)
+        return f"{line}  # {description}" if description else line
+
+    def render(self, api: Dict, common: Set[Tuple[str, str]]) -> Tuple[str, Set[str]]:
+        """渲染一个接口，返回 (行, 用到的共享类型及其依赖)"""
+        self._used = set()
+        line = self.api_line(api, common)
+        needed, stack = set(), list(self._used)
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.deps.get(name, ()))
+        return line, needed
+
+
+def _description(api: Dict) -> str:
+    summary = str(api.get("summary") or "").strip()
+    description = str(api.get("description") or "").strip()
+    if description and description != summary:
+        summary = f"{summary}；{description}" if summary else description
+    return _truncate(summary)
+
+
+def encode_apis(apis: List[Dict], token_budget: int = DEFAULT_TOKEN_BUDGET) -> Tuple[str, int]:
+    """
+    把接口列表编码成紧凑的提示词文本
+
+    Args:
+        apis: 接口行（path / method / summary / description / parameters / request_body），按优先级排好序
+        token_budget: 文本的 token 上限；超出后跳过剩余接口（至少放一个）
+
+    Returns:
+        (文本, 放入的接口数)
+    """
+    seen, unique = set(), []
+    for api in apis:
+        key = (str(api.get("method") or "").upper(), str(api.get("path") or ""))
+        if key[1] and key not in seen:
+            seen.add(key)
+            unique.append(api)
+    if not unique:
+        return "", 0
+
+    encoder = _Encoder()
+    param_sets = []
+    for api in unique:
+        encoder.request_body(api.get("request_body"))
+        params, _ = encoder.parameters(api.get("parameters"))
+        param_sets.append(set(params))
+    # 所有接口共有的参数只列一次
+    common = set.intersection(*param_sets) if len(unique) > 1 else set()
+    encoder.mode = "hoist"
+
+    header = [LEGEND]
+    if common:
+        groups = [
+            f"{loc}({','.join(sorted(sig for l, sig in common if l == loc))})"
+            for loc in PARAM_LOCATIONS if any(l == loc for l, _ in common)
+        ]
+        header.append(f"# 以下接口均带参数: {' '.join(groups)}")
+    used = count_tokens("\n".join(header)) + 4
+
+    lines, types = [], []
+    included: Set[str] = set()
+    for api in unique:
+        line, needed = encoder.render(api, common)
+        new_types = [f"{name}={encoder.definitions[name]}" for name in sorted(needed - included)]
+        cost = count_tokens("\n".join([line, *new_types])) + 1 + len(new_types)
+        if used + cost > token_budget and lines:
+            continue
+        lines.append(line)
+        types.extend(new_types)
+        included |= needed
+        used += cost
+
+    omitted = len(unique) - len(lines)
+    text = "\n".join(header + (["types:", *types] if types else []) + ["apis:", *lines])
+    if omitted:
+        text += f"\n# 另有 {omitted} 个接口超出长度限制未列出"
+    return text, len(lines)
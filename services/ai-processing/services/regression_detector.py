@@ -0,0 +1,197 @@
+"""
+响应时间回归检测
+
+用 execution_steps 中的步骤耗时，对每个接口比较「基线窗口」和「最近窗口」的耗时分布：
+- 检验：单侧 Mann-Whitney U 检验（基于秩，不假设正态，对偶发的超长耗时不敏感）
+- 幅度：最近窗口中位数相对基线中位数的涨幅
+
+两者同时满足（p 值 < alpha 且涨幅 >= min_shift）才判定为回归，避免样本很多时把微小的抖动也报出来。
+
+窗口有两种划分方式：
+- 按天：最近 recent_days 天 vs 之前 baseline_days 天（报表）
+- 按执行次数：某个场景最近 recent_runs 次执行 vs 之前 baseline_runs 次执行（定时任务每次运行后检查）
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+import math
+import sqlite3
+
+
+DEFAULT_ALPHA = 0.01
+DEFAULT_MIN_SHIFT = 0.2  # 中位数至少上涨 20%
+MIN_BASELINE_SAMPLES = 10
+MIN_RECENT_SAMPLES = 3
+MAX_SAMPLES = 2000  # 每个接口每个窗口最多取最近的这么多条耗时
+
+
+def mann_whitney_u(baseline: Sequence[float], recent: Sequence[float]) -> Tuple[float, float]:
+    """
+    单侧 Mann-Whitney U 检验（备择假设：recent 整体大于 baseline），正态近似并做并列秩修正
+
+    Returns:
+        (U 统计量, p 值)
+    """
+    n1, n2 = len(recent), len(baseline)
+    if n1 == 0 or n2 == 0:
+        return 0.0, 1.0
+    values = sorted([(v, 1) for v in recent] + [(v, 0) for v in baseline])
+    n = n1 + n2
+    rank_sum = 0.0
+    tie_term = 0.0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and values[j + 1][0] == values[i][0]:
+            j += 1
+        avg_rank = (i + j) / 2 + 1
+        ties = j - i + 1
+        tie_term += ties ** 3 - ties
+        rank_sum += avg_rank * sum(flag for _, flag in values[i:j + 1])
+        i = j + 1
+
+    u = rank_sum - n1 * (n1 + 1) / 2
+    mean = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return u, 1.0
+    z = (u - mean - 0.5) / math.sqrt(variance)  # 连续性修正
+    return u, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def _quantile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * (len(sorted_values) - 1) + 0.5))]
+
+
+def _summary(values: List[float]) -> Dict:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "p50": round(_quantile(ordered, 0.5), 2),
+        "p90": round(_quantile(ordered, 0.9), 2),
+        "mean": round(sum(ordered) / len(ordered), 2)
+    }
+
+
+def compare_windows(
+    baseline: Dict[Tuple[str, str], List[float]],
+    recent: Dict[Tuple[str, str], List[float]],
+    alpha: float = DEFAULT_ALPHA,
+    min_shift: float = DEFAULT_MIN_SHIFT,
+    min_baseline: int = MIN_BASELINE_SAMPLES,
+    min_recent: int = MIN_RECENT_SAMPLES
+) -> List[Dict]:
+    """
+    逐接口比较两个窗口的耗时，返回判定为回归的接口（按涨幅降序）
+
+    Args:
+        baseline / recent: {(method, path): [耗时毫秒, ...]}
+    """
+    regressions = []
+    for (method, path), recent_values in recent.items():
+        baseline_values = baseline.get((method, path)) or []
+        if len(baseline_values) < min_baseline or len(recent_values) < min_recent:
+            continue
+        before, after = _summary(baseline_values), _summary(recent_values)
+        if before["p50"] <= 0:
+            continue
+        shift = after["p50"] / before["p50"] - 1
+        if shift < min_shift:
+            continue
+        _, p_value = mann_whitney_u(baseline_values, recent_values)
+        if p_value >= alpha:
+            continue
+        regressions.append({
+            "api_name": f"{method} {path}",
+            "method": method,
+            "path": path,
+            "baseline": before,
+            "recent": after,
+            "shift": round(shift, 4),
+            "p_value": p_value
+        })
+    regressions.sort(key=lambda r: r["shift"], reverse=True)
+    return regressions
+
+
+def _collect(rows) -> Dict[Tuple[str, str], List[float]]:
+    samples: Dict[Tuple[str, str], List[float]] = {}
+    for method, path, duration_ms in rows:
+        values = samples.setdefault((method, path), [])
+        if len(values) < MAX_SAMPLES:
+            values.append(duration_ms)
+    return samples
+
+
+def detect_by_days(
+    conn: sqlite3.Connection,
+    project_id: str,
+    recent_days: int = 1,
+    baseline_days: int = 14,
+    scenario_id: Optional[int] = None,
+    **options
+) -> List[Dict]:
+    """最近 recent_days 天 vs 之前 baseline_days 天"""
+    sql = """
+        SELECT s.method, s.path, s.duration_ms FROM execution_steps s
+        {join}
+        WHERE s.project_id = ? AND s.duration_ms IS NOT NULL
+          AND s.created_at >= datetime('now', ?) {until}
+          {scenario}
+        ORDER BY s.created_at DESC
+    """
+
+    def _window(start_days: int, end_days: Optional[int]):
+        params = [project_id, f"-{start_days} days"]
+        if end_days is not None:
+            params.append(f"-{end_days} days")
+        if scenario_id is not None:
+            params.append(scenario_id)
+        query = sql.format(
+            join="JOIN executions e ON e.id = s.execution_id" if scenario_id is not None else "",
+            until="AND s.created_at < datetime('now', ?)" if end_days is not None else "",
+            scenario="AND e.scenario_id = ?" if scenario_id is not None else ""
+        )
+        return _collect(conn.execute(query, params).fetchall())
+
+    recent = _window(recent_days, None)
+    baseline = _window(recent_days + baseline_days, recent_days)
+    return compare_windows(baseline, recent, **options)
+
+
+def detect_by_runs(
+    conn: sqlite3.Connection,
+    scenario_id: int,
+    recent_runs: int = 3,
+    baseline_runs: int = 30,
+    **options
+) -> List[Dict]:
+    """场景最近 recent_runs 次执行 vs 之前 baseline_runs 次执行"""
+    ids = [row[0] for row in conn.execute("""
+        SELECT id FROM executions
+        WHERE scenario_id = ? AND status != 'running'
+        ORDER BY id DESC LIMIT ?
+    """, (scenario_id, recent_runs + baseline_runs)).fetchall()]
+
+    def _window(execution_ids: List[int]):
+        if not execution_ids:
+            return {}
+        placeholders = ",".join("?" * len(execution_ids))
+        return _collect(conn.execute(f"""
+            SELECT method, path, duration_ms FROM execution_steps
+            WHERE execution_id IN ({placeholders}) AND duration_ms IS NOT NULL
+        """, execution_ids).fetchall())
+
+    return compare_windows(_window(ids[recent_runs:]), _window(ids[:recent_runs]), **options)
+
+
+def format_regressions(regressions: List[Dict], limit: int = 5) -> str:
+    """通知用的文本摘要"""
+    lines = [f"⚠️ 检测到 {len(regressions)} 个接口响应时间回归:"]
+    for r in regressions[:limit]:
+        lines.append(
+            f"- {r['api_name']}: p50 {r['baseline']['p50']}ms -> {r['recent']['p50']}ms "
+            f"(+{r['shift'] * 100:.0f}%, p={r['p_value']:.2g})"
+        )
+    if len(regressions) > limit:
+        lines.append(f"- ... 另有 {len(regressions) - limit} 个")
+    return "\n".join(lines)
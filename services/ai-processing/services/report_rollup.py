@@ -0,0 +1,148 @@
+"""
+报表汇总表维护
+
+rollup_hourly / rollup_daily 按 (项目, 时间桶, 场景) 累计执行次数、成功数和步骤耗时，
+报表查询只需读取少量汇总行，不再扫描 executions 原始记录。
+
+- 增量：每次执行落库时调用 apply_execution，在同一事务内累加
+- 回填：python -m services.report_rollup <db_path>
+  先为缺少明细的历史执行补写 execution_steps，再从明细重算全部汇总和分位数草图（可重复执行）
+"""
+
+from typing import Dict, Optional
+import sqlite3
+import sys
+
+from services.blob_store import BlobStore
+from services.latency_sketch import rebuild_latency_sketches
+
+
+ROLLUP_TABLES = {
+    "rollup_hourly": "%Y-%m-%d %H:00:00",
+    "rollup_daily": "%Y-%m-%d",
+}
+
+_METRICS = ("executions", "success_executions", "steps", "success_steps", "duration_sum_ms", "duration_count")
+
+
+def resolve_scenario_id(cursor: sqlite3.Cursor, test_case_id: Optional[int]) -> int:
+    """用例对应的场景 ID，未关联场景时为 0"""
+    if not test_case_id:
+        return 0
+    cursor.execute("SELECT id FROM scenarios WHERE test_case_id = ? ORDER BY id DESC LIMIT 1", (test_case_id,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def apply_execution(cursor: sqlite3.Cursor, execution_id: int):
+    """把一次已完成的执行累加到各汇总表"""
+    cursor.execute("""
+        SELECT e.created_at, e.project_id, e.scenario_id, e.status,
+               COUNT(s.id), COALESCE(SUM(s.success), 0),
+               COALESCE(SUM(s.duration_ms), 0), COUNT(s.duration_ms)
+        FROM executions e
+        LEFT JOIN execution_steps s ON s.execution_id = e.id
+        WHERE e.id = ?
+        GROUP BY e.id
+    """, (execution_id,))
+    row = cursor.fetchone()
+    if not row:
+        return
+    created_at, project_id, scenario_id, status, steps, success_steps, duration_sum, duration_count = tuple(row)
+    values = (1, 1 if status == "success" else 0, steps, success_steps, duration_sum, duration_count)
+
+    for table, fmt in ROLLUP_TABLES.items():
+        cursor.execute(f"""
+            INSERT INTO {table} (bucket, project_id, scenario_id, {", ".join(_METRICS)})
+            VALUES (strftime(?, ?), ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(project_id, bucket, scenario_id) DO UPDATE SET
+                {", ".join(f"{m} = {m} + excluded.{m}" for m in _METRICS)}
+        """, (fmt, created_at, project_id or "default-project", scenario_id or 0, *values))
+
+
+def backfill_execution_steps(conn: sqlite3.Connection, blob_store: BlobStore, batch_size: int = 200) -> int:
+    """为没有步骤明细的历史执行补写 execution_steps，并补齐 project_id / scenario_id"""
+    from services.execution_store import insert_execution_steps
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        UPDATE executions SET project_id = COALESCE(
+            (SELECT t.project_id FROM test_cases t WHERE t.id = executions.test_case_id), 'default-project'
+        ) WHERE project_id IS NULL
+    """)
+    cursor.execute("""
+        UPDATE executions SET scenario_id = COALESCE(
+            (SELECT MAX(s.id) FROM scenarios s WHERE s.test_case_id = executions.test_case_id AND executions.test_case_id > 0), 0
+        ) WHERE scenario_id IS NULL
+    """)
+    conn.commit()
+
+    filled = 0
+    last_id = 0
+    while True:
+        cursor.execute("""
+            SELECT e.id, e.test_case_id, e.project_id, e.results FROM executions e
+            WHERE e.id > ? AND e.status != 'running'
+              AND NOT EXISTS (SELECT 1 FROM execution_steps s WHERE s.execution_id = e.id)
+            ORDER BY e.id LIMIT ?
+        """, (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        write_cursor = conn.cursor()
+        for exec_id, test_case_id, project_id, results in rows:
+            last_id = exec_id
+            try:
+                step_results = blob_store.unpack_results(write_cursor, results)
+            except (ValueError, TypeError):
+                continue
+            if isinstance(step_results, list) and step_results:
+                insert_execution_steps(write_cursor, exec_id, test_case_id, project_id, step_results)
+                filled += 1
+        conn.commit()
+    return filled
+
+
+def rebuild_rollups(conn: sqlite3.Connection) -> Dict[str, int]:
+    """从 executions + execution_steps 重算全部汇总"""
+    cursor = conn.cursor()
+    counts = {}
+    for table, fmt in ROLLUP_TABLES.items():
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(f"""
+            INSERT INTO {table} (bucket, project_id, scenario_id, {", ".join(_METRICS)})
+            SELECT strftime(?, e.created_at), COALESCE(e.project_id, 'default-project'), COALESCE(e.scenario_id, 0),
+                   COUNT(*), SUM(e.status = 'success'),
+                   SUM(st.steps), SUM(st.success_steps), SUM(st.duration_sum_ms), SUM(st.duration_count)
+            FROM executions e
+            JOIN (
+                SELECT e2.id AS execution_id,
+                       COUNT(s.id) AS steps, COALESCE(SUM(s.success), 0) AS success_steps,
+                       COALESCE(SUM(s.duration_ms), 0) AS duration_sum_ms, COUNT(s.duration_ms) AS duration_count
+                FROM executions e2 LEFT JOIN execution_steps s ON s.execution_id = e2.id
+                GROUP BY e2.id
+            ) st ON st.execution_id = e.id
+            WHERE e.status != 'running'
+            GROUP BY 1, 2, 3
+        """, (fmt,))
+        counts[table] = cursor.rowcount
+    conn.commit()
+    return counts
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("用法: python -m services.report_rollup <db_path>")
+        sys.exit(1)
+    from services.database import connect
+    from services.migrator import run_migrations
+
+    db = connect(sys.argv[1])
+    try:
+        run_migrations(db)
+        filled = backfill_execution_steps(db, BlobStore())
+        counts = rebuild_rollups(db)
+        counts["latency_sketches"] = rebuild_latency_sketches(db)
+    finally:
+        db.close()
+    print(f"✅ 补写 {filled} 条执行的步骤明细；汇总行数: {counts}")
@@ -4,27 +4,79 @@
 提供测试报告所需的各类统计数据和可视化数据
 """
 
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
 import sqlite3
 from collections import defaultdict
 
+from services.database import Database, connect
+from services.latency_sketch import DDSketch, SKETCH_DIMENSIONS
+from services.regression_detector import detect_by_days, detect_by_runs
+
+
+# get_api_stats 支持的排序方式
+API_STATS_SORTS = {
+    "total": "total DESC",
+    "slowest": "avg_ms DESC",
+    "failure_rate": "CAST(total - success AS REAL) / total DESC, total DESC",
+}
+
+# get_latency_quantiles 支持的时间粒度：天桶 -> 分组键
+LATENCY_INTERVALS = {
+    "total": lambda bucket: None,
+    "day": lambda bucket: bucket,
+    "month": lambda bucket: bucket[:7],
+}
+
+# get_failure_analysis 的失败分类：(名称, execution_steps 上的判断条件)，按顺序取第一个命中的
+FAILURE_CATEGORIES = [
+    ("超时", "s.error LIKE '%Timeout%'"),
+    ("连接错误", "s.error LIKE '%Connect%' OR s.error LIKE '%Network%'"),
+    ("请求异常", "s.error IS NOT NULL"),
+    ("HTTP 5xx", "s.status_code >= 500"),
+    ("HTTP 4xx", "s.status_code >= 400"),
+    ("参数提取失败", "s.extractions_failed > 0"),
+]
+
 
 class ReportService:
-    def __init__(self, db_path: str = "test_platform.db"):
+    def __init__(self, db_path: str = "test_platform.db", db: Optional[Database] = None):
+        """
+        Args:
+            db_path: 数据库路径
+            db: 异步数据库访问层；提供时查询在后台线程执行
+        """
         self.db_path = db_path
+        self.db = db
     
     def _get_connection(self):
-        """获取数据库连接"""
-        return sqlite3.connect(self.db_path)
+        """获取数据库连接（WAL + busy_timeout，与 Database 使用同一套配置）"""
+        return connect(self.db_path)
+
+    async def _read(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """执行只读查询 fn(conn)"""
+        if self.db is not None:
+            return await self.db.read(fn)
+        conn = self._get_connection()
+        try:
+            return fn(conn)
+        finally:
+            conn.close()
     
-    async def get_overview_stats(self, project_id: str, time_range: str = "7d") -> Dict:
+    @staticmethod
+    def _rollup_source(days: int):
+        """7 天以内读小时汇总（窗口更精确），更长的窗口读天汇总"""
+        if days <= 7:
+            return "rollup_hourly", "%Y-%m-%d %H:00:00"
+        return "rollup_daily", "%Y-%m-%d"
+
+    async def get_overview_stats(self, project_id: str, time_range: str = "7d", scenario_id: Optional[int] = None) -> Dict:
         """
-        获取概览统计数据
+        获取概览统计数据（读取汇总表）
         
         Args:
             project_id: 项目ID
             time_range: 时间范围 (7d, 30d, 90d)
+            scenario_id: 只统计该场景
         
         Returns:
             {
@@ -36,68 +88,58 @@ class ReportService:
             }
         """
         days = int(time_range.replace('d', ''))
-        start_date = datetime.now() - timedelta(days=days)
-        
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            # 总执行次数
-            cursor.execute("""
-                SELECT COUNT(*) FROM test_executions 
-                WHERE project_id = ? AND created_at >= ?
-            """, (project_id, start_date))
-            total_executions = cursor.fetchone()[0]
-            
-            # 成功次数
-            cursor.execute("""
-                SELECT COUNT(*) FROM test_executions 
-                WHERE project_id = ? AND created_at >= ? AND status = 'success'
-            """, (project_id, start_date))
-            success_count = cursor.fetchone()[0]
-            
-            # 平均响应时间
-            cursor.execute("""
-                SELECT AVG(CAST(json_extract(result, '$.avg_response_time') AS REAL))
-                FROM test_executions 
-                WHERE project_id = ? AND created_at >= ? AND result IS NOT NULL
-            """, (project_id, start_date))
-            avg_response_time = cursor.fetchone()[0] or 0
+        table, fmt = self._rollup_source(days)
+
+        def _query(conn):
+            cursor = conn.cursor()
+            conditions = "project_id = ? AND bucket >= strftime(?, 'now', ?)"
+            params = [project_id, fmt, f"-{days} days"]
+            if scenario_id is not None:
+                conditions += " AND scenario_id = ?"
+                params.append(scenario_id)
+
+            # 一次读取窗口内的全部汇总
+            cursor.execute(f"""
+                SELECT 
+                    COALESCE(SUM(executions), 0),
+                    COALESCE(SUM(success_executions), 0),
+                    COALESCE(SUM(duration_sum_ms), 0),
+                    COALESCE(SUM(duration_count), 0),
+                    COUNT(DISTINCT CASE WHEN scenario_id != 0 THEN scenario_id END)
+                FROM {table}
+                WHERE {conditions}
+            """, params)
+            totals = tuple(cursor.fetchone())
             
             # 场景统计
             cursor.execute("""
-                SELECT COUNT(*) FROM test_scenarios WHERE project_id = ?
+                SELECT COUNT(*) FROM scenarios WHERE project_id = ?
             """, (project_id,))
-            total_scenarios = cursor.fetchone()[0]
-            
-            cursor.execute("""
-                SELECT COUNT(DISTINCT scenario_id) FROM test_executions 
-                WHERE project_id = ? AND created_at >= ?
-            """, (project_id, start_date))
-            active_scenarios = cursor.fetchone()[0]
-            
-            success_rate = success_count / total_executions if total_executions > 0 else 0
-            
-            return {
-                "total_executions": total_executions,
-                "success_count": success_count,
-                "failed_count": total_executions - success_count,
-                "success_rate": round(success_rate, 4),
-                "avg_response_time": round(avg_response_time, 2),
-                "total_scenarios": total_scenarios,
-                "active_scenarios": active_scenarios
-            }
-        finally:
-            conn.close()
+            return totals + (cursor.fetchone()[0],)
+
+        total_executions, success_count, duration_sum, duration_count, active_scenarios, total_scenarios = await self._read(_query)
+        success_rate = success_count / total_executions if total_executions > 0 else 0
+        avg_response_time = duration_sum / duration_count if duration_count > 0 else 0
+        
+        return {
+            "total_executions": total_executions,
+            "success_count": success_count,
+            "failed_count": total_executions - success_count,
+            "success_rate": round(success_rate, 4),
+            "avg_response_time": round(avg_response_time, 2),
+            "total_scenarios": total_scenarios,
+            "active_scenarios": active_scenarios
+        }
     
-    async def get_trend_data(self, project_id: str, metric: str = "success_rate", days: int = 30) -> List[Dict]:
+    async def get_trend_data(self, project_id: str, metric: str = "success_rate", days: int = 30, scenario_id: Optional[int] = None) -> List[Dict]:
         """
-        获取趋势数据
+        获取趋势数据（读取天汇总表）
         
         Args:
             project_id: 项目ID
             metric: 指标类型 (success_rate, response_time, execution_count)
             days: 天数
+            scenario_id: 只统计该场景
         
         Returns:
             [
@@ -106,258 +148,368 @@ class ReportService:
                 ...
             ]
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            start_date = datetime.now() - timedelta(days=days)
-            
+        if metric not in ("success_rate", "response_time", "execution_count"):
+            return []
+
+        def _query(conn):
+            cursor = conn.cursor()
+            conditions = "project_id = ? AND bucket >= date('now', ?)"
+            params = [project_id, f"-{days} days"]
+            if scenario_id is not None:
+                conditions += " AND scenario_id = ?"
+                params.append(scenario_id)
+            cursor.execute(f"""
+                SELECT 
+                    bucket as date,
+                    SUM(executions) as total,
+                    SUM(success_executions) as success,
+                    SUM(duration_sum_ms) as duration_sum,
+                    SUM(duration_count) as duration_count
+                FROM rollup_daily
+                WHERE {conditions}
+                GROUP BY bucket
+                ORDER BY bucket
+            """, params)
+            return cursor.fetchall()
+
+        results = []
+        for row in await self._read(_query):
+            date, total, success, duration_sum, duration_count = tuple(row)
             if metric == "success_rate":
-                cursor.execute("""
-                    SELECT 
-                        DATE(created_at) as date,
-                        COUNT(*) as total,
-                        SUM(CASE WHEN status = 'success' THEN 1 ELSE 0 END) as success
-                    FROM test_executions
-                    WHERE project_id = ? AND created_at >= ?
-                    GROUP BY DATE(created_at)
-                    ORDER BY date
-                """, (project_id, start_date))
-                
-                results = []
-                for row in cursor.fetchall():
-                    date, total, success = row
-                    value = success / total if total > 0 else 0
-                    results.append({"date": date, "value": round(value, 4)})
-                
+                value = round(success / total, 4) if total > 0 else 0
             elif metric == "response_time":
-                cursor.execute("""
-                    SELECT 
-                        DATE(created_at) as date,
-                        AVG(CAST(json_extract(result, '$.avg_response_time') AS REAL)) as avg_time
-                    FROM test_executions
-                    WHERE project_id = ? AND created_at >= ? AND result IS NOT NULL
-                    GROUP BY DATE(created_at)
-                    ORDER BY date
-                """, (project_id, start_date))
-                
-                results = [{"date": row[0], "value": round(row[1] or 0, 2)} for row in cursor.fetchall()]
-                
-            elif metric == "execution_count":
-                cursor.execute("""
-                    SELECT 
-                        DATE(created_at) as date,
-                        COUNT(*) as count
-                    FROM test_executions
-                    WHERE project_id = ? AND created_at >= ?
-                    GROUP BY DATE(created_at)
-                    ORDER BY date
-                """, (project_id, start_date))
-                
-                results = [{"date": row[0], "value": row[1]} for row in cursor.fetchall()]
-            
+                value = round(duration_sum / duration_count, 2) if duration_count > 0 else 0
             else:
-                results = []
-            
-            return results
-        finally:
-            conn.close()
+                value = total
+            results.append({"date": date, "value": value})
+        
+        return results
     
-    async def get_api_stats(self, project_id: str) -> List[Dict]:
+    async def get_api_stats(self, project_id: str, days: int = 30, sort_by: str = "total", limit: int = 20) -> List[Dict]:
         """
-        获取各接口的统计数据
+        获取各接口的统计数据（基于 execution_steps 明细）
+        
+        Args:
+            project_id: 项目ID
+            days: 统计最近多少天
+            sort_by: 排序方式 (total, slowest, failure_rate)
+            limit: 返回的接口数
         
         Returns:
             [
                 {
                     "api_name": "GET /users",
+                    "method": "GET",
+                    "path": "/users",
                     "total_executions": 50,
                     "success_count": 45,
                     "failed_count": 5,
                     "success_rate": 0.9,
-                    "avg_response_time": 123.4
+                    "avg_response_time": 123.4,
+                    "max_response_time": 456.7,
+                    "extraction_failures": 0
                 },
                 ...
             ]
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            # 从test_steps中聚合数据
-            cursor.execute("""
+        if sort_by not in API_STATS_SORTS:
+            raise ValueError(f"不支持的排序方式: {sort_by}")
+
+        def _query(conn):
+            cursor = conn.cursor()
+            cursor.execute(f"""
                 SELECT 
-                    ts.name,
-                    ts.method,
-                    ts.path,
+                    method,
+                    path,
                     COUNT(*) as total,
-                    SUM(CASE WHEN te.status = 'success' THEN 1 ELSE 0 END) as success
-                FROM test_steps ts
-                JOIN test_scenarios tsc ON ts.scenario_id = tsc.id
-                JOIN test_executions te ON te.scenario_id = tsc.id
-                WHERE tsc.project_id = ?
-                GROUP BY ts.name, ts.method, ts.path
-                ORDER BY total DESC
-                LIMIT 20
-            """, (project_id,))
-            
-            results = []
-            for row in cursor.fetchall():
-                name, method, path, total, success = row
-                api_name = f"{method} {path}" if method and path else name
-                success_rate = success / total if total > 0 else 0
-                
-                results.append({
-                    "api_name": api_name,
-                    "total_executions": total,
-                    "success_count": success,
-                    "failed_count": total - success,
-                    "success_rate": round(success_rate, 4),
-                    "avg_response_time": 0  # TODO: 需要在执行时记录每个步骤的响应时间
-                })
+                    SUM(success) as success,
+                    AVG(duration_ms) as avg_ms,
+                    MAX(duration_ms) as max_ms,
+                    SUM(extractions_failed) as extraction_failures
+                FROM execution_steps
+                WHERE project_id = ? AND created_at >= datetime('now', ?)
+                GROUP BY method, path
+                ORDER BY {API_STATS_SORTS[sort_by]}
+                LIMIT ?
+            """, (project_id, f"-{int(days)} days", limit))
+            return cursor.fetchall()
+
+        results = []
+        for row in await self._read(_query):
+            method, path, total, success, avg_ms, max_ms, extraction_failures = tuple(row)
+            success = success or 0
+            success_rate = success / total if total > 0 else 0
             
-            return results
-        finally:
-            conn.close()
+            results.append({
+                "api_name": f"{method} {path}",
+                "method": method,
+                "path": path,
+                "total_executions": total,
+                "success_count": success,
+                "failed_count": total - success,
+                "success_rate": round(success_rate, 4),
+                "avg_response_time": round(avg_ms or 0, 2),
+                "max_response_time": round(max_ms or 0, 2),
+                "extraction_failures": extraction_failures or 0
+            })
+        
+        return results
+    
+    async def get_latency_quantiles(
+        self,
+        project_id: str,
+        dimension: str = "api",
+        days: int = 30,
+        key: Optional[str] = None,
+        interval: str = "total",
+        quantiles: List[float] = (0.5, 0.9, 0.99)
+    ) -> List[Dict]:
+        """
+        获取响应时间分位数（合并窗口内的天草图）
+        
+        Args:
+            project_id: 项目ID
+            dimension: 维度 (api, scenario, environment)
+            days: 统计最近多少天
+            key: 只返回该维度值（如 "GET /users"）
+            interval: 时间粒度 (total: 整个窗口合并; day / month: 按天 / 按月的趋势)
+            quantiles: 需要的分位数
+        
+        Returns:
+            [
+                {
+                    "key": "GET /users",
+                    "period": "2024-01",  # interval 为 total 时为 None
+                    "count": 1200,
+                    "avg": 120.5,
+                    "max": 980.0,
+                    "p50": 101.2,
+                    "p90": 240.8,
+                    "p99": 610.3
+                },
+                ...
+            ]
+        """
+        if dimension not in SKETCH_DIMENSIONS:
+            raise ValueError(f"不支持的维度: {dimension}")
+        if interval not in LATENCY_INTERVALS:
+            raise ValueError(f"不支持的时间粒度: {interval}")
+        for q in quantiles:
+            if not 0 <= q <= 1:
+                raise ValueError(f"分位数必须在 [0, 1] 之间: {q}")
+
+        def _query(conn):
+            sql = """
+                SELECT bucket, dim_key, sketch FROM latency_sketches
+                WHERE project_id = ? AND dimension = ? AND bucket >= date('now', ?)
+            """
+            params = [project_id, dimension, f"-{int(days)} days"]
+            if key is not None:
+                sql += " AND dim_key = ?"
+                params.append(key)
+            return conn.execute(sql, params).fetchall()
+
+        period_of = LATENCY_INTERVALS[interval]
+        merged: Dict[tuple, DDSketch] = {}
+        for bucket, dim_key, blob in await self._read(_query):
+            sketch = DDSketch.from_bytes(blob)
+            group = (dim_key, period_of(bucket))
+            if group in merged:
+                merged[group].merge(sketch)
+            else:
+                merged[group] = sketch
+
+        results = []
+        for (dim_key, period), sketch in sorted(merged.items(), key=lambda item: (item[0][1] or "", -item[1].count, item[0][0])):
+            item = {
+                "key": dim_key,
+                "period": period,
+                "count": sketch.count,
+                "avg": round(sketch.avg, 2),
+                "max": round(sketch.max, 2)
+            }
+            for q in quantiles:
+                item[f"p{q * 100:g}"] = round(sketch.quantile(q), 2)
+            results.append(item)
+        
+        return results
+    
+    async def get_latency_regressions(
+        self,
+        project_id: str,
+        recent_days: int = 1,
+        baseline_days: int = 14,
+        scenario_id: Optional[int] = None,
+        recent_runs: Optional[int] = None,
+        baseline_runs: int = 30
+    ) -> List[Dict]:
+        """
+        检测响应时间回归（最近窗口 vs 基线窗口，单侧 Mann-Whitney U 检验）
+        
+        Args:
+            project_id: 项目ID
+            recent_days / baseline_days: 按天划分窗口
+            scenario_id: 只看该场景的执行
+            recent_runs / baseline_runs: 按场景执行次数划分窗口（需要 scenario_id；提供 recent_runs 时忽略按天的参数）
+        
+        Returns:
+            [
+                {
+                    "api_name": "GET /users",
+                    "method": "GET",
+                    "path": "/users",
+                    "baseline": {"count": 300, "p50": 120.1, "p90": 210.4, "mean": 131.2},
+                    "recent": {"count": 20, "p50": 180.6, "p90": 320.0, "mean": 190.3},
+                    "shift": 0.5037,  # 中位数涨幅
+                    "p_value": 0.00012
+                },
+                ...
+            ]
+        """
+        if recent_runs is not None:
+            if scenario_id is None:
+                raise ValueError("按执行次数检测需要指定 scenario_id")
+            return await self._read(lambda conn: detect_by_runs(conn, scenario_id, recent_runs, baseline_runs))
+        return await self._read(lambda conn: detect_by_days(conn, project_id, recent_days, baseline_days, scenario_id))
     
     async def get_failure_analysis(self, project_id: str, days: int = 7) -> Dict:
         """
-        分析失败原因并分类
+        分析失败步骤并分类（基于 execution_steps 明细）
         
         Returns:
             {
                 "failure_categories": [
-                    {"category": "断言失败", "count": 15},
+                    {"category": "HTTP 4xx", "count": 15},
                     {"category": "超时", "count": 8},
                     {"category": "连接错误", "count": 5}
                 ],
                 "recent_failures": [
                     {
                         "scenario_name": "用户登录",
-                        "error_message": "断言失败: 期望200, 实际401",
+                        "api_name": "POST /login",
+                        "error_message": "HTTP 401",
                         "timestamp": "2024-01-01 10:30:00"
                     }
                 ]
             }
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            start_date = datetime.now() - timedelta(days=days)
-            
-            # 获取失败的执行记录
-            cursor.execute("""
-                SELECT 
-                    tsc.name,
-                    te.result,
-                    te.created_at
-                FROM test_executions te
-                JOIN test_scenarios tsc ON te.scenario_id = tsc.id
-                WHERE tsc.project_id = ? AND te.status = 'failed' AND te.created_at >= ?
-                ORDER BY te.created_at DESC
-                LIMIT 50
-            """, (project_id, start_date))
-            
-            failures = cursor.fetchall()
-            
-            # 简单的失败分类(基于关键词)
-            categories = defaultdict(int)
-            recent_failures = []
-            
-            for scenario_name, result_json, timestamp in failures:
-                import json
-                try:
-                    result = json.loads(result_json) if result_json else {}
-                    error_msg = result.get('error', '未知错误')
-                except:
-                    error_msg = '解析错误'
-                
-                # 分类
-                if '断言' in error_msg or 'assertion' in error_msg.lower():
-                    categories['断言失败'] += 1
-                elif '超时' in error_msg or 'timeout' in error_msg.lower():
-                    categories['超时'] += 1
-                elif '连接' in error_msg or 'connection' in error_msg.lower():
-                    categories['连接错误'] += 1
-                elif '404' in error_msg or '500' in error_msg:
-                    categories['HTTP错误'] += 1
-                else:
-                    categories['其他错误'] += 1
-                
-                # 最近失败
-                if len(recent_failures) < 10:
-                    recent_failures.append({
-                        "scenario_name": scenario_name,
-                        "error_message": error_msg[:100],  # 限制长度
-                        "timestamp": timestamp
-                    })
-            
-            failure_categories = [
-                {"category": cat, "count": count}
-                for cat, count in sorted(categories.items(), key=lambda x: x[1], reverse=True)
-            ]
-            
-            return {
-                "failure_categories": failure_categories,
-                "recent_failures": recent_failures
-            }
-        finally:
-            conn.close()
+        category = f"CASE {' '.join(f'WHEN {cond} THEN {name!r}' for name, cond in FAILURE_CATEGORIES)} ELSE '其他错误' END"
+
+        def _query(conn):
+            cursor = conn.cursor()
+            window = "s.project_id = ? AND s.success = 0 AND s.created_at >= datetime('now', ?)"
+            params = (project_id, f"-{int(days)} days")
+            cursor.execute(f"""
+                SELECT {category} AS category, COUNT(*) AS count
+                FROM execution_steps s
+                WHERE {window}
+                GROUP BY 1
+                ORDER BY 2 DESC, 1
+            """, params)
+            categories = [tuple(row) for row in cursor.fetchall()]
+
+            cursor.execute(f"""
+                SELECT sc.name, s.method, s.path, s.status_code, s.error, s.extractions_failed, s.created_at
+                FROM execution_steps s
+                LEFT JOIN executions e ON e.id = s.execution_id
+                LEFT JOIN scenarios sc ON sc.id = e.scenario_id
+                WHERE {window}
+                ORDER BY s.created_at DESC, s.id DESC
+                LIMIT 10
+            """, params)
+            return categories, [tuple(row) for row in cursor.fetchall()]
+
+        categories, failures = await self._read(_query)
+        recent_failures = []
+        for scenario_name, method, path, status_code, error, extractions_failed, timestamp in failures:
+            if error:
+                message = error
+            elif status_code is not None and status_code >= 400:
+                message = f"HTTP {status_code}"
+            elif extractions_failed:
+                message = f"{extractions_failed} 个参数提取失败"
+            else:
+                message = "未知错误"
+            recent_failures.append({
+                "scenario_name": scenario_name,
+                "api_name": f"{method} {path}",
+                "error_message": message[:100],  # 限制长度
+                "timestamp": timestamp
+            })
+
+        return {
+            "failure_categories": [{"category": name, "count": count} for name, count in categories],
+            "recent_failures": recent_failures
+        }
     
-    async def generate_sankey_data(self, scenario_id: int) -> Dict:
+    async def generate_sankey_data(self, scenario_id: int, runs: int = 100) -> Dict:
         """
-        生成桑基图数据(接口调用链路)
+        生成桑基图数据(接口调用链路，基于场景最近 runs 次执行的步骤明细)
         
         Returns:
             {
                 "nodes": [
                     {"name": "开始"},
+                    {"name": "结束"},
+                    {"name": "失败"},
                     {"name": "GET /login"},
-                    {"name": "POST /users"},
-                    {"name": "结束"}
+                    {"name": "POST /users"}
                 ],
                 "links": [
-                    {"source": 0, "target": 1, "value": 100},
-                    {"source": 1, "target": 2, "value": 95},
-                    {"source": 2, "target": 3, "value": 90}
+                    {"source": 0, "target": 3, "value": 100},
+                    {"source": 3, "target": 4, "value": 95},
+                    {"source": 3, "target": 2, "value": 5},
+                    {"source": 4, "target": 1, "value": 90}
                 ]
             }
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            # 获取场景的所有步骤
+        def _query(conn):
+            cursor = conn.cursor()
             cursor.execute("""
-                SELECT id, name, method, path, step_order
-                FROM test_steps
-                WHERE scenario_id = ?
-                ORDER BY step_order
-            """, (scenario_id,))
-            
-            steps = cursor.fetchall()
-            
-            # 构建节点
-            nodes = [{"name": "开始"}]
-            for step in steps:
-                step_id, name, method, path, order = step
-                node_name = f"{method} {path}" if method and path else name
-                nodes.append({"name": node_name})
-            nodes.append({"name": "结束"})
-            
-            # 构建链接(简化版,实际应该基于执行数据)
-            links = []
-            for i in range(len(nodes) - 1):
-                links.append({
-                    "source": i,
-                    "target": i + 1,
-                    "value": 100 - i * 5  # 模拟数据,实际应该从执行记录中统计
-                })
-            
-            return {
-                "nodes": nodes,
-                "links": links
-            }
-        finally:
-            conn.close()
+                WITH recent AS (
+                    SELECT id FROM executions WHERE scenario_id = ? AND status != 'running' ORDER BY id DESC LIMIT ?
+                ),
+                steps AS (
+                    SELECT s.execution_id, s.step_order, s.method, s.path, s.success,
+                           LEAD(s.method) OVER w AS next_method,
+                           LEAD(s.path) OVER w AS next_path,
+                           ROW_NUMBER() OVER w AS position
+                    FROM execution_steps s
+                    WHERE s.execution_id IN (SELECT id FROM recent)
+                    WINDOW w AS (PARTITION BY s.execution_id ORDER BY s.step_order)
+                )
+                SELECT position, method, path, success, next_method, next_path, COUNT(*)
+                FROM steps
+                GROUP BY 1, 2, 3, 4, 5, 6
+                ORDER BY 1
+            """, (scenario_id, runs))
+            return [tuple(row) for row in cursor.fetchall()]
+
+        nodes = [{"name": "开始"}, {"name": "结束"}, {"name": "失败"}]
+        index: Dict[tuple, int] = {}
+
+        def _node(position: int, method: str, path: str) -> int:
+            # 同一接口出现在不同位置时是不同的节点
+            key = (position, method, path)
+            if key not in index:
+                index[key] = len(nodes)
+                name = f"{method} {path}"
+                nodes.append({"name": name if name not in {n["name"] for n in nodes} else f"{name} #{position}"})
+            return index[key]
+
+        values: Dict[tuple, int] = defaultdict(int)
+        for position, method, path, success, next_method, next_path, count in await self._read(_query):
+            node = _node(position, method, path)
+            if position == 1:
+                values[(0, node)] += count
+            if not success:
+                values[(node, 2)] += count
+            elif next_path is None and next_method is None:
+                values[(node, 1)] += count
+            else:
+                values[(node, _node(position + 1, next_method, next_path))] += count
+
+        return {
+            "nodes": nodes,
+            "links": [{"source": source, "target": target, "value": value} for (source, target), value in values.items()]
+        }
@@ -0,0 +1,217 @@
+"""
+大响应体的选择性流式读取
+
+流式读取步骤响应时：
+- 响应体不超过 max_body_size：与普通模式一样完整解析并保存
+- 超过上限：用增量 JSON 解析器 (ijson) 边读边解析，只构建后续映射 / 断言引用到的子树，
+  保存的 response 是仅包含这些子树的稀疏文档；完整响应体只在需要时写入磁盘
+
+未安装 ijson 时，超限响应体会先落到临时文件再整体解析，仍能限制保存体积，但无法降低解析时的内存峰值。
+引用路径没有静态前缀时（如根节点是数组的 [0].id、[*].id），需要的子树就是整个文档，
+此时退化为完整解析（仍是边读边构建，不保留原始字节）。
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+import json
+import os
+import tempfile
+import httpx
+
+from services.field_extractor import FieldExtractor
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+
+# 截断响应保留的文本预览长度（字节）
+PREVIEW_BYTES = 1024
+
+
+def collapse_prefixes(extractors: Iterable[FieldExtractor]) -> List[List[str]]:
+    """收集提取器的静态前缀，并去掉被更短前缀覆盖的部分"""
+    prefixes = sorted({tuple(e.static_prefix()) for e in extractors}, key=len)
+    kept: List[tuple] = []
+    for p in prefixes:
+        if not any(p[:len(k)] == k for k in kept):
+            kept.append(p)
+    return [list(p) for p in kept]
+
+
+def _set_path(doc: Dict, path: List[str], value: Any) -> Any:
+    if not path:
+        return value
+    node = doc
+    for key in path[:-1]:
+        node = node.setdefault(key, {})
+    node[path[-1]] = value
+    return doc
+
+
+class SelectiveJsonParser:
+    """基于 ijson 的增量解析器，只构建指定前缀下的子树"""
+
+    def __init__(self, prefixes: List[List[str]]):
+        self._targets = {".".join(p): p for p in prefixes}
+        self._found: Dict[str, Any] = {}
+        self._events = ijson.sendable_list()
+        self._coro = ijson.parse_coro(self._events, use_float=True)
+        self._builder = None
+        self._building: Optional[str] = None
+        self._depth = 0
+
+    @property
+    def done(self) -> bool:
+        """全部目标子树都已构建完成"""
+        return self._building is None and len(self._found) == len(self._targets)
+
+    def feed(self, chunk: bytes):
+        if self.done:
+            return
+        self._coro.send(chunk)
+        self._consume()
+
+    def _consume(self):
+        for prefix, event, value in self._events:
+            if self._building is None:
+                if prefix not in self._targets or event in ("map_key", "end_map", "end_array"):
+                    continue
+                self._builder = ijson.ObjectBuilder()
+                self._building = prefix
+                self._depth = 0
+            self._builder.event(event, value)
+            if event in ("start_map", "start_array"):
+                self._depth += 1
+            elif event in ("end_map", "end_array"):
+                self._depth -= 1
+            if self._depth == 0:
+                self._found[self._building] = self._builder.value
+                self._building = None
+                self._builder = None
+        del self._events[:]
+
+    def close(self) -> Any:
+        """结束解析，返回仅包含目标子树的稀疏文档"""
+        if not self.done:
+            self._coro.close()
+            self._consume()
+        doc: Any = {}
+        for key, value in self._found.items():
+            doc = _set_path(doc, self._targets[key], value)
+        return doc
+
+
+def _partial_from_document(document: Any, prefixes: List[List[str]]) -> Any:
+    """从完整文档中截取目标子树（无 ijson 时的回退方案）"""
+    doc: Any = {}
+    for prefix in prefixes:
+        node = document
+        for key in prefix:
+            node = node.get(key) if isinstance(node, dict) else None
+            if node is None:
+                break
+        if node is not None:
+            doc = _set_path(doc, prefix, node)
+    return doc
+
+
+async def read_response(
+    res: httpx.Response,
+    extractors: List[FieldExtractor],
+    max_body_size: int,
+    spill_path: Optional[str] = None
+) -> Dict:
+    """
+    流式读取响应体
+
+    Args:
+        res: 以 client.stream() 打开、尚未读取响应体的响应
+        extractors: 需要保留的字段提取器（后续映射与断言）
+        max_body_size: 完整保存响应体的大小上限（字节）
+        spill_path: 超限时完整响应体的落盘路径；为空则不落盘
+
+    Returns:
+        {"response": 解析结果或稀疏文档, "size": 字节数, "truncated": 是否截断,
+         "file": 落盘路径, "preview": 截断时的文本预览}
+    """
+    is_json = "json" in res.headers.get("content-type", "").lower()
+    prefixes = collapse_prefixes(extractors)
+    if prefixes == [[]]:
+        print("DEBUG: referenced fields have no static prefix, large response will be parsed in full")
+    parser = None
+    parse_error = None
+    buffer = bytearray()
+    preview = b""
+    spill = None
+    size = 0
+
+    try:
+        async for chunk in res.aiter_bytes():
+            size += len(chunk)
+            if len(preview) < PREVIEW_BYTES:
+                preview += chunk[:PREVIEW_BYTES - len(preview)]
+
+            if buffer is not None:
+                buffer += chunk
+                if len(buffer) > max_body_size:
+                    # 超限：切换到流式模式，内存中不再保留原始字节
+                    if spill_path or (is_json and not IJSON_AVAILABLE and prefixes):
+                        if spill_path:
+                            os.makedirs(os.path.dirname(spill_path), exist_ok=True)
+                            spill = open(spill_path, "w+b")
+                        else:
+                            spill = tempfile.TemporaryFile()
+                        spill.write(buffer)
+                    if is_json and IJSON_AVAILABLE and prefixes:
+                        parser = SelectiveJsonParser(prefixes)
+                        try:
+                            parser.feed(bytes(buffer))
+                        except Exception as e:
+                            parse_error, parser = e, None
+                    buffer = None
+                continue
+
+            if spill is not None:
+                spill.write(chunk)
+            if parser is not None:
+                try:
+                    parser.feed(chunk)
+                except Exception as e:
+                    parse_error, parser = e, None
+
+        if buffer is not None:
+            # 未超限：与普通模式一致
+            raw = bytes(buffer)
+            try:
+                response = json.loads(raw)
+            except Exception:
+                response = raw.decode(res.encoding or "utf-8", "replace")
+            return {"response": response, "size": size, "truncated": False, "file": None, "preview": None}
+
+        response: Any = None
+        if parser is not None:
+            try:
+                response = parser.close()
+            except Exception as e:
+                parse_error = e
+        elif is_json and prefixes and spill is not None and not IJSON_AVAILABLE:
+            spill.seek(0)
+            try:
+                response = _partial_from_document(json.load(spill), prefixes)
+            except Exception as e:
+                parse_error = e
+        if parse_error is not None:
+            print(f"DEBUG: WARNING - streaming JSON parse failed: {parse_error}")
+
+        return {
+            "response": response,
+            "size": size,
+            "truncated": True,
+            "file": spill_path if spill_path else None,
+            "preview": preview.decode("utf-8", "replace")
+        }
+    finally:
+        if spill is not None:
+            spill.close()
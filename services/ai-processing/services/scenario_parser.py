@@ -6,10 +6,35 @@ from openai import AsyncOpenAI
 from typing import Dict, List
 import json
 
+from services.api_retrieval import api_key as api_identity
+from services.prompt_schema import DEFAULT_TOKEN_BUDGET, compact_json, encode_apis
+
+
+def restore_api_ids(steps: List[Dict], api_candidates: List[Dict]) -> List[Dict]:
+    """
+    把 LLM 返回的 api_id（"METHOD:路径"）换回候选 API 的原始 id
+
+    紧凑编码的 API 列表不带 id，LLM 只能按 METHOD:路径 引用接口；
+    优先按 api_method + api_path 匹配，其次解析 api_id，匹配不到的保持原样。
+    """
+    ids = {api_identity(api): api["id"] for api in api_candidates or [] if api.get("id") is not None}
+    for step in steps if isinstance(steps, list) else []:
+        if not isinstance(step, dict):
+            continue
+        key = (str(step.get("api_method") or "").upper(), str(step.get("api_path") or ""))
+        if key not in ids and ":" in str(step.get("api_id") or ""):
+            method, _, path = str(step["api_id"]).partition(":")
+            key = (method.strip().upper(), path.strip())
+        if key in ids:
+            step["api_id"] = ids[key]
+    return steps
+
+
 class ScenarioParser:
-    def __init__(self, api_key: str, model: str = "gpt-4"):
+    def __init__(self, api_key: str, model: str = "gpt-4", api_token_budget: int = DEFAULT_TOKEN_BUDGET):
         self.client = AsyncOpenAI(api_key=api_key)
         self.model = model
+        self.api_token_budget = api_token_budget
     
     async def parse_scenario(
         self,
@@ -79,11 +104,13 @@ class ScenarioParser:
 }
 """
         
+        # 候选 API 按检索顺序在 token 预算内紧凑编码
+        api_catalog, _ = encode_apis(api_candidates or [], self.api_token_budget)
         user_prompt = f"""测试意图：
-{json.dumps(nlu_result, ensure_ascii=False, indent=2)}
+{compact_json(nlu_result)}
 
-可用的API列表：
-{json.dumps(api_candidates or [], ensure_ascii=False, indent=2)}
+可用的API列表（api_id 取 "METHOD:路径"）：
+{api_catalog}
 
 请根据测试意图，从可用API中选择合适的接口，编排成完整的测试步骤序列。
 """
@@ -100,6 +127,7 @@ class ScenarioParser:
             )
             
             result = json.loads(response.choices[0].message.content)
+            restore_api_ids(result.get('steps'), api_candidates)
             result['project_id'] = project_id
             return result
             
@@ -11,19 +11,28 @@ import sqlite3
 import json
 from datetime import datetime
 import httpx
-import asyncio
+
+from services.database import connect
+from services.regression_detector import detect_by_runs, format_regressions
 
 
 class SchedulerService:
-    def __init__(self, db_path: str = "test_platform.db"):
+    def __init__(self, db_path: str = "test_platform.db", recent_runs: int = 3, baseline_runs: int = 30):
+        """
+        Args:
+            db_path: 数据库路径
+            recent_runs / baseline_runs: 每次运行后做响应时间回归检测的窗口（最近几次执行 vs 之前几次执行）
+        """
         self.db_path = db_path
+        self.recent_runs = recent_runs
+        self.baseline_runs = baseline_runs
         self.scheduler = AsyncIOScheduler()
         self.scheduler.start()
         print("📅 定时任务调度器已启动")
     
     def _get_connection(self):
-        """获取数据库连接"""
-        return sqlite3.connect(self.db_path)
+        """获取数据库连接（WAL + busy_timeout，与 Database 使用同一套配置）"""
+        return connect(self.db_path)
     
     async def create_job(self, job_config: Dict) -> Dict:
         """
@@ -159,9 +168,14 @@ class SchedulerService:
                         conn.commit()
                         
                         print(f"✅ 任务 {job_id} 执行成功")
+
+                        # 和历史运行比较响应时间
+                        regressions = self._check_regressions(conn, execution_record_id, execution_id, scenario_id)
+                        if regressions:
+                            result['latency_regressions'] = regressions
                         
-                        # 如果有失败且需要通知
-                        if result.get('failed_steps', 0) > 0 and notify_on_failure:
+                        # 如果有失败或响应时间回归且需要通知
+                        if (result.get('failed_steps', 0) > 0 or regressions) and notify_on_failure:
                             await self._send_notification(job_id, notification_config, result)
                     else:
                         raise Exception(f"执行失败: {response.text}")
@@ -185,11 +199,34 @@ class SchedulerService:
         finally:
             conn.close()
     
+    def _check_regressions(self, conn: sqlite3.Connection, execution_record_id: int, execution_id: Optional[int], scenario_id: int) -> List[Dict]:
+        """检测本次运行后的响应时间回归，结果记录到 job_executions"""
+        try:
+            if execution_id:
+                row = conn.execute("SELECT scenario_id FROM executions WHERE id = ?", (execution_id,)).fetchone()
+                if row and row[0]:
+                    scenario_id = row[0]
+            regressions = detect_by_runs(conn, scenario_id, recent_runs=self.recent_runs, baseline_runs=self.baseline_runs)
+            conn.execute(
+                "UPDATE job_executions SET latency_regressions = ? WHERE id = ?",
+                (json.dumps(regressions, ensure_ascii=False), execution_record_id)
+            )
+            conn.commit()
+            if regressions:
+                print(format_regressions(regressions))
+            return regressions
+        except Exception as e:
+            print(f"❌ 响应时间回归检测失败: {e}")
+            return []
+
     async def _send_notification(self, job_id: int, notification_config: str, result: Dict):
         """发送通知(邮件/钉钉/企业微信)"""
         try:
             config = json.loads(notification_config) if notification_config else {}
             notification_type = config.get('type', 'none')
+            if result.get('latency_regressions'):
+                # 通知正文附带回归摘要
+                result = {**result, "message": format_regressions(result['latency_regressions'])}
             
             if notification_type == 'email':
                 # TODO: 实现邮件通知
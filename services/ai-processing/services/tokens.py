@@ -0,0 +1,35 @@
+"""
+提示词 token 计数
+
+tiktoken (cl100k_base) 可用时本地精确计数；未安装或编码表加载失败（首次使用需要下载）时按字符估算。
+提示词预算（prompt_schema）和 LLM 调用的 TPM 限流（AIProvider）都用这里的 count_tokens，口径一致。
+"""
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+
+_encoding = None
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：ASCII 约 4 字符一个 token，中文约 1 字一个 token"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def count_tokens(text: str) -> int:
+    """tiktoken 可用时精确计数，否则按字符估算"""
+    global _encoding
+    if TIKTOKEN_AVAILABLE and _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"⚠️ tiktoken 编码表加载失败，使用估算: {e}")
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return estimate_tokens(text)
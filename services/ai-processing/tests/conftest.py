@@ -0,0 +1,44 @@
+"""
+ai-processing 单元测试
+
+在 services/ai-processing 目录下运行：python -m pytest -q
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.database import connect
+from services.migrator import run_migrations
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    """执行完全部迁移的临时数据库"""
+    path = str(tmp_path / "test.db")
+    conn = connect(path)
+    try:
+        run_migrations(conn)
+    finally:
+        conn.close()
+    return path
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """
+    导入 main_sqlite
+
+    模块导入时按相对路径建库并执行迁移，数据库连接也在后台线程中按相对路径打开，
+    因此在临时目录下导入，并在整个测试会话期间保持该工作目录。
+    """
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("app"))
+    try:
+        import main_sqlite
+        yield main_sqlite
+    finally:
+        os.chdir(cwd)
@@ -0,0 +1,63 @@
+from services.api_retrieval import api_key, bm25_scores, rank_apis, relevant_apis, tokenize
+
+
+def _api(method, path, summary="", description="", parameters=None):
+    return {"method": method, "path": path, "summary": summary, "description": description, "parameters": parameters}
+
+
+APIS = [
+    _api("POST", "/auth/login", "用户登录", parameters=[{"name": "username"}, {"name": "password"}]),
+    _api("POST", "/orders", "创建订单", parameters=[{"name": "productId"}, {"name": "quantity"}]),
+    _api("GET", "/orders/{orderId}", "查询订单详情"),
+    _api("GET", "/products", "商品列表"),
+    _api("DELETE", "/users/{userId}", "删除用户"),
+    _api("GET", "/reports/daily", "日报统计"),
+]
+
+
+def test_tokenize_splits_camel_case_paths_and_cjk():
+    assert tokenize("getUserById /orders/{orderId}") == ["get", "user", "by", "id", "orders", "order", "id"]
+    assert tokenize("创建订单") == ["创建", "建订", "订单"]
+    assert tokenize("单") == ["单"]
+
+
+def test_bm25_prefers_matching_documents():
+    scores = bm25_scores("创建订单 orders", APIS)
+    assert scores.index(max(scores)) == 1
+    assert scores[2] > 0  # 只匹配 orders / 订单
+    assert scores[5] == 0
+    assert bm25_scores("", APIS) == [0.0] * len(APIS)
+
+
+def test_bm25_rare_terms_weigh_more():
+    apis = [_api("GET", f"/items/{i}", "商品 列表") for i in range(5)] + [_api("GET", "/coupons", "商品 优惠券")]
+    scores = bm25_scores("商品 优惠券", apis)
+    assert scores[-1] == max(scores) and scores[-1] > scores[0]
+
+
+def test_rank_apis_keeps_auth_on_top():
+    ranked = rank_apis(APIS, "创建订单")
+    keys = [api_key(api) for _, api in ranked]
+    assert set(keys[:2]) == {("POST", "/auth/login"), ("POST", "/orders")}
+    assert ranked[0][0] == ranked[1][0]  # 登录接口保底分数等于最高分
+    assert [s for s, _ in ranked] == sorted((s for s, _ in ranked), reverse=True)
+
+
+def test_rank_apis_vector_and_neighbours():
+    ranked = rank_apis(APIS, "创建订单", vector_scores={("GET", "/reports/daily"): 0.9})
+    scores = {api_key(api): s for s, api in ranked}
+    assert scores[("GET", "/reports/daily")] > scores[("GET", "/products")]
+
+    neighbours = {("POST", "/orders"): [("GET", "/products")]}
+    boosted = {api_key(api): s for s, api in rank_apis(APIS, "创建订单", neighbours=neighbours)}
+    assert boosted[("GET", "/products")] > 0
+    assert boosted[("GET", "/products")] < boosted[("POST", "/orders")]
+
+
+def test_relevant_apis():
+    ranked = rank_apis(APIS, "删除用户")
+    relevant = relevant_apis(ranked)
+    assert ("DELETE", "/users/{userId}") in [api_key(a) for a in relevant]
+    assert ("GET", "/reports/daily") not in [api_key(a) for a in relevant]
+    # 意图为空：全部零分时按原顺序全部返回
+    assert relevant_apis([(0.0, a) for a in APIS]) == APIS
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from services.api_search import fts_query, search_apis
+from services.database import connect
+
+
+APIS = [
+    ("/api/v1/users/list", "GET", "List users", "分页查询用户", [{"name": "page"}, {"name": "size"}], "p1"),
+    ("/api/v1/users/{id}", "DELETE", "Delete user", "", {"force": {"type": "boolean"}}, "p1"),
+    ("/api/v1/orders", "POST", "Create order", "Creates an order for the current user", None, "p1"),
+    ("/api/v1/users/list", "GET", "List users", "", None, "p2"),
+]
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = connect(db_path)
+    for path, method, summary, description, parameters, project_id in APIS:
+        conn.execute(
+            "INSERT INTO apis (path, method, summary, description, parameters, project_id) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, method, summary, description, json.dumps(parameters) if parameters is not None else None, project_id)
+        )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def _ids(results):
+    return [item["id"] for item in results]
+
+
+def _fts_ids(results):
+    return [item["id"] for item in results if item["match"] == "fts"]
+
+
+def _indexed(conn, table, api_id):
+    return conn.execute(f"SELECT path, summary FROM {table} WHERE rowid = ?", (api_id,)).fetchone()
+
+
+def test_fts_query_quotes_tokens():
+    assert fts_query('users "list') == '"users"* "list"*'
+    assert fts_query("/ - {}") == ""
+
+
+def test_triggers_index_inserted_rows(conn):
+    assert _indexed(conn, "apis_fts", 1) == ("/api/v1/users/list", "List users")
+    assert _indexed(conn, "apis_trigram", 3) == ("/api/v1/orders", "Create order")
+    # 参数名来自数组元素的 name 或对象的 key
+    assert conn.execute("SELECT param_names FROM apis_fts WHERE rowid = 1").fetchone()[0] == "page size"
+    assert conn.execute("SELECT param_names FROM apis_fts WHERE rowid = 2").fetchone()[0] == "force"
+    assert _ids(search_apis(conn, "size", project_id="p1")) == [1]
+
+
+def test_triggers_follow_update_and_delete(conn):
+    conn.execute("UPDATE apis SET path = '/api/v1/accounts', summary = 'List accounts' WHERE id = 1")
+    conn.commit()
+    assert _indexed(conn, "apis_fts", 1) == ("/api/v1/accounts", "List accounts")
+    assert _indexed(conn, "apis_trigram", 1) == ("/api/v1/accounts", "List accounts")
+    assert 1 in _ids(search_apis(conn, "accounts"))
+    assert 1 not in _fts_ids(search_apis(conn, "users list", project_id="p1"))
+
+    conn.execute("DELETE FROM apis WHERE id = 1")
+    conn.commit()
+    assert _indexed(conn, "apis_fts", 1) is None
+    assert _indexed(conn, "apis_trigram", 1) is None
+    assert search_apis(conn, "accounts") == []
+
+
+def test_fts_ranks_summary_and_path_above_description(conn):
+    results = search_apis(conn, "user", project_id="p1")
+    fts = [item for item in results if item["match"] == "fts"]
+    # 摘要 / 路径命中的排在只有描述命中的前面
+    assert {item["id"] for item in fts[:2]} == {1, 2}
+    assert fts[2]["id"] == 3
+    assert [item["score"] for item in fts] == sorted((item["score"] for item in fts), reverse=True)
+
+
+def test_filters_by_project_and_method(conn):
+    assert sorted(_fts_ids(search_apis(conn, "users list"))) == [1, 4]
+    assert _ids(search_apis(conn, "users list", project_id="p2")) == [4]
+    assert _ids(search_apis(conn, "users", project_id="p1", method="delete")) == [2]
+
+
+def test_fuzzy_fallback_tolerates_typos(conn):
+    results = search_apis(conn, "usres/list", project_id="p1")
+    assert results and results[0]["id"] == 1
+    assert all(item["match"] == "fuzzy" for item in results)
+    assert all(item["score"] >= 0.3 for item in results)
+
+
+def test_fuzzy_fallback_fills_after_fts_hits(conn):
+    results = search_apis(conn, "order", project_id="p1", limit=5)
+    assert results[0] == dict(results[0], id=3, match="fts")
+    # 分词命中的结果不会在模糊匹配中重复出现
+    assert len(_ids(results)) == len(set(_ids(results)))
+
+
+def test_short_query_uses_substring_match(conn):
+    # 中文没有空格分隔，"创建订单" 是一个词，分词索引只能前缀匹配
+    conn.execute("UPDATE apis SET summary = '创建订单' WHERE id = 3")
+    conn.commit()
+    assert search_apis(conn, "创建", project_id="p1")[0]["match"] == "fts"
+
+    results = search_apis(conn, "订单", project_id="p1")
+    assert [(item["id"], item["match"]) for item in results] == [(3, "fuzzy")]
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from services.blob_store import BLOB_REF_KEY, BlobStore
+from services.database import connect
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = connect(db_path)
+    yield conn
+    conn.close()
+
+
+def _steps(marker: str):
+    return [{"step_order": 1, "response": {"marker": marker, "items": list(range(100))}, "request_data": {"k": "v"}}]
+
+
+def _save(conn, store, steps) -> int:
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO executions (test_case_id, status, results) VALUES (0, 'success', ?)",
+                   (store.pack_results(cursor, steps),))
+    conn.commit()
+    return cursor.lastrowid
+
+
+def _age_blobs(conn):
+    conn.execute("UPDATE blobs SET created_at = datetime('now', '-2 hours')")
+    conn.commit()
+
+
+def test_pack_dedup_and_roundtrip(conn):
+    store = BlobStore(codec="gzip")
+    first = _save(conn, store, _steps("a"))
+    _save(conn, store, _steps("a"))
+    assert conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 1
+
+    results = conn.execute("SELECT results FROM executions WHERE id = ?", (first,)).fetchone()[0]
+    assert BLOB_REF_KEY in results
+    restored = store.unpack_results(conn.cursor(), results)
+    assert restored == _steps("a")
+
+
+def test_collect_garbage_removes_unreferenced(conn):
+    store = BlobStore(codec="gzip")
+    keep = _save(conn, store, _steps("keep"))
+    drop = _save(conn, store, _steps("drop"))
+    conn.execute("DELETE FROM executions WHERE id = ?", (drop,))
+    conn.commit()
+    _age_blobs(conn)
+
+    summary = BlobStore.collect_garbage(conn.cursor())
+    conn.commit()
+    assert summary["deleted"] == 1
+    assert summary["scanned_executions"] == 1
+    assert summary["freed_bytes"] > 0
+
+    results = conn.execute("SELECT results FROM executions WHERE id = ?", (keep,)).fetchone()[0]
+    assert store.unpack_results(conn.cursor(), results) == _steps("keep")
+
+
+def test_collect_garbage_keeps_recent_blobs(conn):
+    store = BlobStore(codec="gzip")
+    store.put(conn.cursor(), json.dumps({"orphan": "x" * 500}).encode())
+    conn.commit()
+
+    assert BlobStore.collect_garbage(conn.cursor())["deleted"] == 0
+    _age_blobs(conn)
+    assert BlobStore.collect_garbage(conn.cursor())["deleted"] == 1
@@ -0,0 +1,151 @@
+import json
+from collections import deque
+
+from services.case_template import DEFAULT_MIN_CONFIDENCE, MAX_STEPS, build_template_case
+
+
+class _Graph:
+    """测试用的最小有向图，接口与 networkx.DiGraph 中用到的部分一致"""
+
+    def __init__(self):
+        self.succ, self.pred, self.attrs = {}, {}, {}
+
+    def add_node(self, node, **attrs):
+        self.attrs[node] = attrs
+        self.succ.setdefault(node, {})
+        self.pred.setdefault(node, {})
+
+    def add_edge(self, u, v, **attrs):
+        self.succ[u][v] = attrs
+        self.pred[v][u] = attrs
+
+    @property
+    def nodes(self):
+        attrs = self.attrs
+
+        class _Nodes(dict):
+            def __call__(self, data=False):
+                return list(attrs.items()) if data else list(attrs)
+
+        return _Nodes(attrs)
+
+    def predecessors(self, node):
+        return list(self.pred[node])
+
+    def __getitem__(self, node):
+        return self.succ[node]
+
+
+class _KG:
+    def __init__(self):
+        self.graph = _Graph()
+
+    def find_path(self, a, b):
+        queue, seen = deque([[a]]), {a}
+        while queue:
+            path = queue.popleft()
+            if path[-1] == b:
+                return path
+            for nxt in self.graph.succ[path[-1]]:
+                if nxt not in seen:
+                    seen.add(nxt)
+                    queue.append(path + [nxt])
+        return None
+
+
+def _api(method, path, summary, body=None):
+    api = {"method": method, "path": path, "summary": summary}
+    if body is not None:
+        api["request_body"] = json.dumps(body)
+    return api
+
+
+LOGIN = _api("POST", "/user/login", "用户登录", {"username": "admin", "password": "123456"})
+PROFILE = _api("GET", "/user/profile", "获取用户信息")
+ORDER = _api("POST", "/orders", "创建订单", {"type": "object", "required": ["sku"], "properties": {"sku": {"type": "string"}}})
+PAY = _api("POST", "/orders/pay", "支付订单", {"orderId": "1", "amount": 10})
+
+
+def _kg(*apis):
+    kg = _KG()
+    for api in apis:
+        kg.graph.add_node(api["path"], method=api["method"], path=api["path"])
+    return kg
+
+
+def test_login_then_target_uses_edge_mapping():
+    kg = _kg(LOGIN, PROFILE)
+    kg.graph.add_edge(LOGIN["path"], PROFILE["path"], field_mapping={"token": "Authorization"}, count=3)
+
+    result = build_template_case(kg, [LOGIN, PROFILE], [(2.0, PROFILE), (0.5, LOGIN)], scenario_name="查看用户信息")
+
+    steps = result["case"]["steps"]
+    assert [(s["api_method"], s["api_path"]) for s in steps] == [("POST", "/user/login"), ("GET", "/user/profile")]
+    assert steps[0]["params"] == {"username": "admin", "password": "123456"}
+    # 每个映射只生成一条，来源路径取边上记录的字段
+    assert steps[1]["param_mappings"] == [
+        {"from_step": 1, "from_field": "token", "to_field": "Authorization", "to_type": "headers"}
+    ]
+    assert result["confidence"] == 1.0
+
+
+def test_targets_are_topologically_ordered():
+    kg = _kg(LOGIN, ORDER, PAY)
+    kg.graph.add_edge(LOGIN["path"], ORDER["path"], field_mapping={"token": "Authorization"})
+    kg.graph.add_edge(LOGIN["path"], PAY["path"], field_mapping={"token": "Authorization"})
+    kg.graph.add_edge(ORDER["path"], PAY["path"], field_mapping={"response.data.orderId": "orderId"})
+
+    # 支付打分更高，但依赖创建订单的返回值
+    result = build_template_case(kg, [LOGIN, ORDER, PAY], [(2.0, PAY), (1.8, ORDER)],
+                                 [json.dumps([{"api_method": "POST", "api_path": "/orders", "params": {"sku": "A1"}}])])
+
+    steps = result["case"]["steps"]
+    assert [s["api_path"] for s in steps] == ["/user/login", "/orders", "/orders/pay"]
+    assert steps[1]["params"] == {"sku": "A1"}
+    assert {"from_step": 2, "from_field": "data.orderId", "to_field": "orderId", "to_type": "params"} in steps[2]["param_mappings"]
+
+
+def test_cycle_returns_no_case():
+    kg = _kg(ORDER, PAY)
+    kg.graph.add_edge(ORDER["path"], PAY["path"], field_mapping={"orderId": "orderId"})
+    kg.graph.add_edge(PAY["path"], ORDER["path"], field_mapping={"payId": "payId"})
+
+    result = build_template_case(kg, [ORDER, PAY], [(2.0, PAY), (1.9, ORDER)])
+
+    assert result["case"] is None
+    assert result["reason"] == "依赖成环"
+
+
+def test_chain_longer_than_max_steps_returns_no_case():
+    apis = [_api("POST", f"/step/{i}", f"步骤{i}") for i in range(MAX_STEPS + 1)]
+    kg = _kg(*apis)
+    for prev, nxt in zip(apis, apis[1:]):
+        kg.graph.add_edge(prev["path"], nxt["path"], field_mapping={"id": "id"})
+
+    result = build_template_case(kg, apis, [(1.0, apis[-1])])
+
+    assert result["case"] is None
+    assert str(MAX_STEPS) in result["reason"]
+
+
+def test_saved_data_missing_required_field_lowers_confidence():
+    kg = _kg(LOGIN, ORDER)
+    kg.graph.add_edge(LOGIN["path"], ORDER["path"], field_mapping={"token": "Authorization"})
+    saved = [json.dumps([{"api_method": "POST", "api_path": "/orders", "params": {"note": "缺 sku"}}])]
+
+    result = build_template_case(kg, [LOGIN, ORDER], [(2.0, ORDER)], saved)
+
+    assert result["case"]["steps"][1]["params"] == {"note": "缺 sku"}
+    assert result["confidence"] == 0.5 < DEFAULT_MIN_CONFIDENCE
+    assert "1/2" in result["reason"]
+
+
+def test_intent_outside_chain_lowers_confidence():
+    kg = _kg(LOGIN, PROFILE, PAY)
+    kg.graph.add_edge(LOGIN["path"], PROFILE["path"], field_mapping={"token": "Authorization"})
+
+    # 意图也提到了支付订单，但其分数不到目标阈值、没有进入链路
+    result = build_template_case(kg, [LOGIN, PROFILE], [(2.0, PROFILE), (1.0, PAY)])
+
+    assert result["case"] is not None
+    assert result["confidence"] < DEFAULT_MIN_CONFIDENCE
@@ -0,0 +1,115 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from services.database import PRAGMAS, Database, connect
+
+
+@pytest.fixture
+def database(tmp_path):
+    db = Database(str(tmp_path / "db.sqlite"), max_readers=3)
+
+    def _schema(conn):
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+    asyncio.run(db.write(_schema))
+    yield db
+    db.close()
+
+
+def test_connect_applies_pragma_profile(tmp_path):
+    conn = connect(str(tmp_path / "p.sqlite"), timeout=7)
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == PRAGMAS["cache_size"]
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 7000
+    finally:
+        conn.close()
+
+
+def test_fetch_helpers_return_dicts(database):
+    async def run():
+        result = await database.execute("INSERT INTO items (name) VALUES (?)", ("a",))
+        assert result == {"lastrowid": 1, "rowcount": 1}
+        assert await database.fetchall("SELECT * FROM items") == [{"id": 1, "name": "a"}]
+        assert await database.fetchone("SELECT name FROM items WHERE id = ?", (1,)) == {"name": "a"}
+        assert await database.fetchone("SELECT name FROM items WHERE id = ?", (2,)) is None
+
+    asyncio.run(run())
+
+
+def test_readers_run_concurrently_on_their_own_connections(database):
+    barrier = threading.Barrier(3, timeout=5)
+    seen = []
+
+    def _read(conn):
+        # 三个读任务同时到达屏障才能继续：说明它们在不同线程中并发执行
+        barrier.wait()
+        seen.append((threading.current_thread().name, id(conn)))
+        return conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    async def run():
+        return await asyncio.gather(*(database.read(_read) for _ in range(3)))
+
+    assert asyncio.run(run()) == [0, 0, 0]
+    assert len({name for name, _ in seen}) == 3
+    assert len({conn for _, conn in seen}) == 3
+    assert all(name.startswith("db-read") for name, _ in seen)
+
+
+def test_writes_are_serialized_on_one_thread(database):
+    active, max_active, threads = [0], [0], set()
+    lock = threading.Lock()
+
+    def _write(conn, name):
+        with lock:
+            active[0] += 1
+            max_active[0] = max(max_active[0], active[0])
+            threads.add(threading.current_thread().name)
+        time.sleep(0.01)
+        conn.execute("INSERT INTO items (name) VALUES (?)", (name,))
+        with lock:
+            active[0] -= 1
+
+    async def run():
+        await asyncio.gather(*(database.write(_write, f"n{i}") for i in range(8)))
+        return await database.fetchone("SELECT COUNT(*) AS n FROM items")
+
+    assert asyncio.run(run()) == {"n": 8}
+    assert max_active[0] == 1
+    assert len(threads) == 1 and threads.pop().startswith("db-write")
+
+
+def test_write_error_rolls_back_and_propagates(database):
+    def _insert_twice(conn):
+        conn.execute("INSERT INTO items (name) VALUES ('dup')")
+        conn.execute("INSERT INTO items (name) VALUES ('dup')")
+
+    async def run():
+        with pytest.raises(sqlite3.IntegrityError):
+            await database.write(_insert_twice)
+        # 同一连接上的后续写入不受影响，失败事务中的第一行已回滚
+        await database.execute("INSERT INTO items (name) VALUES ('ok')")
+        return await database.fetchall("SELECT name FROM items")
+
+    assert asyncio.run(run()) == [{"name": "ok"}]
+
+
+def test_read_error_propagates_and_releases_snapshot(database):
+    def _bad(conn):
+        conn.execute("BEGIN")
+        conn.execute("SELECT * FROM missing_table")
+
+    def _in_transaction(conn):
+        return conn.in_transaction
+
+    async def run():
+        with pytest.raises(sqlite3.OperationalError):
+            await database.read(_bad)
+        return await asyncio.gather(*(database.read(_in_transaction) for _ in range(3)))
+
+    assert asyncio.run(run()) == [False, False, False]
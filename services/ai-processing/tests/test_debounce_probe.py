@@ -0,0 +1,151 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from services.debounce_probe import (
+    _build_payload, _parse_http_response, _spacing_plan, _wait_until, is_accepted,
+    run_burst, run_debounce_probe, run_spaced_pair
+)
+
+
+@pytest.mark.parametrize("status_code, response, accepted", [
+    (200, {"code": 0, "data": {}}, True),
+    (200, {"code": 1001, "msg": "请勿重复提交"}, False),
+    (200, {"success": False, "code": 0}, False),  # success 优先于业务码
+    (200, {"errcode": "0"}, True),
+    (200, {"status": "SUCCESS"}, True),
+    (200, "ok", True),
+    (201, {"data": {"id": 1}}, True),
+    (429, {"code": 0}, False),
+    (0, None, False),
+])
+def test_is_accepted(status_code, response, accepted):
+    assert is_accepted(status_code, response) is accepted
+
+
+def test_build_payload_encodes_request():
+    spec = {
+        "method": "POST",
+        "url": "https://api.test:8443/orders?src=probe",
+        "headers": {"Authorization": "Bearer t", "Host": "ignored", "Content-Length": "1"},
+        "params": {"tag": ["a", "b"]},
+        "json": {"sku": "A1", "note": "重复"},
+    }
+    host, port, use_ssl, payload = _build_payload(spec)
+
+    assert (host, port, use_ssl) == ("api.test", 8443, True)
+    head, _, body = payload.partition(b"\r\n\r\n")
+    lines = head.decode("utf-8").split("\r\n")
+    assert lines[0] == "POST /orders?src=probe&tag=a&tag=b HTTP/1.1"
+    assert lines[1] == "Host: api.test:8443"
+    assert "Authorization: Bearer t" in lines
+    assert "Content-Type: application/json" in lines
+    assert "Connection: close" in lines
+    assert [l for l in lines if l.lower().startswith(("host:", "content-length:"))] == [
+        "Host: api.test:8443", f"Content-Length: {len(body)}"]
+    assert json.loads(body) == spec["json"]
+
+
+def test_build_payload_defaults():
+    host, port, use_ssl, payload = _build_payload({"method": "GET", "url": "http://api.test"})
+    assert (host, port, use_ssl) == ("api.test", 80, False)
+    assert payload.startswith(b"GET / HTTP/1.1\r\nHost: api.test\r\n")
+    assert payload.endswith(b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+
+
+def test_parse_chunked_response():
+    raw = b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n7\r\n{"code"\r\n4\r\n: 0}\r\n0\r\n\r\n'
+    assert _parse_http_response(raw) == (200, {"code": 0})
+    assert _parse_http_response(b"garbage")[0] == 0
+
+
+def test_spacing_plan():
+    assert _spacing_plan(500, 100) == [100.0, 250.0, 450.0, 550.0, 750.0]
+    assert _spacing_plan(500, 250) == [250.0, 450.0, 550.0, 750.0]  # 去重
+    assert _spacing_plan(0, 0) == []
+
+
+def test_wait_until_keeps_event_loop_responsive():
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        target = time.perf_counter() + 0.02
+        await _wait_until(target)
+        reached = time.perf_counter()
+        task.cancel()
+        return target, reached, ticks
+
+    target, reached, ticks = asyncio.run(run())
+    assert reached >= target
+    # 等待期间其他协程持续得到调度
+    assert ticks > 10
+
+
+class _DebouncedServer:
+    """最小的 HTTP 服务：window_ms 内只接受第一个请求"""
+
+    def __init__(self, window_ms):
+        self.window = window_ms / 1000
+        self.last_accepted = None
+
+    async def handle(self, reader, writer):
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = next(int(l.split(b":")[1]) for l in head.split(b"\r\n") if l.lower().startswith(b"content-length:"))
+        # 最后一个字节到达才算收到请求
+        await reader.readexactly(length)
+        now = time.perf_counter()
+        if self.last_accepted is None or now - self.last_accepted >= self.window:
+            self.last_accepted = now
+            body = {"code": 0}
+        else:
+            body = {"code": 1001, "msg": "请勿重复提交"}
+        data = json.dumps(body).encode()
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                     + f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data)
+        await writer.drain()
+        writer.close()
+
+
+def _with_server(window_ms, probe):
+    async def run():
+        server = _DebouncedServer(window_ms)
+        srv = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        spec = {"method": "POST", "url": f"http://127.0.0.1:{srv.sockets[0].getsockname()[1]}/submit", "json": {"a": 1}}
+        try:
+            return await probe(spec)
+        finally:
+            srv.close()
+            await srv.wait_closed()
+
+    return asyncio.run(run())
+
+
+def test_burst_against_debounced_endpoint():
+    result = _with_server(200, lambda spec: run_burst(spec, 5, timeout=5))
+    assert result["sent"] == 5
+    assert result["accepted"] == 1
+    assert result["send_spread_us"] is not None
+
+
+def test_spaced_pair_measures_gap():
+    result = _with_server(30, lambda spec: run_spaced_pair(spec, 60, timeout=5))
+    assert result["actual_gap_ms"] >= 60
+    assert result["first_accepted"] and result["second_accepted"]
+
+
+def test_probe_reports_debounce():
+    result = _with_server(40, lambda spec: run_debounce_probe(
+        spec, burst_count=4, expected_debounce_ms=40, request_interval_ms=10, timeout=5))
+    analysis = result["analysis"]
+    assert analysis["has_debounce"] is True
+    assert analysis["duplicate_accepted"] is False
+    assert result["stats"]["total_requests"] == 4 + 2 * len(_spacing_plan(40, 10))
@@ -0,0 +1,192 @@
+import asyncio
+
+import httpx
+
+from services.execution_engine import ExecutionContext, ExecutionEngine, build_step_dependencies
+from services.field_extractor import compile_path
+
+
+def _step(order, path, *mappings, method="GET"):
+    return {
+        "step_order": order,
+        "api_path": path,
+        "api_method": method,
+        "params": {},
+        "headers": {},
+        "param_mappings": [
+            {"from_step": from_step, "from_field": from_field, "to_field": to_field, "to_type": "headers"}
+            for from_step, from_field, to_field in mappings
+        ],
+    }
+
+
+# 登录后扇出：三个查询只依赖登录，详情依赖订单列表
+FAN_OUT = [
+    _step(1, "/login", method="POST"),
+    _step(2, "/profile", (1, "data.token", "Authorization")),
+    _step(3, "/orders", (1, "data.token", "Authorization")),
+    _step(4, "/coupons", (1, "data.token", "Authorization")),
+    _step(5, "/orders/detail", (1, "data.token", "Authorization"), (3, "data.items[0].id", "X-Order-Id")),
+]
+
+
+class _Server:
+    """记录请求顺序与最大并发数的 MockTransport 处理函数"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.active = 0
+        self.max_active = 0
+        self.requests = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.02)
+        finally:
+            self.active -= 1
+        if request.url.path in self.fail:
+            return httpx.Response(500, json={"message": "error"})
+        return httpx.Response(200, json={"data": {"token": "t-1", "items": [{"id": 42}]}})
+
+
+def _run(steps, server, mode="parallel", on_step=None):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(server)) as client:
+            engine = ExecutionEngine(client, base_url="http://api.test", mode=mode, on_step=on_step)
+            return await engine.run(steps)
+
+    return asyncio.run(run())
+
+
+def test_dependencies_follow_latest_earlier_step():
+    steps = [
+        _step(1, "/a"),
+        _step(2, "/b", (1, "token", "Authorization")),
+        _step(1, "/c"),  # 重复的 step_order
+        _step(4, "/d", (1, "token", "Authorization"), (4, "self", "X-Self"), (9, "later", "X-Later")),
+        {"step_order": 5, "api_path": "/e", "param_mappings": ["bad", {"from_field": "x"}]},
+    ]
+    assert build_step_dependencies(steps) == [[], [0], [], [2], []]
+    assert build_step_dependencies(FAN_OUT) == [[], [0], [0], [0], [0, 2]]
+
+
+def test_parallel_runs_independent_steps_concurrently():
+    server = _Server()
+    results = _run(FAN_OUT, server)
+
+    assert [r["step_order"] for r in results] == [1, 2, 3, 4, 5]
+    assert all(r["success"] for r in results)
+    # 2、3、4 同时在途
+    assert server.max_active == 3
+    paths = [r.url.path for r in server.requests]
+    assert paths[0] == "/login"
+    assert paths.index("/orders") < paths.index("/orders/detail")
+    detail = server.requests[paths.index("/orders/detail")]
+    assert detail.headers["Authorization"] == "Bearer t-1"
+    assert detail.headers["X-Order-Id"] == "42"
+
+
+def test_sequential_mode_runs_one_at_a_time():
+    server = _Server()
+    results = _run(FAN_OUT, server, mode="sequential")
+
+    assert all(r["success"] for r in results)
+    assert server.max_active == 1
+
+
+def test_failed_producer_skips_consumers():
+    server = _Server(fail={"/orders"})
+    emitted = []
+
+    async def on_step(result):
+        emitted.append(result["step_order"])
+
+    results = _run(FAN_OUT, server, on_step=on_step)
+
+    assert [r["success"] for r in results] == [True, True, False, True, False]
+    assert results[2]["status_code"] == 500 and not results[2].get("skipped")
+    assert results[4]["skipped"] is True
+    assert "3" in results[4]["error"]
+    assert "/orders/detail" not in [r.url.path for r in server.requests]
+    # 跳过的步骤同样通过 on_step 推送
+    assert sorted(emitted) == [1, 2, 3, 4, 5]
+
+
+def test_skip_propagates_through_skipped_steps():
+    steps = [
+        _step(1, "/login", method="POST"),
+        _step(2, "/orders", (1, "data.token", "Authorization")),
+        _step(3, "/orders/detail", (2, "data.items[0].id", "X-Order-Id")),
+    ]
+    server = _Server(fail={"/login"})
+    results = _run(steps, server)
+
+    assert [r.get("skipped", False) for r in results] == [False, True, True]
+    assert [r.url.path for r in server.requests] == ["/login"]
+
+
+def test_context_keeps_only_required_fields():
+    context = ExecutionContext()
+    context.require(1, compile_path("data.token"))
+    context.require(1, compile_path("data.items[*].id"), match="all")
+    context.require(1, compile_path("data.items[0].id"), match="all")  # 确定路径按 first 处理
+    context.require(1, compile_path("data.items"))
+
+    response = {"data": {"token": "t", "items": [{"id": 1}, {"id": 2}], "huge": "x" * 1000}}
+    context.publish(1, response)
+    context.publish(2, {"data": {}})  # 没有被引用的步骤不保存
+
+    assert 1 in context and 2 not in context
+    stored = context._values["1"]
+    assert set(stored) == {("data.token", "first"), ("data.items[*].id", "all"), ("data.items[0].id", "first"), ("data.items", "first")}
+    # 保存的是原对象子树的引用，不复制
+    assert stored[("data.items", "first")] is response["data"]["items"]
+    assert context.lookup(1, "data.items[0].id", "all") == 1
+    assert context.lookup(1, "data.items[*].id", "all") == [1, 2]
+    assert sorted(e.path for e in context.needed(1)) == ["data.items", "data.items[*].id", "data.items[0].id", "data.token"]
+
+
+def test_context_evicts_after_all_mappings_read():
+    context = ExecutionContext()
+    token = compile_path("data.token")
+    context.require(1, token)
+    context.require(1, token)  # 两个步骤都引用 step 1 的 token
+    context.publish(1, {"data": {"token": "t"}})
+
+    assert context.lookup(1, "data.token") == "t"
+    assert 1 in context
+    assert context.lookup(1, "data.token") == "t"
+    assert 1 not in context
+    assert context.lookup(1, "data.token") is None
+
+
+def test_context_lookup_before_publish_does_not_consume():
+    context = ExecutionContext()
+    context.require(1, compile_path("id"))
+    assert context.lookup(1, "id") is None
+    context.publish(1, {"id": 7})
+    assert context.lookup(1, "id") == 7
+    assert 1 not in context
+
+
+def test_engine_releases_context_after_last_consumer():
+    server = _Server()
+    steps = [
+        _step(1, "/login", method="POST"),
+        _step(2, "/orders", (1, "data.token", "Authorization")),
+        _step(3, "/coupons", (1, "data.token", "Authorization")),
+    ]
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(server)) as client:
+            engine = ExecutionEngine(client, base_url="http://api.test")
+            results = await engine.run(steps)
+            return engine, results
+
+    engine, results = asyncio.run(run())
+    assert all(r["success"] for r in results)
+    assert all(r["request_headers"]["Authorization"] == "Bearer t-1" for r in results[1:])
+    assert 1 not in engine.context
@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+import pytest
+
+from services.blob_store import BlobStore
+from services.database import connect
+from services.execution_store import save_execution, step_rows
+from services.report_service import ReportService
+
+
+STEPS = [
+    {"step_order": 1, "method": "post", "api_path": "/login", "status_code": 200, "duration": 0.0125, "success": True,
+     "response": {"data": {"token": "t"}}},
+    {"step_order": 2, "method": "GET", "api_path": "/orders", "status_code": 500, "duration": 0.2, "success": False,
+     "extractions": [
+         {"from_step": 1, "from_field": "data.token", "to_field": "Authorization", "to_type": "headers",
+          "success": True, "extracted_value": "t"},
+         {"from_step": 1, "from_field": "data.uid", "to_field": "uid", "to_type": "params",
+          "success": False, "error_msg": "无法从步骤1提取data.uid"},
+     ]},
+    {"step_order": "x", "method": "GET", "url": "http://api.test/ping", "status_code": "Error", "success": False,
+     "error": "ConnectError: refused"},
+    "not a step",
+]
+
+COLUMNS = "step_order, method, path, status_code, duration_ms, success, error, extractions_total, extractions_failed, extractions"
+
+
+def _rows(conn, execution_id):
+    conn.row_factory = None
+    return conn.execute(
+        f"SELECT execution_id, test_case_id, project_id, {COLUMNS} FROM execution_steps WHERE execution_id = ? ORDER BY id",
+        (execution_id,)
+    ).fetchall()
+
+
+def test_step_rows_normalizes_results():
+    rows = step_rows(STEPS)
+
+    assert len(rows) == 3
+    login, orders, ping = rows
+    assert (login["method"], login["path"], login["status_code"], login["duration_ms"], login["success"]) == ("POST", "/login", 200, 12.5, 1)
+    assert login["extractions"] is None and login["extractions_total"] == 0
+    assert (orders["success"], orders["extractions_total"], orders["extractions_failed"]) == (0, 2, 1)
+    # 提取结果只保留结构化字段，不落库提取到的值
+    assert json.loads(orders["extractions"])[1] == {
+        "from_step": 1, "from_field": "data.uid", "to_field": "uid", "to_type": "params",
+        "success": False, "error_msg": "无法从步骤1提取data.uid"}
+    assert "extracted_value" not in orders["extractions"]
+    # 非数字的 step_order 用下标补齐，请求异常时状态码为 NULL
+    assert (ping["step_order"], ping["path"], ping["status_code"], ping["duration_ms"]) == (3, "http://api.test/ping", None, None)
+    assert ping["error"] == "ConnectError: refused"
+
+
+def test_save_execution_writes_step_rows(db_path):
+    conn = connect(db_path)
+    cursor = conn.cursor()
+    store = BlobStore(codec="gzip")
+
+    exec_id = save_execution(cursor, store, 7, "failed", STEPS, "p1", environment="test")
+    conn.commit()
+
+    rows = _rows(conn, exec_id)
+    assert [r[:4] for r in rows] == [(exec_id, 7, "p1", 1), (exec_id, 7, "p1", 2), (exec_id, 7, "p1", 3)]
+    assert [r[4:9] for r in rows] == [
+        ("POST", "/login", 200, 12.5, 1),
+        ("GET", "/orders", 500, 200.0, 0),
+        ("GET", "http://api.test/ping", None, None, 0),
+    ]
+    assert [r[10:12] for r in rows] == [(0, 0), (2, 1), (0, 0)]
+    conn.close()
+
+
+def test_save_execution_rewrites_streamed_rows(db_path):
+    conn = connect(db_path)
+    cursor = conn.cursor()
+    store = BlobStore(codec="gzip")
+    cursor.execute("INSERT INTO executions (test_case_id, status, results) VALUES (0, 'running', '[]')")
+    exec_id = cursor.lastrowid
+
+    # 流式执行：同一条执行记录重复保存时步骤明细被整体替换，而不是追加
+    save_execution(cursor, store, None, "failed", STEPS[:1], "p1", exec_id)
+    assert save_execution(cursor, store, None, "failed", STEPS, "p1", exec_id) == exec_id
+    conn.commit()
+
+    rows = _rows(conn, exec_id)
+    assert [r[3] for r in rows] == [1, 2, 3]
+    assert all(r[1] == 0 for r in rows)
+    assert conn.execute("SELECT status FROM executions WHERE id = ?", (exec_id,)).fetchone()[0] == "failed"
+    conn.close()
+
+
+def test_api_stats_aggregate_step_rows(db_path):
+    conn = connect(db_path)
+    cursor = conn.cursor()
+    store = BlobStore(codec="gzip")
+    for duration in (0.1, 0.3):
+        save_execution(cursor, store, 1, "failed", [dict(STEPS[1], duration=duration)], "p1")
+    conn.commit()
+    conn.close()
+
+    stats = asyncio.run(ReportService(db_path).get_api_stats("p1"))
+    assert len(stats) == 1
+    assert stats[0]["api_name"] == "GET /orders"
+    assert stats[0]["total_executions"] == 2 and stats[0]["failed_count"] == 2
+    assert stats[0]["avg_response_time"] == pytest.approx(200.0)
+    assert stats[0]["max_response_time"] == pytest.approx(300.0)
+    assert stats[0]["extraction_failures"] == 2
@@ -0,0 +1,105 @@
+import json
+
+import httpx
+import pytest
+
+import services.http_client_pool as http_client_pool
+from services.database import connect
+from services.http_client_pool import HttpClientPool
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/login":
+        return httpx.Response(200, json={"data": {"token": "t-1"}})
+    if request.url.path == "/fail":
+        return httpx.Response(500, json={"message": "error"})
+    return httpx.Response(200, json={"auth": request.headers.get("authorization")})
+
+
+@pytest.fixture
+def client(app_module, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(http_client_pool.httpx, "AsyncHTTPTransport", lambda **kw: httpx.MockTransport(_handler))
+    monkeypatch.setattr(app_module, "http_pool", HttpClientPool())
+    return TestClient(app_module.app)
+
+
+def _events(text):
+    """解析 SSE 文本为 [(event, data)]"""
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+STEPS = [
+    {"step_order": 1, "api_path": "/login", "api_method": "POST"},
+    {"step_order": 2, "api_path": "/me", "api_method": "GET", "param_mappings": [
+        {"from_step": 1, "from_field": "data.token", "to_field": "Authorization", "to_type": "headers"}]},
+    {"step_order": 3, "api_path": "/fail", "api_method": "GET"},
+]
+
+
+def _execution(app_module, exec_id):
+    conn = connect(app_module.DB_PATH)
+    try:
+        status = conn.execute("SELECT status FROM executions WHERE id = ?", (exec_id,)).fetchone()[0]
+        steps = conn.execute("SELECT step_order, success FROM execution_steps WHERE execution_id = ? ORDER BY step_order", (exec_id,)).fetchall()
+    finally:
+        conn.close()
+    return status, steps
+
+
+def test_stream_event_sequence(app_module, client):
+    res = client.post("/api/v1/executions/stream", json={"steps": STEPS, "base_url": "http://api.test", "project_id": "sse"})
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+    events = _events(res.text)
+    names = [name for name, _ in events]
+    assert names == ["start", "step", "progress", "step", "progress", "step", "progress", "summary"]
+
+    start, summary = events[0][1], events[-1][1]
+    assert start["total"] == 3 and start["execution_mode"] == "sequential"
+    assert [data["step_order"] for name, data in events if name == "step"] == [1, 2, 3]
+    assert events[3][1]["response"] == {"auth": "Bearer t-1"}
+    assert [data for name, data in events if name == "progress"] == [
+        {"completed": 1, "total": 3, "passed": 1},
+        {"completed": 2, "total": 3, "passed": 2},
+        {"completed": 3, "total": 3, "passed": 2},
+    ]
+    assert summary == {"id": start["id"], "status": "failed", "total": 3, "passed": 2, "failed": 1}
+    # running 记录被最终结果覆盖
+    assert _execution(app_module, start["id"]) == ("failed", [(1, 1), (2, 1), (3, 0)])
+
+
+def test_stream_parallel_mode_reports_every_step(app_module, client):
+    steps = STEPS[:2] + [{"step_order": 3, "api_path": "/me", "api_method": "GET"}]
+    res = client.post("/api/v1/executions/stream", json={"steps": steps, "base_url": "http://api.test", "execution_mode": "parallel"})
+
+    events = _events(res.text)
+    assert events[0][0] == "start" and events[-1][0] == "summary"
+    assert sorted(data["step_order"] for name, data in events if name == "step") == [1, 2, 3]
+    assert [data["completed"] for name, data in events if name == "progress"] == [1, 2, 3]
+    assert events[-1][1]["status"] == "success"
+
+
+def test_stream_reports_engine_error(app_module, client, monkeypatch):
+    async def broken_run(self, steps):
+        raise RuntimeError("engine exploded")
+
+    monkeypatch.setattr(app_module.ExecutionEngine, "run", broken_run)
+    res = client.post("/api/v1/executions/stream", json={"steps": STEPS, "base_url": "http://api.test"})
+
+    events = _events(res.text)
+    assert [name for name, _ in events] == ["start", "error", "summary"]
+    assert events[1][1] == {"detail": "engine exploded"}
+    assert events[2][1]["status"] == "failed" and events[2][1]["passed"] == 0
+    assert _execution(app_module, events[0][1]["id"]) == ("failed", [])
+
+
+def test_stream_rejects_invalid_mode_before_streaming(client):
+    res = client.post("/api/v1/executions/stream", json={"steps": STEPS, "execution_mode": "bogus"})
+    assert res.status_code == 400
@@ -0,0 +1,87 @@
+import pytest
+
+from services.field_extractor import compile_path, extract
+
+
+DATA = {
+    "data": {
+        "token": "abc",
+        "user.name": "dotted",
+        "orders": [
+            {"id": 1, "status": "paid", "amount": 30, "note": "a && b"},
+            {"id": 2, "status": "new", "amount": 80, "note": "x || y"},
+            {"id": 3, "status": "paid", "amount": 120},
+        ],
+        "tags": {"a": 1, "b": 2},
+    }
+}
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("data.token", "abc"),
+    ("$.data.token", "abc"),
+    ("data.orders.0.id", 1),
+    ("data.orders[-1].id", 3),
+    ("data.orders.-1.id", 3),
+    ("data['user.name']", "dotted"),
+    ("data.missing", None),
+    ("data.orders[5].id", None),
+])
+def test_definite_paths(path, expected):
+    assert extract(DATA, path) == expected
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("data.orders[*].id", [1, 2, 3]),
+    ("data.orders.*.status", ["paid", "new", "paid"]),
+    ("data.tags.*", [1, 2]),
+    ("data.orders[?(@.status == 'paid')].id", [1, 3]),
+    ("data.orders[?(@.amount > 50)].id", [2, 3]),
+    ("data.orders[?(@.status == 'paid' && @.amount >= 100)].id", [3]),
+    ("data.orders[?(@.amount < 50 || @.id == 2)].id", [1, 2]),
+    ("data.orders[?(@.note)].id", [1, 2]),
+    ("data.orders[?(@.status != \"paid\")].id", [2]),
+])
+def test_wildcard_and_filter_paths(path, expected):
+    assert extract(DATA, path, match="all") == expected
+    assert extract(DATA, path) == expected[0]
+
+
+def test_filter_operators_inside_quotes_are_literal():
+    assert extract(DATA, "data.orders[?(@.note == 'a && b')].id") == 1
+    assert extract(DATA, "data.orders[?(@.note == 'x || y')].id") == 2
+    assert extract(DATA, "data.orders[?(@.note == 'x || y' || @.id == 3)].id", match="all") == [2, 3]
+    assert extract({"items": [{"op": "a>=b"}]}, "items[?(@.op == 'a>=b')].op") == "a>=b"
+
+
+def test_no_match_returns_none():
+    assert extract(DATA, "data.orders[?(@.status == 'refunded')].id") is None
+    assert extract(DATA, "data.orders[?(@.status == 'refunded')].id", match="all") is None
+
+
+@pytest.mark.parametrize("path", [
+    "data.orders[?(@.status == 'paid)].id",
+    "data.orders[?(status == 'paid')].id",
+    "data.orders[abc]",
+    "data.orders[0",
+])
+def test_invalid_paths(path):
+    with pytest.raises(ValueError):
+        compile_path(path)
+
+
+def test_compile_is_cached():
+    compile_path.cache_clear()
+    first = compile_path("data.orders[?(@.status == 'paid')].id")
+    second = compile_path("data.orders[?(@.status == 'paid')].id")
+    assert first is second
+    info = compile_path.cache_info()
+    assert info.hits >= 1
+    assert extract(DATA, "data.orders[?(@.status == 'paid')].id") == 1
+    assert compile_path.cache_info().hits == info.hits + 1
+
+
+def test_static_prefix():
+    assert compile_path("data.orders[?(@.id)].id").static_prefix() == ["data", "orders"]
+    assert compile_path("data['user.name']").static_prefix() == ["data", "user.name"]
+    assert compile_path("data.orders.0.id").static_prefix() == ["data", "orders"]
@@ -0,0 +1,50 @@
+import asyncio
+
+import httpx
+
+import services.http_client_pool as http_client_pool
+from services.http_client_pool import HttpClientPool
+
+
+def _pool(monkeypatch, handler) -> HttpClientPool:
+    monkeypatch.setattr(http_client_pool.httpx, "AsyncHTTPTransport", lambda **kw: httpx.MockTransport(handler))
+    return HttpClientPool()
+
+
+def test_in_flight_until_body_closed(monkeypatch):
+    pool = _pool(monkeypatch, lambda request: httpx.Response(200, content=b"x" * 1024))
+
+    async def run():
+        async with pool.client() as client:
+            async with client.stream("GET", "http://api.test/a") as response:
+                # 已收到响应头，响应体未读完：连接仍在使用
+                assert pool.stats()["in_flight"] == 1
+                body = await response.aread()
+            assert len(body) == 1024
+            assert pool.stats()["in_flight"] == 0
+
+            await client.get("http://api.test/b")
+            assert pool.stats()["in_flight"] == 0
+        await pool.aclose()
+
+    asyncio.run(run())
+
+
+def test_transport_error_counted(monkeypatch):
+    def handler(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    pool = _pool(monkeypatch, handler)
+
+    async def run():
+        async with pool.client() as client:
+            try:
+                await client.get("http://api.test/a")
+            except httpx.ConnectError:
+                pass
+        stats = pool.stats()
+        assert stats["in_flight"] == 0
+        assert stats["hosts"][0]["errors"] == 1
+        assert stats["total_requests"] == 1
+
+    asyncio.run(run())
@@ -0,0 +1,96 @@
+import json
+import random
+
+import pytest
+
+from services.json_stream import StepStreamParser
+
+
+DOC = {
+    "scenario_name": "下单 \"steps\" 流程",
+    "note": "steps",
+    "steps": [
+        {"step_order": 1, "api_path": "/login", "params": {"user": "a\\\\b", "tags": ["[", "]", "{"]}},
+        {"step_order": 2, "api_path": "/orders", "param_mappings": [{"from_step": 1, "from_field": "data.token"}]},
+        {"step_order": 3, "api_path": "/pay", "params": {"memo": "含 \\\" 转义 } 和 ]"}},
+    ],
+    "summary": {"steps": [{"nested": True}]},
+}
+TEXT = json.dumps(DOC, ensure_ascii=False, indent=2)
+
+
+def _feed(parser, chunks):
+    emitted = []
+    for chunk in chunks:
+        emitted.extend(parser.feed(chunk))
+    return emitted
+
+
+def _split(text, sizes):
+    chunks, i = [], 0
+    for size in sizes:
+        if i >= len(text):
+            break
+        chunks.append(text[i:i + size])
+        i += size
+    if i < len(text):
+        chunks.append(text[i:])
+    return chunks
+
+
+@pytest.mark.parametrize("chunks", [
+    [TEXT],
+    list(TEXT),  # 逐字符
+    _split(TEXT, [3] * 1000),
+    _split(TEXT, [7, 1, 13, 2] * 300),
+])
+def test_items_emitted_regardless_of_chunking(chunks):
+    parser = StepStreamParser()
+    assert _feed(parser, chunks) == DOC["steps"]
+    assert parser.items == DOC["steps"]
+    assert parser.result() == DOC
+
+
+def test_random_chunk_boundaries():
+    rng = random.Random(3)
+    for _ in range(50):
+        cuts = sorted(rng.sample(range(1, len(TEXT)), 20))
+        chunks = [TEXT[a:b] for a, b in zip([0] + cuts, cuts + [len(TEXT)])]
+        assert _feed(StepStreamParser(), chunks) == DOC["steps"]
+
+
+def test_items_emitted_as_soon_as_closed():
+    parser = StepStreamParser()
+    first_end = TEXT.index('"/orders"')
+    assert _feed(parser, [TEXT[:first_end]]) == DOC["steps"][:1]
+    assert _feed(parser, [TEXT[first_end:]]) == DOC["steps"][1:]
+
+
+def test_string_value_equal_to_key_is_not_a_key():
+    # "steps" 作为值出现，后面的数组属于 other，不应被当作步骤
+    text = '{"name": "steps", "other": [{"a": 1}], "title": "steps"}'
+    for chunks in ([text], list(text)):
+        parser = StepStreamParser()
+        assert _feed(parser, chunks) == []
+
+    parser = StepStreamParser()
+    parser.feed('{"name": "steps"')
+    parser.feed(', "other"')
+    assert parser._last_key == "name"
+    parser.feed(' :')
+    assert parser._last_key == "other"
+
+    text = '{"title": "steps" , "steps" : [{"a": 1}]}'
+    assert _feed(StepStreamParser(), list(text)) == [{"a": 1}]
+
+
+def test_incomplete_output_falls_back_to_parsed_items():
+    parser = StepStreamParser()
+    cut = TEXT.index('"/pay"')
+    _feed(parser, _split(TEXT[:cut], [5] * 1000))
+    assert parser.result() == {"steps": DOC["steps"][:2]}
+
+
+def test_custom_array_key():
+    parser = StepStreamParser(array_key="cases")
+    assert _feed(parser, list('{"steps": [1], "cases": [{"x": 1}, {"x": 2}]}')) == [{"x": 1}, {"x": 2}]
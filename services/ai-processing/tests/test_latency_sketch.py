@@ -0,0 +1,73 @@
+import math
+import random
+
+import pytest
+
+from services.latency_sketch import DDSketch
+
+
+def _exact(values, q):
+    """与 DDSketch.quantile 相同的秩定义：排序后第 floor(q * (n - 1)) 个"""
+    ordered = sorted(values)
+    return ordered[int(math.floor(q * (len(ordered) - 1)))]
+
+
+def _samples(seed, n):
+    rng = random.Random(seed)
+    # 长尾的耗时分布（毫秒）
+    return [rng.lognormvariate(4, 1.2) for _ in range(n)]
+
+
+QUANTILES = [0, 0.01, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 0.999, 1]
+
+
+@pytest.mark.parametrize("alpha", [0.01, 0.05])
+def test_quantiles_within_relative_accuracy(alpha):
+    values = _samples(1, 5000)
+    sketch = DDSketch(alpha)
+    for v in values:
+        sketch.add(v)
+    assert sketch.count == len(values)
+    assert sketch.avg == pytest.approx(sum(values) / len(values))
+    for q in QUANTILES:
+        exact = _exact(values, q)
+        assert abs(sketch.quantile(q) - exact) <= alpha * exact + 1e-9, q
+
+
+def test_merged_sketches_match_union():
+    parts = [_samples(seed, n) for seed, n in ((2, 300), (3, 2000), (4, 17), (5, 900))]
+    sketches = []
+    for values in parts:
+        sketch = DDSketch()
+        for v in values:
+            sketch.add(v)
+        sketches.append(sketch)
+
+    merged = DDSketch.merged(sketches)
+    union = [v for values in parts for v in values]
+    assert merged.count == len(union)
+    assert merged.min == min(union) and merged.max == max(union)
+    for q in QUANTILES:
+        exact = _exact(union, q)
+        assert abs(merged.quantile(q) - exact) <= merged.relative_accuracy * exact + 1e-9, q
+
+    # 序列化后再合并，结果不变
+    restored = DDSketch.merged(DDSketch.from_bytes(s.to_bytes()) for s in sketches)
+    assert restored.bins == merged.bins
+    assert [restored.quantile(q) for q in QUANTILES] == [merged.quantile(q) for q in QUANTILES]
+
+
+def test_zero_and_weighted_values():
+    sketch = DDSketch()
+    sketch.add(0, count=10)
+    sketch.add(50, count=90)
+    assert sketch.quantile(0.05) == 0
+    assert sketch.quantile(0.5) == pytest.approx(50, rel=sketch.relative_accuracy)
+    assert DDSketch().quantile(0.5) is None
+
+
+def test_merge_rejects_different_accuracy():
+    a, b = DDSketch(0.01), DDSketch(0.02)
+    b.add(1.0)
+    with pytest.raises(ValueError):
+        a.merge(b)
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+import services.llm_cache as llm_cache
+from services.database import Database
+from services.llm_cache import LLMCache, cache_key
+
+
+class _CountingDatabase(Database):
+    """记录读 / 写次数"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = 0
+        self.writes = 0
+
+    async def read(self, fn, *args):
+        self.reads += 1
+        return await super().read(fn, *args)
+
+    async def write(self, fn, *args):
+        self.writes += 1
+        return await super().write(fn, *args)
+
+
+@pytest.fixture
+def run(db_path):
+    """在同一个事件循环中运行 fn(db)"""
+    def _run(fn):
+        async def main():
+            db = _CountingDatabase(db_path)
+            try:
+                return await fn(db)
+            finally:
+                db.close()
+        return asyncio.run(main())
+    return _run
+
+
+def _row(db, key):
+    return db.fetchone("SELECT hits, last_used FROM llm_cache WHERE cache_key = ?", (key,))
+
+
+def test_lookups_use_reader_and_batch_hit_updates(run):
+    async def scenario(db):
+        cache = LLMCache(db, flush_every=3)
+        keys = [cache_key("p", "m", 0.1, None, "sys", f"user {i}") for i in range(3)]
+        for key in keys:
+            await cache.put(key, "p", "m", {"answer": key})
+        writes = db.writes
+
+        assert await cache.get("missing") is None
+        for _ in range(4):
+            assert await cache.get(keys[0]) == {"answer": keys[0]}
+        await cache.get(keys[1])
+        # 只有两个不同的键有未落库的命中，还没有写库
+        assert db.writes == writes
+        assert (await _row(db, keys[0]))["hits"] == 0
+        assert (await cache.get_stats())["total_hits"] == 5
+
+        await cache.get(keys[2])  # 第 3 个键，达到 flush_every
+        assert db.writes == writes + 1
+        assert [(await _row(db, k))["hits"] for k in keys] == [4, 1, 1]
+        assert cache.stats["hits"] == 6 and cache.stats["misses"] == 1
+
+    run(scenario)
+
+
+def test_put_flushes_touches_before_lru_eviction(run):
+    async def scenario(db):
+        cache = LLMCache(db, max_entries=2)
+        await cache.put("a", "p", "m", 1)
+        await cache.put("b", "p", "m", 2)
+        await cache.get("a")  # a 最近用过，b 应被淘汰
+        await cache.put("c", "p", "m", 3)
+        assert await cache.get("a") == 1
+        assert await cache.get("b") is None
+        assert await cache.get("c") == 3
+        assert cache.stats["evictions"] == 1
+
+    run(scenario)
+
+
+def test_expired_entries_miss_and_are_swept(run, monkeypatch):
+    async def scenario(db):
+        cache = LLMCache(db, ttl=60)
+        now = [1000.0]
+        monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+        await cache.put("old", "p", "m", {"v": 1})
+        now[0] += 30
+        await cache.put("new", "p", "m", {"v": 2})
+        now[0] += 45
+        assert await cache.get("old") is None
+        assert await cache.get("new") == {"v": 2}
+
+        result = await cache.sweep()
+        assert result == {"expired": 1, "evicted": 0}
+        assert (await cache.get_stats())["entries"] == 1
+        assert (await _row(db, "new"))["hits"] == 1
+
+    run(scenario)
@@ -0,0 +1,158 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+import services.llm_client as llm_client
+from services.llm_client import LLMClientManager, TokenBucket, is_retryable
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """假时钟：asyncio.sleep 直接推进 time.monotonic，记录每次等待的时长"""
+    now = [100.0]
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+        now[0] += delay
+
+    monkeypatch.setattr(llm_client.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(llm_client.asyncio, "sleep", fake_sleep)
+    return now, sleeps
+
+
+def _status_error(status, headers=None):
+    request = httpx.Request("POST", "https://llm.test/v1/chat/completions")
+    response = httpx.Response(status, headers=headers, request=request)
+    return openai.APIStatusError(f"status {status}", response=response, body=None)
+
+
+def test_token_bucket_waits_for_refill(clock):
+    now, sleeps = clock
+    bucket = TokenBucket(rate_per_minute=60)  # 每秒 1 个，容量 60
+
+    async def run():
+        assert await bucket.acquire(60) == 0
+        waited = await bucket.acquire(2)
+        return waited
+
+    assert asyncio.run(run()) == pytest.approx(2.0)
+    assert sleeps == [pytest.approx(2.0)]
+    assert bucket.tokens == pytest.approx(0)
+
+    # 按时间匀速补充，不超过容量
+    now[0] += 1000
+    bucket._refill()
+    assert bucket.tokens == 60
+
+
+def test_token_bucket_caps_amount_and_adjusts(clock):
+    _, sleeps = clock
+    bucket = TokenBucket(rate_per_minute=600, capacity=100)
+
+    # 超过容量的请求按容量计，不会永远等下去
+    assert asyncio.run(bucket.acquire(1000)) == 0
+    assert bucket.tokens == 0
+
+    # 实际用量少于预估：退回；多于预估：补扣，可以暂时为负
+    bucket.adjust(-30)
+    assert bucket.tokens == pytest.approx(30)
+    bucket.adjust(50)
+    assert bucket.tokens == pytest.approx(-20)
+    assert asyncio.run(bucket.acquire(10)) == pytest.approx(3.0)
+    assert sleeps == [pytest.approx(3.0)]
+
+
+def test_token_bucket_unlimited(clock):
+    bucket = TokenBucket(rate_per_minute=0)
+    assert asyncio.run(bucket.acquire(10 ** 6)) == 0
+    bucket.adjust(10 ** 6)
+    assert bucket.tokens == 0
+
+
+@pytest.mark.parametrize("status", [408, 409, 429, 500, 503, 529])
+def test_retryable_status(status):
+    # 409 同 OpenAI SDK 的默认重试规则：供应商侧锁冲突，重试通常成功
+    assert is_retryable(_status_error(status))
+
+
+@pytest.mark.parametrize("status", [400, 401, 403, 404, 422])
+def test_client_errors_not_retried(status):
+    assert not is_retryable(_status_error(status))
+
+
+def test_connection_errors_retried():
+    request = httpx.Request("POST", "https://llm.test/v1/chat/completions")
+    assert is_retryable(openai.APITimeoutError(request=request))
+    assert is_retryable(openai.APIConnectionError(request=request))
+    assert not is_retryable(ValueError("bad json"))
+
+
+def _flaky(errors, result="ok"):
+    calls = []
+
+    async def request():
+        calls.append(len(calls))
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    return request, calls
+
+
+def test_call_retries_with_backoff(clock, monkeypatch):
+    _, sleeps = clock
+    monkeypatch.setattr(llm_client.random, "uniform", lambda low, high: high)
+    manager = LLMClientManager(rpm=0, tpm=0, base_delay=1.0, max_delay=3.0)
+    request, calls = _flaky([_status_error(503), _status_error(409), _status_error(429)])
+
+    assert asyncio.run(manager.call("openai", request)) == "ok"
+    assert len(calls) == 4
+    # 指数退避，封顶 max_delay
+    assert sleeps == [1.0, 2.0, 3.0]
+    stats = manager.stats()["providers"]["openai"]
+    assert (stats["requests"], stats["retries"], stats["failures"], stats["in_flight"]) == (4, 3, 0, 0)
+
+
+def test_call_prefers_retry_after(clock):
+    _, sleeps = clock
+    manager = LLMClientManager(rpm=0, tpm=0, max_delay=30.0)
+    request, _ = _flaky([_status_error(429, {"retry-after": "7"}), _status_error(429, {"retry-after": "120"})])
+
+    assert asyncio.run(manager.call("openai", request)) == "ok"
+    assert sleeps == [7.0, 30.0]
+
+
+def test_call_gives_up(clock):
+    manager = LLMClientManager(rpm=0, tpm=0, max_retries=2)
+    request, calls = _flaky([_status_error(500)] * 5)
+    with pytest.raises(openai.APIStatusError):
+        asyncio.run(manager.call("openai", request))
+    assert len(calls) == 3
+
+    # 不可重试的错误直接抛出
+    request, calls = _flaky([_status_error(400)])
+    with pytest.raises(openai.APIStatusError):
+        asyncio.run(manager.call("deepseek", request))
+    assert len(calls) == 1
+    assert manager.stats()["providers"]["deepseek"]["failures"] == 1
+
+
+def test_call_limits_concurrency():
+    manager = LLMClientManager(max_concurrency=2, rpm=0, tpm=0)
+    active = [0, 0]
+
+    async def request():
+        active[0] += 1
+        active[1] = max(active[1], active[0])
+        await asyncio.sleep(0.01)
+        active[0] -= 1
+        return "ok"
+
+    async def run():
+        return await asyncio.gather(*(manager.call("openai", request) for _ in range(6)))
+
+    assert asyncio.run(run()) == ["ok"] * 6
+    assert active[1] == 2
@@ -0,0 +1,182 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import services.llm_router as llm_router
+from services.llm_router import CircuitBreaker, LLMRouter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(llm_router.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+    breaker.record_success()
+    assert breaker.failures == 0
+
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    clock[0] += 29
+    assert not breaker.allow()
+
+
+def test_breaker_half_open_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 30
+    # 到期后半开：只放行一个探测请求
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()  # allow 本身不占用探测名额
+    breaker.on_request()
+    assert not breaker.allow()
+
+    # 探测被取消：可以重新探测
+    breaker.on_cancel()
+    assert breaker.allow()
+
+    # 探测失败：重新熔断并重新计时
+    breaker.on_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    clock[0] += 30
+    assert breaker.allow()
+
+    # 探测成功：恢复
+    breaker.on_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+
+def _call(behaviour, calls):
+    async def call(provider):
+        calls.append(provider)
+        delay, outcome = behaviour[provider]
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return call
+
+
+def test_hedge_cancels_slow_primary():
+    router = LLMRouter(hedge_delay=0.05)
+    calls = []
+    started = {}
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started["at"] = loop.time()
+        result = await router.route(["slow", "fast"], _call({"slow": (5, "late"), "fast": (0.01, "ok")}, calls))
+        started["elapsed"] = loop.time() - started["at"]
+        await asyncio.sleep(0)  # 让被取消的任务收尾
+        return result
+
+    assert asyncio.run(run()) == ("fast", "ok")
+    assert calls == ["slow", "fast"]
+    assert started["elapsed"] < 1
+    stats = router.stats()
+    assert stats["slow"]["cancelled"] == 1
+    assert stats["slow"]["failures"] == 0 and stats["slow"]["consecutive_failures"] == 0
+    assert stats["fast"]["hedges"] == 1 and stats["fast"]["wins"] == 1
+
+
+def test_no_hedge_when_primary_is_fast():
+    router = LLMRouter(hedge_delay=0.5)
+    calls = []
+    result = asyncio.run(router.route(["a", "b"], _call({"a": (0.01, "A"), "b": (0.01, "B")}, calls)))
+    assert result == ("a", "A")
+    assert calls == ["a"]
+
+
+def test_failure_switches_immediately_and_opens_breaker():
+    router = LLMRouter(hedge_delay=10, failure_threshold=1, reset_timeout=60)
+    calls = []
+    behaviour = {"a": (0, RuntimeError("boom")), "b": (0.01, "B")}
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        result = await router.route(["a", "b"], _call(behaviour, calls))
+        return result, loop.time() - start
+
+    result, elapsed = asyncio.run(run())
+    assert result == ("b", "B")
+    assert elapsed < 1  # 不等 hedge_delay
+    assert router.stats()["a"]["circuit"] == CircuitBreaker.OPEN
+
+    # 熔断的供应商排到后面
+    calls.clear()
+    assert asyncio.run(router.route(["a", "b"], _call(behaviour, calls))) == ("b", "B")
+    assert calls == ["b"]
+
+
+def test_all_providers_fail():
+    router = LLMRouter(hedge_delay=10)
+    behaviour = {"a": (0, RuntimeError("a down")), "b": (0, ValueError("b bad json"))}
+    with pytest.raises(ValueError, match="b bad json"):
+        asyncio.run(router.route(["a", "b"], _call(behaviour, [])))
+
+
+def test_select_skips_open_breakers():
+    router = LLMRouter(failure_threshold=1)
+    assert router.select(["a", "b"]) == "a"
+    router.breaker("a").record_failure()
+    assert router.select(["a", "b"]) == "b"
+    router.breaker("b").record_failure()
+    assert router.select(["a", "b"]) is None
+
+
+def _stream_provider(app_module, monkeypatch):
+    """两个供应商都已配置、默认 openai 的 AIProvider，流式调用记录实际使用的供应商"""
+    provider = app_module.AIProvider()
+    provider.openai_key, provider.deepseek_key = "k1", "k2"
+    provider.default_provider = "openai"
+    provider.hedge_enabled = True
+    provider.router = LLMRouter(failure_threshold=1, reset_timeout=30)
+    provider.cache = None
+    calls = []
+
+    async def fake_stream(name, factory, estimated_tokens=0):
+        calls.append(name)
+        for text in ('{"ok"', ": true}"):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+    monkeypatch.setattr(provider, "get_client", lambda name: None)
+    monkeypatch.setattr(provider.clients, "stream", fake_stream)
+    return provider, calls
+
+
+async def _collect(agen):
+    return "".join([part async for part in agen])
+
+
+def test_chat_stream_falls_back_when_breaker_open(app_module, monkeypatch):
+    provider, calls = _stream_provider(app_module, monkeypatch)
+    provider.router.breaker("openai").record_failure()
+
+    text = asyncio.run(_collect(provider.chat_stream("sys", "user")))
+
+    assert text == '{"ok": true}'
+    assert calls == ["deepseek"]
+    assert provider.router.breaker("deepseek").state == CircuitBreaker.CLOSED
+
+
+def test_chat_stream_refuses_when_all_breakers_open(app_module, monkeypatch):
+    provider, calls = _stream_provider(app_module, monkeypatch)
+    provider.router.breaker("deepseek").record_failure()
+
+    # 指定的供应商已熔断：不再发请求
+    with pytest.raises(Exception, match="已熔断"):
+        asyncio.run(_collect(provider.chat_stream("sys", "user", provider="deepseek")))
+    assert calls == []
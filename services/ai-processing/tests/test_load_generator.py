@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import services.load_generator as load_generator
+from services.load_generator import _split_config, run_load, run_load_test
+
+
+class _CountingHandler(BaseHTTPRequestHandler):
+    count = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with _CountingHandler.lock:
+            _CountingHandler.count += 1
+        time.sleep(0.005)
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _CountingHandler.count = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _CountingHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _spec(url):
+    return {"method": "GET", "url": f"{url}/ping", "headers": {}, "params": None, "json": None}
+
+
+@pytest.mark.parametrize("concurrency", [1, 8, 50])
+def test_closed_model_sends_exact_total(server, concurrency):
+    result = asyncio.run(run_load(_spec(server), {"concurrency": concurrency, "total_requests": 37}))
+    assert _CountingHandler.count == 37
+    assert result["sent"] == 37
+    assert result["success"] == 37
+    assert result["dropped"] == 0
+
+
+def test_open_model_counts_drops_within_total(server):
+    # 在途上限很小：部分请求被丢弃，丢弃数计入总量，但不算作已发送
+    result = asyncio.run(run_load(_spec(server), {"concurrency": 2, "target_rps": 2000, "total_requests": 40}))
+    assert result["sent"] + result["dropped"] == 40
+    assert _CountingHandler.count == result["sent"]
+    assert len(result["latencies_ms"]) == result["sent"]
+
+
+def test_open_model_without_drops(server):
+    result = asyncio.run(run_load(_spec(server), {"concurrency": 20, "target_rps": 200, "total_requests": 25}))
+    assert result["dropped"] == 0
+    assert _CountingHandler.count == 25
+    assert result["sent"] == 25
+
+
+@pytest.mark.parametrize("concurrency, workers", [(2, 8), (10, 4), (8, 8)])
+def test_split_config_keeps_totals(concurrency, workers):
+    parts = _split_config({"concurrency": concurrency, "total_requests": 101, "target_rps": 40}, min(workers, concurrency))
+    assert sum(p["concurrency"] for p in parts) == concurrency
+    assert sum(p["total_requests"] for p in parts) == 101
+    assert sum(p["target_rps"] for p in parts) == pytest.approx(40)
+
+
+def test_run_load_test_clamps_workers_to_concurrency(server, monkeypatch):
+    monkeypatch.setattr(load_generator.os, "cpu_count", lambda: 8)
+    result = asyncio.run(run_load_test(_spec(server), {"concurrency": 2, "total_requests": 12}, workers=8))
+    assert result["stats"]["workers"] == 2
+    assert result["stats"]["total_requests"] == 12
+    assert _CountingHandler.count == 12
@@ -0,0 +1,86 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from services.database import connect
+from services.migrator import MIGRATIONS_DIR, applied_versions, collect_migrations, run_migrations, split_statements
+
+
+ALL_VERSIONS = [version for version, _, _ in collect_migrations()]
+
+
+def _tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view', 'trigger')")}
+
+
+def test_fresh_database(tmp_path):
+    conn = connect(str(tmp_path / "fresh.db"))
+    applied = run_migrations(conn)
+    assert len(applied) == len(ALL_VERSIONS)
+    assert applied_versions(conn) == ALL_VERSIONS
+    assert {"apis", "executions", "blobs", "execution_steps", "llm_cache", "apis_fts", "apis_search_insert"} <= _tables(conn)
+    assert not conn.in_transaction
+    # 再次执行不会重复迁移
+    assert run_migrations(conn) == []
+    conn.close()
+
+
+def test_partially_migrated_database(tmp_path):
+    partial_dir = tmp_path / "partial"
+    partial_dir.mkdir()
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        if filename < "007":
+            shutil.copy(os.path.join(MIGRATIONS_DIR, filename), partial_dir / filename)
+
+    conn = connect(str(tmp_path / "partial.db"))
+    run_migrations(conn, str(partial_dir))
+    done = applied_versions(conn)
+    assert done and max(done) < 7
+    assert "execution_steps" not in _tables(conn)
+    conn.execute("INSERT INTO apis (project_id, method, path, summary) VALUES ('p', 'GET', '/users', 'list users')")
+    conn.commit()
+
+    applied = run_migrations(conn)
+    assert [int(name[:3]) for name in applied] == [v for v in ALL_VERSIONS if v not in done]
+    assert applied_versions(conn) == ALL_VERSIONS
+    # 011 的回填覆盖迁移前已有的数据
+    assert conn.execute("SELECT COUNT(*) FROM apis_fts WHERE apis_fts MATCH 'users'").fetchone()[0] == 1
+    conn.close()
+
+
+def test_failed_migration_rolls_back(tmp_path):
+    bad_dir = tmp_path / "bad"
+    bad_dir.mkdir()
+    # 版本 2 是补 apis 列的 Python 迁移
+    (bad_dir / "001_ok.sql").write_text("CREATE TABLE apis (id INTEGER);\nCREATE TABLE a (id INTEGER);", encoding="utf-8")
+    (bad_dir / "003_bad.sql").write_text(
+        "CREATE TABLE b (id INTEGER);\nINSERT INTO a VALUES (1);\nINSERT INTO missing VALUES (1);",
+        encoding="utf-8"
+    )
+    conn = connect(str(tmp_path / "bad.db"))
+    with pytest.raises(RuntimeError):
+        run_migrations(conn, str(bad_dir))
+    assert applied_versions(conn) == [1, 2]
+    assert "b" not in _tables(conn)
+    assert conn.execute("SELECT COUNT(*) FROM a").fetchone()[0] == 0
+    conn.close()
+
+
+def test_split_statements():
+    script = """
+    -- 注释里的 ; 不切分
+    CREATE TABLE t (a TEXT DEFAULT 'x;y');
+    CREATE TRIGGER tr AFTER INSERT ON t BEGIN
+        INSERT INTO t VALUES ('1');
+        INSERT INTO t VALUES ('2');
+    END;
+    -- 结尾注释
+    """
+    statements = split_statements(script)
+    assert len(statements) == 2
+    assert statements[0].endswith("DEFAULT 'x;y');")
+    assert statements[1].startswith("CREATE TRIGGER") and statements[1].endswith("END;")
+    for statement in statements:
+        assert sqlite3.complete_statement(statement)
@@ -0,0 +1,104 @@
+import sqlite3
+
+import pytest
+
+from services.database import connect
+from services.pagination import clamp_limit, decode_cursor, encode_cursor, keyset_clause, order_clause, page
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = connect(db_path)
+    conn.row_factory = sqlite3.Row
+    # created_at 有重复、有 NULL（旧数据）
+    stamps = ["2026-01-01 00:00:00", "2026-01-02 00:00:00", None, "2026-01-02 00:00:00", None, "2026-01-03 00:00:00"]
+    for i in range(23):
+        conn.execute(
+            "INSERT INTO apis (project_id, method, path, created_at) VALUES (?, 'GET', ?, ?)",
+            ("p" if i % 4 else "q", f"/api/{i}", stamps[i % len(stamps)])
+        )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def _walk(conn, limit, project_id=None):
+    """按 main_sqlite 的列表接口方式逐页翻完，返回每页的 id"""
+    pages, cursor = [], None
+    while True:
+        conditions, params = [], []
+        if project_id:
+            conditions.append("project_id = ?")
+            params.append(project_id)
+        after, after_params = keyset_clause(cursor)
+        if after:
+            conditions.append(after)
+            params.extend(after_params)
+        sql = "SELECT id, created_at FROM apis"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {order_clause()} LIMIT ?"
+        rows, cursor = page([dict(r) for r in conn.execute(sql, params + [limit + 1])], limit)
+        pages.append([r["id"] for r in rows])
+        if not cursor:
+            return pages
+
+
+@pytest.mark.parametrize("limit", [1, 4, 5, 22, 23, 50])
+def test_walk_all_pages_with_null_created_at(conn, limit):
+    expected = [r["id"] for r in conn.execute(f"SELECT id FROM apis ORDER BY {order_clause()}")]
+    pages = _walk(conn, limit)
+    assert [i for p in pages for i in p] == expected
+    assert all(len(p) == limit for p in pages[:-1])
+    # NULL 排在最后
+    tail = {r["id"] for r in conn.execute("SELECT id FROM apis WHERE created_at IS NULL")}
+    assert set(expected[-len(tail):]) == tail
+
+
+def test_walk_with_filter(conn):
+    expected = [r["id"] for r in conn.execute(f"SELECT id FROM apis WHERE project_id = 'p' ORDER BY {order_clause()}")]
+    assert [i for p in _walk(conn, 3, project_id="p") for i in p] == expected
+
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor({"created_at": "2026-01-01 00:00:00", "id": 7})) == ("2026-01-01 00:00:00", 7)
+    assert decode_cursor(encode_cursor({"created_at": None, "id": 3})) == ("", 3)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_alias_and_limit():
+    sql, params = keyset_clause(encode_cursor({"created_at": None, "id": 3}), alias="s")
+    assert sql == "(COALESCE(s.created_at, ''), s.id) < (?, ?)" and params == ["", 3]
+    assert order_clause("s") == "COALESCE(s.created_at, '') DESC, s.id DESC"
+    assert keyset_clause(None) == ("", [])
+    assert clamp_limit(None) is None and clamp_limit(0) == 1 and clamp_limit(10 ** 6) == 500
+
+
+def test_superseded_list_indexes_dropped(conn):
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_apis_keyset", "idx_scenarios_keyset"} <= names
+    assert not names & {"idx_apis_project_created", "idx_apis_created", "idx_scenarios_created"}
+
+
+def test_list_endpoints_expose_next_cursor(app_module):
+    from fastapi.testclient import TestClient
+
+    conn = connect(app_module.DB_PATH)
+    for i in range(3):
+        conn.execute("INSERT INTO apis (project_id, method, path) VALUES ('cursor-test', 'GET', ?)", (f"/c/{i}",))
+        conn.execute("INSERT INTO scenarios (project_id, name) VALUES ('cursor-test', ?)", (f"s{i}",))
+    conn.commit()
+    conn.close()
+
+    client = TestClient(app_module.app)
+    headers = {"Origin": "http://frontend.test"}
+    apis = client.get("/api/v1/apis", params={"project_id": "cursor-test", "limit": 2, "view": "summary"}, headers=headers)
+    scenarios = client.get("/api/v1/scenarios", params={"project_id": "cursor-test", "limit": 2}, headers=headers)
+
+    for res in (apis, scenarios):
+        assert res.status_code == 200
+        assert res.headers["X-Next-Cursor"]
+        assert "X-Next-Cursor" in res.headers["Access-Control-Expose-Headers"]
+    assert apis.json()["next_cursor"] == apis.headers["X-Next-Cursor"]
+    assert len(scenarios.json()) == 2
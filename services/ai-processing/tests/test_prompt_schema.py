@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from services.prompt_schema import encode_apis
+from services.tokens import count_tokens, estimate_tokens
+
+
+PET = {
+    "type": "object",
+    "required": ["name"],
+    "properties": {
+        "id": {"type": "integer"},
+        "name": {"type": "string", "description": "宠物名"},
+        "status": {"type": "string", "enum": ["available", "sold"]},
+        "tags": {"type": "array", "items": {"type": "object", "properties": {"id": {"type": "integer"}, "name": {"type": "string"}}}},
+    },
+}
+AUTH = {"name": "Authorization", "in": "header", "required": True, "type": "string"}
+
+
+def _apis(n):
+    apis = []
+    for i in range(n):
+        apis.append({
+            "method": "POST" if i % 2 else "GET",
+            "path": f"/pets/{i}/{{petId}}",
+            "summary": f"第 {i} 个接口",
+            "description": "很长的描述 " * 30,
+            "parameters": json.dumps([AUTH, {"name": "petId", "in": "path", "type": "integer"}]),
+            "request_body": json.dumps({"content": {"application/json": {"schema": PET}}}) if i % 2 else None,
+        })
+    return apis
+
+
+def _api_lines(text):
+    return [line for line in text.split("apis:\n", 1)[1].splitlines() if not line.startswith("#")]
+
+
+def test_everything_fits_in_large_budget():
+    text, included = encode_apis(_apis(6), token_budget=100000)
+    assert included == 6
+    lines = _api_lines(text)
+    assert [line.split()[1] for line in lines] == [f"/pets/{i}/{{petId}}" for i in range(6)]
+    # 共用的鉴权 header 只列一次；重复的对象结构提升为共享类型
+    assert text.count("Authorization") == 1
+    assert "types:" in text
+    assert "另有" not in text
+
+
+@pytest.mark.parametrize("budget", [200, 400, 800])
+def test_budget_packing_keeps_priority_order(budget):
+    apis = _apis(40)
+    text, included = encode_apis(apis, token_budget=budget)
+    assert 0 < included < len(apis)
+    lines = _api_lines(text)
+    assert len(lines) == included
+    # 按给定顺序放入，放不下的接口跳过，后面更短的接口仍可放入
+    positions = [[api["path"] for api in apis].index(line.split()[1]) for line in lines]
+    assert positions[0] == 0
+    assert positions == sorted(positions)
+    body = text.rsplit("\n# 另有", 1)[0]
+    assert count_tokens(body) <= budget
+    assert f"另有 {len(apis) - included} 个接口" in text
+
+
+def test_budget_grows_monotonically():
+    apis = _apis(40)
+    counts = [encode_apis(apis, token_budget=b)[1] for b in (150, 300, 600, 1200)]
+    assert counts == sorted(counts)
+
+
+def test_first_api_always_included_and_duplicates_dropped():
+    apis = _apis(3)
+    text, included = encode_apis(apis[:1] + apis, token_budget=1)
+    assert included == 1
+    assert encode_apis(apis + apis, token_budget=100000)[1] == 3
+    assert encode_apis([], token_budget=100) == ("", 0)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("abcdefgh") == 3
+    assert estimate_tokens("创建订单") == 5
+    assert count_tokens("hello world") > 0
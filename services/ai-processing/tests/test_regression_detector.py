@@ -0,0 +1,67 @@
+import math
+import random
+
+import pytest
+
+from services.regression_detector import compare_windows, mann_whitney_u
+
+
+def _brute_u(baseline, recent):
+    """U = recent 大于 baseline 的配对数 + 相等配对数 / 2"""
+    return sum((r > b) + 0.5 * (r == b) for r in recent for b in baseline)
+
+
+def test_ties():
+    baseline, recent = [1, 2, 2, 3], [2, 3, 3, 4]
+    u, p = mann_whitney_u(baseline, recent)
+    assert u == _brute_u(baseline, recent) == 13
+    # 手算：并列修正后方差 16/12 * (9 - 48/56)，z = (13 - 8 - 0.5) / sqrt(方差)
+    z = 4.5 / math.sqrt(16 / 12 * (9 - 48 / 56))
+    assert p == pytest.approx(0.5 * math.erfc(z / math.sqrt(2)))
+    assert p == pytest.approx(0.0860, abs=1e-4)
+
+
+def test_all_values_tied():
+    u, p = mann_whitney_u([5.0] * 10, [5.0] * 4)
+    assert u == 20
+    assert p == 1.0
+
+
+def test_small_samples():
+    # 完全分离的 3 vs 3：U 取最大值 9；精确单侧 p = 1/20，正态近似略小
+    u, p = mann_whitney_u([1, 2, 3], [4, 5, 6])
+    assert u == 9
+    assert 0.03 < p < 0.06
+    assert mann_whitney_u([], [1.0]) == (0.0, 1.0)
+    assert mann_whitney_u([1.0], []) == (0.0, 1.0)
+
+
+def test_known_shift_is_one_sided():
+    rng = random.Random(7)
+    baseline = [rng.gauss(100, 10) for _ in range(60)]
+    slower = [rng.gauss(130, 10) for _ in range(20)]
+    faster = [rng.gauss(70, 10) for _ in range(20)]
+    same = [rng.gauss(100, 10) for _ in range(20)]
+
+    u, p = mann_whitney_u(baseline, slower)
+    assert u == pytest.approx(_brute_u(baseline, slower))
+    assert p < 1e-6
+    assert mann_whitney_u(baseline, faster)[1] > 0.999
+    assert mann_whitney_u(baseline, same)[1] > 0.01
+
+
+def test_compare_windows_needs_shift_significance_and_samples():
+    rng = random.Random(11)
+    baseline = {
+        ("GET", "/slow"): [rng.gauss(100, 5) for _ in range(40)],
+        ("GET", "/steady"): [rng.gauss(100, 5) for _ in range(40)],
+        ("GET", "/few"): [rng.gauss(100, 5) for _ in range(5)],
+    }
+    recent = {
+        ("GET", "/slow"): [rng.gauss(160, 5) for _ in range(10)],
+        ("GET", "/steady"): [rng.gauss(105, 5) for _ in range(10)],  # 显著但涨幅不足 20%
+        ("GET", "/few"): [rng.gauss(200, 5) for _ in range(10)],     # 基线样本太少
+    }
+    regressions = compare_windows(baseline, recent)
+    assert [r["path"] for r in regressions] == ["/slow"]
+    assert regressions[0]["shift"] > 0.5
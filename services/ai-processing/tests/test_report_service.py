@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from services.blob_store import BlobStore
+from services.database import connect
+from services.execution_store import save_execution
+from services.report_service import ReportService
+
+
+def _step(order, method, path, success=True, status_code=200, error=None, extraction_failed=False):
+    step = {"step_order": order, "method": method, "api_path": path, "success": success,
+            "status_code": status_code, "duration": 0.05}
+    if error:
+        step["error"] = error
+    if extraction_failed:
+        step["extractions"] = [{"from_step": 1, "from_field": "data.token", "to_field": "Authorization", "success": False}]
+    return step
+
+
+@pytest.fixture
+def service(db_path):
+    conn = connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO test_cases (name, steps) VALUES ('下单', '[]')")
+    case_id = cursor.lastrowid
+    cursor.execute("INSERT INTO scenarios (name, project_id, test_case_id) VALUES ('下单流程', 'p', ?)", (case_id,))
+    scenario_id = cursor.lastrowid
+
+    login, order, pay = ("POST", "/login"), ("POST", "/orders"), ("POST", "/pay")
+    runs = (
+        [[_step(1, *login), _step(2, *order), _step(3, *pay)]] * 6
+        + [[_step(1, *login), _step(2, *order, success=False, status_code=500)]] * 2
+        + [[_step(1, *login, success=False, status_code=None, error="ReadTimeout: timed out")]]
+        + [[_step(1, *login), _step(2, *order, success=False, status_code=401, extraction_failed=True)]]
+    )
+    store = BlobStore(codec="gzip")
+    for steps in runs:
+        status = "success" if all(s["success"] for s in steps) else "fail"
+        save_execution(cursor, store, case_id, status, steps, "p")
+    conn.commit()
+    conn.close()
+    service = ReportService(db_path)
+    service.scenario_id = scenario_id
+    return service
+
+
+def test_failure_analysis(service):
+    result = asyncio.run(service.get_failure_analysis("p", days=7))
+    assert result["failure_categories"] == [
+        {"category": "HTTP 5xx", "count": 2},
+        {"category": "HTTP 4xx", "count": 1},
+        {"category": "超时", "count": 1},
+    ]
+    recent = result["recent_failures"]
+    assert len(recent) == 4
+    assert recent[0]["scenario_name"] == "下单流程"
+    assert recent[0]["api_name"] == "POST /orders" and recent[0]["error_message"] == "HTTP 401"
+    assert {r["error_message"] for r in recent} == {"HTTP 401", "HTTP 500", "ReadTimeout: timed out"}
+
+    assert asyncio.run(service.get_failure_analysis("other")) == {"failure_categories": [], "recent_failures": []}
+
+
+def test_sankey_from_execution_steps(service):
+    data = asyncio.run(service.generate_sankey_data(service.scenario_id))
+    names = [n["name"] for n in data["nodes"]]
+    assert names[:3] == ["开始", "结束", "失败"]
+    links = {(names[l["source"]], names[l["target"]]): l["value"] for l in data["links"]}
+    assert links == {
+        ("开始", "POST /login"): 10,
+        ("POST /login", "POST /orders"): 9,
+        ("POST /login", "失败"): 1,
+        ("POST /orders", "POST /pay"): 6,
+        ("POST /orders", "失败"): 3,
+        ("POST /pay", "结束"): 6,
+    }
+    # 只统计最近 runs 次执行
+    recent = asyncio.run(service.generate_sankey_data(service.scenario_id, runs=1))
+    assert sum(l["value"] for l in recent["links"] if l["source"] == 0) == 1
+
+
+def test_standalone_connection_uses_wal_profile(service):
+    conn = service._get_connection()
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
+    finally:
+        conn.close()
@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import services.response_stream as response_stream
+from services.field_extractor import compile_path
+from services.response_stream import SelectiveJsonParser, collapse_prefixes, read_response
+
+
+DOC = {
+    "code": 0,
+    "data": {
+        "token": "t-1",
+        "items": [{"id": i, "status": "paid" if i % 2 else "new", "blob": "x" * 200} for i in range(50)],
+        "report": "y" * 5000,
+    },
+    "trace": ["z" * 100] * 20,
+}
+BODY = json.dumps(DOC).encode("utf-8")
+
+
+def _extractors(*paths):
+    return [compile_path(p) for p in paths]
+
+
+def _read(body, paths, max_body_size, content_type="application/json", spill_path=None, chunk=512):
+    async def content():
+        for i in range(0, len(body), chunk):
+            yield body[i:i + chunk]
+
+    def handler(request):
+        return httpx.Response(200, headers={"Content-Type": content_type}, content=content())
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            async with client.stream("GET", "http://api.test/big") as res:
+                return await read_response(res, _extractors(*paths), max_body_size, spill_path)
+
+    return asyncio.run(run())
+
+
+def test_collapse_prefixes():
+    extractors = _extractors("data.token", "data.items[?(@.status == 'paid')].id", "data", "trace[0]", "code")
+    assert sorted(collapse_prefixes(extractors)) == [["code"], ["data"], ["trace"]]
+    # 数字键名可能是列表下标，前缀到此为止
+    assert sorted(collapse_prefixes(_extractors("data.user.id", "data.user.name", "data.list.0"))) == [
+        ["data", "list"], ["data", "user", "id"], ["data", "user", "name"]]
+    assert collapse_prefixes(_extractors("[0].id", "data.token")) == [[]]
+
+
+def test_small_body_is_parsed_in_full():
+    result = _read(BODY, ["data.token"], max_body_size=len(BODY))
+    assert result == {"response": DOC, "size": len(BODY), "truncated": False, "file": None, "preview": None}
+
+
+def test_large_body_keeps_only_referenced_subtrees(tmp_path):
+    spill_path = str(tmp_path / "bodies" / "big.body")
+    result = _read(BODY, ["data.token", "data.items[?(@.status == 'paid')].id"], max_body_size=1024, spill_path=spill_path)
+
+    assert result["truncated"] is True
+    assert result["size"] == len(BODY)
+    assert result["response"] == {"data": {"token": "t-1", "items": DOC["data"]["items"]}}
+    assert compile_path("data.items[?(@.status == 'paid')].id").all(result["response"]) == list(range(1, 50, 2))
+    assert result["preview"] == BODY[:response_stream.PREVIEW_BYTES].decode("utf-8")
+    # 完整响应体按原样落盘
+    assert result["file"] == spill_path
+    with open(spill_path, "rb") as f:
+        assert f.read() == BODY
+
+
+def test_parser_stops_once_targets_are_built():
+    parser = SelectiveJsonParser([["code"]])
+    parser.feed(BODY[:200])
+    assert parser.done
+    parser.feed(b"not json at all")  # 目标已完成，后续字节不再解析
+    assert parser.close() == {"code": 0}
+
+
+def test_no_static_prefix_falls_back_to_full_parse():
+    body = json.dumps([{"id": 1, "pad": "x" * 3000}, {"id": 2}]).encode("utf-8")
+    result = _read(body, ["[0].id"], max_body_size=1024)
+
+    assert result["truncated"] is True
+    assert result["response"] == json.loads(body)
+
+
+def test_without_ijson_spills_and_parses_document(monkeypatch):
+    monkeypatch.setattr(response_stream, "IJSON_AVAILABLE", False)
+    result = _read(BODY, ["data.token"], max_body_size=1024)
+
+    assert result["truncated"] is True
+    assert result["response"] == {"data": {"token": "t-1"}}
+    assert result["file"] is None
+
+
+@pytest.mark.parametrize("content_type, paths", [("text/plain", ["data.token"]), ("application/json", [])])
+def test_large_body_without_selection_keeps_preview_only(content_type, paths):
+    result = _read(BODY, paths, max_body_size=1024, content_type=content_type)
+
+    assert result["truncated"] is True
+    assert result["response"] is None
+    assert len(result["preview"]) == response_stream.PREVIEW_BYTES
+
+
+def test_invalid_json_is_reported_not_raised():
+    body = b'{"data": {"token": "t-1", "items": [' + b"1," * 1000 + b"oops"
+    result = _read(body, ["data.items"], max_body_size=256)
+
+    assert result["truncated"] is True
+    assert result["response"] is None
@@ -0,0 +1,88 @@
+import asyncio
+
+import httpx
+import pytest
+
+import services.http_client_pool as http_client_pool
+from services.execution_engine import run_suite
+from services.http_client_pool import HttpClientPool
+
+
+class _Server:
+    """按路径模拟登录 / 查询：登录写 Cookie，查询回显 Cookie；记录同时在途的请求数"""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(float(request.url.params.get("delay", "0.01")))
+        finally:
+            self.active -= 1
+        if request.url.path == "/login":
+            user = request.url.params["user"]
+            return httpx.Response(200, json={"user": user}, headers={"Set-Cookie": f"session={user}; Path=/"})
+        if request.url.path == "/fail":
+            return httpx.Response(500, json={"message": "error"})
+        return httpx.Response(200, json={"session": request.headers.get("cookie")})
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = _Server()
+    monkeypatch.setattr(http_client_pool.httpx, "AsyncHTTPTransport", lambda **kw: httpx.MockTransport(server))
+    return server
+
+
+def _case(case_id, *paths):
+    return {"test_case_id": case_id, "steps": [
+        {"step_order": i + 1, "api_path": path, "api_method": "GET"} for i, path in enumerate(paths)
+    ]}
+
+
+def _run(cases, concurrency):
+    async def run():
+        pool = HttpClientPool()
+        try:
+            return await run_suite(cases, pool, base_url="http://api.test", concurrency=concurrency)
+        finally:
+            await pool.aclose()
+
+    return asyncio.run(run())
+
+
+def test_results_keep_case_order(server):
+    # 先提交的用例更慢，先完成的是后面的用例
+    cases = [_case(i, f"/ping?delay={0.05 - i * 0.01:.2f}") for i in range(5)]
+    cases.append(_case(99, "/fail"))
+    results = _run(cases, concurrency=6)
+
+    assert [r["test_case_id"] for r in results] == [0, 1, 2, 3, 4, 99]
+    assert [r["status"] for r in results] == ["success"] * 5 + ["failed"]
+    assert all(r["duration"] > 0 for r in results)
+
+
+def test_concurrency_bounds_running_cases(server):
+    results = _run([_case(i, "/ping?delay=0.02", "/ping?delay=0.02") for i in range(8)], concurrency=3)
+
+    assert len(results) == 8
+    assert server.max_active == 3
+
+
+def test_cookies_are_isolated_per_case(server):
+    cases = [_case(user, f"/login?user={user}", "/me?delay=0.03") for user in ("alice", "bob", "carol")]
+    results = _run(cases, concurrency=3)
+
+    sessions = [r["results"][1]["response"]["session"] for r in results]
+    assert sessions == ["session=alice", "session=bob", "session=carol"]
+
+
+@pytest.mark.parametrize("concurrency", [0, 100000])
+def test_suite_endpoint_rejects_out_of_range_concurrency(app_module, concurrency):
+    from fastapi.testclient import TestClient
+
+    res = TestClient(app_module.app).post("/api/v1/executions/suite", json={"test_case_ids": [1], "concurrency": concurrency})
+    assert res.status_code == 422
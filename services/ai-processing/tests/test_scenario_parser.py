@@ -0,0 +1,49 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from services.scenario_parser import ScenarioParser, restore_api_ids
+
+
+CANDIDATES = [
+    {"id": "api-login", "method": "POST", "path": "/api/login", "summary": "用户登录"},
+    {"id": "api-orders", "method": "post", "path": "/api/orders", "summary": "创建订单"},
+]
+
+
+class _FakeCompletions:
+    def __init__(self, content):
+        self.content = content
+        self.messages = None
+
+    async def create(self, **kwargs):
+        self.messages = kwargs["messages"]
+        message = SimpleNamespace(content=self.content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_parse_scenario_round_trips_candidate_ids():
+    answer = {
+        "scenario_name": "下单",
+        "steps": [
+            {"step_order": 1, "api_id": "POST:/api/login", "api_path": "/api/login", "api_method": "POST"},
+            {"step_order": 2, "api_id": "POST:/api/orders"},
+        ],
+    }
+    parser = ScenarioParser(api_key="test")
+    completions = _FakeCompletions(json.dumps(answer, ensure_ascii=False))
+    parser.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    result = asyncio.run(parser.parse_scenario({"intent": "下单"}, "p1", CANDIDATES))
+
+    assert [s["api_id"] for s in result["steps"]] == ["api-login", "api-orders"]
+    assert result["project_id"] == "p1"
+    # 紧凑编码里没有 id，LLM 只能按 METHOD:路径 引用
+    prompt = completions.messages[1]["content"]
+    assert "POST /api/login" in prompt and "api-login" not in prompt
+
+
+def test_restore_api_ids_keeps_unknown_references():
+    steps = [{"api_id": "GET:/api/unknown"}, {"api_id": "legacy-id"}, "not a step"]
+    restore_api_ids(steps, CANDIDATES)
+    assert steps == [{"api_id": "GET:/api/unknown"}, {"api_id": "legacy-id"}, "not a step"]